@@ -1,22 +1,29 @@
+import threading
+
 from flask import Flask
-from sqlalchemy import text
 
 from app.config import config
 from app.database import db
 
+_app = None
+_app_lock = threading.Lock()
+
 
 def create_app():
+    """A new Flask app bound to db. Connections are opened on first use and get their PRAGMAs
+    (foreign keys included) from configure_sqlite in app/database.py."""
     app = Flask(__name__)
     app.config.from_object(config)
 
     db.init_app(app)
 
-    with app.app_context():
-        db.session.execute(text("PRAGMA foreign_keys = ON;"))
-        db.session.commit()
+    return app
 
-        with db.engine.connect() as conn:
-            result = conn.execute(text("PRAGMA foreign_keys;")).fetchone()
-            # print(f"Foreign Keys Enabled: {result[0]}")
 
-    return app
+def get_app():
+    """The app every module, script and view shares, so a process has one engine and connection pool."""
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
+        return _app
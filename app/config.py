@@ -1,18 +1,191 @@
 from dotenv import load_dotenv
 import os
+import json
 
 load_dotenv()
 
 
+SCORE_LEVELS = ("Urgent", "High", "Medium", "Low")
+
+
+def default_score_matrix():
+    """100 when both models pick the same priority, 70 / 40 / 10 when they are one / two / three levels apart."""
+    return {
+        gpt: {deepseek: (100, 70, 40, 10)[abs(row - column)] for column, deepseek in enumerate(SCORE_LEVELS)}
+        for row, gpt in enumerate(SCORE_LEVELS)
+    }
+
+
+def score_matrix(value):
+    """
+    AUDIT_SCORE_MATRIX from its JSON text ({gpt_level: {deepseek_level: score}}), or the default when unset.
+    Every pair of priority levels must have a numeric score; a partial matrix raises ValueError at startup
+    instead of a KeyError halfway through writing an audit.
+    """
+    matrix = json.loads(value) if value else None
+    if not matrix:
+        return default_score_matrix()
+    if not isinstance(matrix, dict):
+        raise ValueError("AUDIT_SCORE_MATRIX must be a JSON object {gpt_level: {deepseek_level: score}}")
+
+    scores = {}
+    for gpt in SCORE_LEVELS:
+        row = matrix.get(gpt)
+        if not isinstance(row, dict):
+            raise ValueError(f"AUDIT_SCORE_MATRIX has no row for '{gpt}'")
+        scores[gpt] = {}
+        for deepseek in SCORE_LEVELS:
+            try:
+                scores[gpt][deepseek] = float(row[deepseek])
+            except KeyError:
+                raise ValueError(f"AUDIT_SCORE_MATRIX has no score for '{gpt}' -> '{deepseek}'")
+            except (TypeError, ValueError):
+                raise ValueError(f"AUDIT_SCORE_MATRIX score for '{gpt}' -> '{deepseek}' is not a number: "
+                                 f"{row[deepseek]!r}")
+    return scores
+
+
 class Config:
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-    DB_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "leads.db"))
+    DB_PATH = os.getenv('DB_PATH') or os.path.abspath(os.path.join(BASE_DIR, "..", "leads.db"))
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{DB_PATH}?check_same_thread=False&_fk=1"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Applied to every new SQLite connection. WAL lets readers (e.g. /get_leads) keep going while a
+    # stage commits; writers wait up to busy_timeout ms for the write lock instead of failing with
+    # "database is locked". cache_size is in KiB when negative.
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        "synchronous": os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        "cache_size": int(os.getenv('SQLITE_CACHE_SIZE', -65536)),
+        "mmap_size": int(os.getenv('SQLITE_MMAP_SIZE', 268435456)),
+        "busy_timeout": int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 30000)),
+        "foreign_keys": "ON",
+    }
+    # SQLite allows many readers and one writer, so the pool is sized for the request handlers plus the
+    # job worker and stage threads; writes queue on busy_timeout rather than on the pool.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv('DB_POOL_SIZE', 10)),
+        "max_overflow": int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        "pool_timeout": int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
 
+    # Maximum number of batch requests kept open at once against each provider.
+    OPENAI_MAX_IN_FLIGHT = int(os.getenv('OPENAI_MAX_IN_FLIGHT', 4))
+    DEEPSEEK_MAX_IN_FLIGHT = int(os.getenv('DEEPSEEK_MAX_IN_FLIGHT', 4))
+
+    # Shared provider clients (app/services/providers.py): timeouts, retries on 429/5xx with jittered
+    # exponential backoff, and per-provider rate limits (0 = no limit).
+    # Base URLs can point at scripts/mock_llm_server.py to run the pipeline offline.
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+    DEEPSEEK_BASE_URL = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com/v1')
+    PROVIDER_CONNECT_TIMEOUT = float(os.getenv('PROVIDER_CONNECT_TIMEOUT', 10))
+    PROVIDER_READ_TIMEOUT = float(os.getenv('PROVIDER_READ_TIMEOUT', 180))
+    PROVIDER_MAX_RETRIES = int(os.getenv('PROVIDER_MAX_RETRIES', 5))
+    PROVIDER_BACKOFF_BASE = float(os.getenv('PROVIDER_BACKOFF_BASE', 1))
+    PROVIDER_BACKOFF_MAX = float(os.getenv('PROVIDER_BACKOFF_MAX', 60))
+    PROVIDER_POOL_SIZE = int(os.getenv('PROVIDER_POOL_SIZE', 16))
+    OPENAI_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 0))
+    OPENAI_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', 0))
+    DEEPSEEK_REQUESTS_PER_MINUTE = int(os.getenv('DEEPSEEK_REQUESTS_PER_MINUTE', 0))
+    DEEPSEEK_TOKENS_PER_MINUTE = int(os.getenv('DEEPSEEK_TOKENS_PER_MINUTE', 0))
+
+    # Token budget per batch request (system prompt + inputs, and expected output) for each model.
+    MODEL_TOKEN_BUDGETS = {
+        "gpt-4o-2024-08-06": {
+            "input": int(os.getenv('OPENAI_BATCH_INPUT_TOKENS', 12000)),
+            "output": int(os.getenv('OPENAI_BATCH_OUTPUT_TOKENS', 4000)),
+        },
+        "deepseek-chat": {
+            "input": int(os.getenv('DEEPSEEK_BATCH_INPUT_TOKENS', 12000)),
+            "output": int(os.getenv('DEEPSEEK_BATCH_OUTPUT_TOKENS', 6000)),
+        },
+    }
+    # USD per million prompt ("input") and completion ("output") tokens, used for the token_usage ledger and
+    # llm_cost_usd_total on /metrics. Override with a JSON object in the same shape.
+    MODEL_PRICES = json.loads(os.getenv('MODEL_PRICES', 'null')) or {
+        "gpt-4o-2024-08-06": {"input": 2.50, "output": 10.00},
+        "deepseek-chat": {"input": 0.27, "output": 1.10},
+    }
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 50))
+    # Times an entry may be sent before it is left for a resume; failed batches are retried in halves.
+    BATCH_MAX_ATTEMPTS = int(os.getenv('BATCH_MAX_ATTEMPTS', 4))
+
+    # Local rules that fail obvious junk before the flagging stage calls the LLM. A threshold of 0 disables its rule.
+    PREFILTER_ENABLED = os.getenv('PREFILTER_ENABLED', '1') == '1'
+    PREFILTER_MIN_CHARS = int(os.getenv('PREFILTER_MIN_CHARS', 10))
+    PREFILTER_MIN_ENTROPY = float(os.getenv('PREFILTER_MIN_ENTROPY', 2.5))  # bits per character
+    PREFILTER_MIN_ALPHA_RATIO = float(os.getenv('PREFILTER_MIN_ALPHA_RATIO', 0.5))
+    # Off by default: leads in other alphabets go to the LLM. Set e.g. 0.3 to fail mostly non-Latin junk.
+    PREFILTER_MIN_LATIN_RATIO = float(os.getenv('PREFILTER_MIN_LATIN_RATIO', 0))
+    PREFILTER_MAX_VOWELLESS_RATIO = float(os.getenv('PREFILTER_MAX_VOWELLESS_RATIO', 0.5))
+    # Extra blocklist regular expressions, one per line.
+    PREFILTER_BLOCKLIST = [pattern for pattern in os.getenv('PREFILTER_BLOCKLIST', '').splitlines() if pattern.strip()]
+
+    # Local model trained on past LLM flags (python app/services/local_classifier.py train). Entries it
+    # labels 'success' or 'fail' with at least this probability skip the LLM; the rest are escalated.
+    LOCAL_CLASSIFIER_ENABLED = os.getenv('LOCAL_CLASSIFIER_ENABLED', '1') == '1'
+    LOCAL_CLASSIFIER_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "local_classifier.npz"))
+    LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv('LOCAL_CLASSIFIER_THRESHOLD', 0.9))
+    LOCAL_CLASSIFIER_MIN_EXAMPLES = int(os.getenv('LOCAL_CLASSIFIER_MIN_EXAMPLES', 500))
+    LOCAL_CLASSIFIER_MAX_FEATURES = int(os.getenv('LOCAL_CLASSIFIER_MAX_FEATURES', 20000))
+
+    # Send records to the LLMs as JSON arrays in a fixed column order (no keys, no trailing nulls) and ask for
+    # ids plus one-letter codes back. 0 restores the keyed JSON requests.
+    COMPACT_WIRE_FORMAT = os.getenv('COMPACT_WIRE_FORMAT', '1') == '1'
+
+    # Flag entries and extract lead fields in one request per batch instead of two separate stages.
+    FUSED_FLAGGING = os.getenv('FUSED_FLAGGING', '0') == '1'
+
+    # Near-duplicate clustering of each upload: only the first entry of a cluster is flagged and structured
+    # by the LLM. The threshold is the estimated Jaccard similarity of character 5-grams.
+    CLUSTERING_ENABLED = os.getenv('CLUSTERING_ENABLED', '1') == '1'
+    CLUSTERING_THRESHOLD = float(os.getenv('CLUSTERING_THRESHOLD', 0.8))
+
+    # Rows per executemany insert when ingesting an upload.
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 5000))
+    # Rows per transaction when a stage writes its results back.
+    WRITE_CHUNK_SIZE = int(os.getenv('WRITE_CHUNK_SIZE', 1000))
+
+    # "barrier" runs each stage over the whole file; "streaming" pipes chunks of entries through all stages.
+    PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'barrier')
+    PIPELINE_CHUNK_SIZE = int(os.getenv('PIPELINE_CHUNK_SIZE', 100))
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 4))
+
+    # "review": DeepSeek audits GPT's priority after it is assigned. "independent": DeepSeek classifies each lead
+    # while GPT assigns priorities, and the accuracy score comes from AUDIT_SCORE_MATRIX[gpt][deepseek].
+    # "sample": reviews a stratified sample per GPT priority level and audits the rest only if the estimated
+    # disagreement rate of the file exceeds AUDIT_ESCALATION_THRESHOLD.
+    AUDIT_MODE = os.getenv('AUDIT_MODE', 'review')
+    AUDIT_SCORE_MATRIX = score_matrix(os.getenv('AUDIT_SCORE_MATRIX'))
+    # Ask DeepSeek to explain disagreements (one extra request per batch of them) in independent mode.
+    AUDIT_DISAGREEMENT_NOTES = os.getenv('AUDIT_DISAGREEMENT_NOTES', '1') == '1'
+    # Sample size per priority level: AUDIT_SAMPLE_RATE of its leads, at least AUDIT_SAMPLE_MIN_PER_LEVEL.
+    AUDIT_SAMPLE_RATE = float(os.getenv('AUDIT_SAMPLE_RATE', 0.1))
+    AUDIT_SAMPLE_MIN_PER_LEVEL = int(os.getenv('AUDIT_SAMPLE_MIN_PER_LEVEL', 10))
+    AUDIT_ESCALATION_THRESHOLD = float(os.getenv('AUDIT_ESCALATION_THRESHOLD', 0.25))
+    AUDIT_CONFIDENCE = float(os.getenv('AUDIT_CONFIDENCE', 0.95))
+
+    # Local background workers for /process-file jobs.
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 2))
+
+    # Rows per page on the /get_* endpoints when no limit is given, and the largest limit accepted.
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 1000))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 10000))
+
+    # Rows fetched per round trip when /export_leads streams a whole file.
+    EXPORT_YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', 2000))
+
+    # Per-entry LLM result cache, stored beside leads.db.
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') == '1'
+    LLM_CACHE_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "llm_cache.db"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 500000))
+    LLM_CACHE_MAX_AGE_DAYS = int(os.getenv('LLM_CACHE_MAX_AGE_DAYS', 90))
+
     LOG_FILE = os.path.abspath(os.path.join(BASE_DIR, "..", "logs", "app.log"))
 
 
@@ -3,12 +3,16 @@ from sqlalchemy import event, text
 from sqlalchemy.engine import Engine
 from sqlite3 import Connection as SQLite3Connection
 
+from app.config import config
+
 db = SQLAlchemy()
 
 
 @event.listens_for(Engine, "connect")
-def enforce_foreign_keys(dbapi_connection, connection_record):
+def configure_sqlite(dbapi_connection, connection_record):
+    """Applies config.SQLITE_PRAGMAS (WAL, busy timeout, cache sizes, foreign keys) to each new connection."""
     if isinstance(dbapi_connection, SQLite3Connection):
         cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
+        for name, value in config.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value};")
         cursor.close()
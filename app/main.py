@@ -1,28 +1,35 @@
-import csv
 import sys
 import os
-import json
 import logging
 from datetime import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, request, jsonify
-from app import create_app
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context, url_for
+from sqlalchemy import func
+from app import get_app
 from app.database import db
 from models.entry_model import Entry
 from models.lead_model import Lead
-from models.edge_case_model import EdgeCase
+from app.services.pipeline import PIPELINE_MODES, PipelineError
+from app.services.job_queue import enqueue_job, get_job, has_active_job, process_upload, start_workers
+from app.services.export import (EXPORT_FORMATS, OUTPUT_FOLDER, STREAM_FORMATS, available_export_formats,
+                                 encode_rows, export_etag, get_export, gzip_chunks, iter_leads)
+from app.services.prefilter import prefilter_report
+from app.services.clustering import cluster_report
+from app.services.audit_sampling import audit_report
+from app.services.metrics import render as render_metrics, usage_report
+from app.services.pagination import (EDGE_CASE_FIELDS, ENTRY_FIELDS, LEAD_FIELDS, PaginationError, page_edge_cases,
+                                     page_entries, page_leads, parse_fields, parse_float, parse_limit, parse_list)
 
 timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 log_filename = f"../logs/run_{timestamp}.log"
 logging.basicConfig(filename=log_filename, level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-app = create_app()
+app = get_app()
 
-ALLOWED_EXTENSIONS = {'json', 'txt'}
+ALLOWED_EXTENSIONS = {'json', 'txt', 'ndjson', 'jsonl'}
 UPLOAD_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-OUTPUT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "output"))
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
@@ -32,21 +39,6 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def convert_txt_to_json(txt_filepath):
-    json_filename = txt_filepath.replace('.txt', '.json')
-    json_filepath = os.path.join(UPLOAD_FOLDER, json_filename)
-
-    with open(txt_filepath, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    json_data = [{"text": line.strip()} for line in lines if line.strip()]
-
-    with open(json_filepath, "w", encoding="utf-8") as f:
-        json.dump(json_data, f, indent=4)
-
-    return json_filename
-
-
 @app.route('/process-file', methods=['POST'])
 def process_file():
     if 'file' not in request.files:
@@ -58,159 +50,264 @@ def process_file():
         return jsonify({"error": "No selected file"}), 400
 
     if not allowed_file(file.filename):
-        return jsonify({"error": "Invalid file type. Only .json and .txt allowed."}), 400
+        return jsonify({"error": "Invalid file type. Only .json, .ndjson, .jsonl and .txt allowed."}), 400
 
+    # Saved as uploaded (copied in chunks); populate_db streams it into the database from there.
     file_path = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(file_path)
 
-    if file.filename.endswith(".txt"):
-        file.filename = convert_txt_to_json(file_path)
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-
     file_id = os.path.splitext(file.filename)[0]
 
     with app.app_context():
-        if db.session.query(Entry).filter_by(file_id=file_id).first():
+        if db.session.query(Entry).filter_by(file_id=file_id).first() or has_active_job(file_id):
             return jsonify({"error": f"file_id '{file_id}' already exists. Delete first if you want to reuse."}), 400
 
-    logging.info(f"Processing file: {file.filename} (file_id: {file_id})")
+    mode = request.form.get("mode") or request.args.get("mode")
+    if mode and mode not in PIPELINE_MODES:
+        return jsonify({"error": f"Unknown pipeline mode '{mode}'. Use one of: {', '.join(PIPELINE_MODES)}."}), 400
 
-    # Step 1
-    from scripts.populate_db import populate_db
-    if not populate_db(file.filename):
-        logging.error(f"Failed to populate DB for file_id: {file_id}")
-        return jsonify({"error": f"Database population failed for file_id: {file_id}"}), 400
-    print(f"✅ Data stored successfully for file_id: {file_id}.\n")
+    if request.args.get("sync", "").lower() in ("1", "true"):
+        logging.info(f"Processing file: {file.filename} (file_id: {file_id})")
+        try:
+            timings = process_upload(file_id, file.filename, mode)
+        except PipelineError as e:
+            logging.error(str(e))
+            return jsonify({"error": str(e)}), 400
 
-    # Step 2
-    from services.flag_entries import flag_entries
-    if not flag_entries(file_id):
-        logging.error(f"Flagging process failed for file_id: {file_id}")
-        return jsonify({"error": f"Flagging process failed for file_id: {file_id}"}), 400
-    print(f"✅ Entries flagged successfully.\n")
+        return jsonify({"message": f"File '{file.filename}' processed successfully.", "file_id": file_id,
+                        "timings": timings}), 200
 
-    # Step 3
-    from services.lead_qualifier import process_lead_qualification
-    if not process_lead_qualification(file_id):
-        logging.error(f"Lead qualification failed for file_id: {file_id}")
-        return jsonify({"error": f"Lead qualification failed for file_id: {file_id}"}), 400
-    print(f"✅ Leads categorized successfully.\n")
+    job_id = enqueue_job(file_id, file.filename, mode)
 
-    # Step 4
-    from services.assign_priority_lead import process_priority_assignment
-    if not process_priority_assignment(file_id):
-        logging.error(f"GPT priority assignment failed for file_id: {file_id}")
-        return jsonify({"error": f"GPT priority assignment failed for file_id: {file_id}"}), 400
-    print(f"✅ Priority levels assigned successfully (Leads AI).\n")
+    return jsonify({
+        "message": f"File '{file.filename}' queued for processing.",
+        "file_id": file_id,
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }), 202
 
-    # Step 5
-    from services.assign_priority_audit import process_deepseek_audit
-    if not process_deepseek_audit(file_id):
-        logging.error(f"DeepSeek audit failed for file_id: {file_id}")
-        return jsonify({"error": f"DeepSeek audit failed for file_id: {file_id}"}), 400
-    print(f"✅ Priority levels assigned and evaluated Leads AI successfully (Audit AI).\n")
 
-    save_leads_to_output(file_id)
+@app.route('/resume-file', methods=['POST'])
+def resume_file():
+    file_id = request.args.get('file_id') or request.form.get('file_id')
+    if not file_id:
+        return jsonify({"error": "file_id is required."}), 400
 
-    print(f"\nAll processes completed successfully for file_id: {file_id}\n")
-    logging.info(f"All processes completed successfully for file_id: {file_id}")
+    with app.app_context():
+        if not db.session.query(Entry).filter_by(file_id=file_id).first():
+            return jsonify({"error": f"file_id '{file_id}' not found."}), 404
 
-    return jsonify({"message": f"File '{file.filename}' processed successfully.", "file_id": file_id}), 200
+    if has_active_job(file_id):
+        return jsonify({"error": f"file_id '{file_id}' is already being processed."}), 400
 
+    mode = request.form.get("mode") or request.args.get("mode")
+    if mode and mode not in PIPELINE_MODES:
+        return jsonify({"error": f"Unknown pipeline mode '{mode}'. Use one of: {', '.join(PIPELINE_MODES)}."}), 400
+
+    job_id = enqueue_job(file_id, mode=mode, action="resume")
+
+    return jsonify({
+        "message": f"Resuming unfinished entries of file_id '{file_id}'.",
+        "file_id": file_id,
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }), 202
 
-def save_leads_to_output(file_id):
-    with app.app_context():
-        leads = db.session.query(Lead).filter_by(file_id=file_id).order_by(
-            Lead.audit_AI_priority_level.desc()).all()
 
-        json_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.json")
-        csv_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.csv")
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
 
-        leads_data = [{
-            "Company Name": lead.company_name,
-            "Industry": lead.industry,
-            "Business Model": lead.business_model,
-            "Budget": lead.budget,
-            "Revenue": lead.revenue,
-            "Growth Goal": lead.growth_goal,
-            "Urgency": lead.urgency,
-            "Lead Sentiment": lead.lead_sentiment,
-            "Additional Notes": lead.additional_notes,
-            "DeepSeek Priority Level": lead.audit_AI_priority_level
-        } for lead in leads]
+    return jsonify(job), 200
 
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(leads_data, f, indent=4)
 
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=leads_data[0].keys())
-            writer.writeheader()
-            writer.writerows(leads_data)
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
 
-        print(f"✅ Leads saved to: {json_path} and {csv_path}")
+    if job["status"] == "failed":
+        return jsonify({"job_id": job_id, "status": job["status"], "error": job["error"]}), 400
+
+    if job["status"] != "completed":
+        return jsonify({"job_id": job_id, "status": job["status"], "stage": job["stage"],
+                        "progress": job["progress"]}), 202
+
+    # Leads are served by the paged and streamed endpoints, so a large file is never built into one response.
+    file_id = job["file_id"]
+    with app.app_context():
+        lead_count = db.session.query(func.count(Lead.id)).filter_by(file_id=file_id).scalar()
+
+    return jsonify({
+        "job_id": job_id,
+        "file_id": file_id,
+        "status": job["status"],
+        "timings": job["result"]["timings"] if job["result"] else None,
+        "lead_count": lead_count,
+        "leads_url": url_for("get_leads", file_id=file_id),
+        "export_url": url_for("export_leads", file_id=file_id),
+        "download_url": url_for("download_leads", file_id=file_id),
+    }), 200
+
+
+def page_response(rows, next_cursor):
+    response = jsonify(rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
 
 
 @app.route('/get_leads', methods=['GET'])
 def get_leads():
+    try:
+        with app.app_context():
+            rows, next_cursor = page_leads(
+                request.args.get('file_id'),
+                fields=parse_fields(request.args.get('fields'), LEAD_FIELDS),
+                priorities=parse_list(request.args.get('priority')),
+                min_accuracy=parse_float(request.args.get('min_accuracy'), "min_accuracy"),
+                cursor=request.args.get('cursor'),
+                limit=parse_limit(request.args.get('limit')),
+            )
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return page_response(rows, next_cursor)
+
+
+@app.route('/export_leads', methods=['GET'])
+def export_leads():
+    """Streams every lead of a file as NDJSON (default) or a JSON array, gzip-compressed when the client accepts it."""
     file_id = request.args.get('file_id')
+    stream_format = request.args.get('format', 'ndjson')
+    if stream_format not in STREAM_FORMATS:
+        return jsonify({"error": f"Unknown format '{stream_format}'. Use one of: {', '.join(STREAM_FORMATS)}."}), 400
+
+    try:
+        fields = parse_fields(request.args.get('fields'), LEAD_FIELDS)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
     with app.app_context():
-        leads = db.session.query(Lead).filter_by(file_id=file_id).order_by(
-            Lead.audit_AI_priority_level.desc()).all()
-
-    results = [{
-        "id": lead.id,
-        "file_id": lead.file_id,
-        "entry_id": lead.entry_id,
-        "company_name": lead.company_name,
-        "industry": lead.industry,
-        "business_model": lead.business_model,
-        "budget": lead.budget,
-        "revenue": lead.revenue,
-        "growth_goal": lead.growth_goal,
-        "urgency": lead.urgency,
-        "lead_sentiment": lead.lead_sentiment,
-        "additional_notes": lead.additional_notes,
-        "leads_AI_priority_level": lead.leads_AI_priority_level,
-        "audit_AI_priority_level": lead.audit_AI_priority_level,
-        "audit_AI_notes": lead.audit_AI_notes,
-        "audit_accuracy_score": lead.audit_accuracy_score
-    } for lead in leads]
-
-    return jsonify(results), 200
+        if not db.session.query(Lead.id).filter_by(file_id=file_id).first():
+            return jsonify({"error": f"No leads found for file_id '{file_id}'."}), 404
 
+    chunks = encode_rows(iter_leads(file_id, fields), stream_format)
+    headers = {"Vary": "Accept-Encoding"}
+    if request.accept_encodings["gzip"]:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
 
-@app.route('/get_entries', methods=['GET'])
-def get_entries():
+    return Response(stream_with_context(chunks), mimetype=STREAM_FORMATS[stream_format], headers=headers)
+
+
+@app.route('/download_leads', methods=['GET'])
+def download_leads():
+    """
+    Serves a file's leads as Parquet, Arrow IPC or gzip CSV. Exports are built once per version of the
+    leads and cached; a matching If-None-Match gets 304 without touching the artifact.
+    """
     file_id = request.args.get('file_id')
+    formats = available_export_formats()
+    export_format = request.args.get('format', formats[0])
+    if export_format not in formats:
+        return jsonify({"error": f"Unsupported format '{export_format}'. Available: {', '.join(formats)}."}), 400
+
     with app.app_context():
-        entries = db.session.query(Entry).filter_by(file_id=file_id).all()
+        if not db.session.query(Entry.id).filter_by(file_id=file_id).first():
+            return jsonify({"error": f"File ID '{file_id}' not found."}), 404
+
+        etag = export_etag(file_id, export_format)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        path, etag = get_export(file_id, export_format)
+
+    return send_file(
+        path,
+        mimetype=EXPORT_FORMATS[export_format]["mimetype"],
+        as_attachment=True,
+        download_name=f"{file_id}.{EXPORT_FORMATS[export_format]['extension']}",
+        etag=etag,
+        conditional=True,
+        max_age=0,
+    )
+
+
+@app.route('/prefilter_report', methods=['GET'])
+def get_prefilter_report():
+    """Entries failed locally per file, the rules that fired and the flagging API calls that saved."""
+    return jsonify(prefilter_report(request.args.get('file_id'))), 200
+
+
+@app.route('/cluster_report', methods=['GET'])
+def get_cluster_report():
+    """Near-duplicate clusters per file and the flagging API calls the duplicates saved."""
+    return jsonify(cluster_report(request.args.get('file_id'))), 200
+
 
-    results = [{
-        "id": entry.id,
-        "raw_input": entry.raw_input,
-        "status": entry.status,
-        "file_id": entry.file_id
-    } for entry in entries]
+@app.route('/audit_report', methods=['GET'])
+def get_audit_report():
+    """Leads audited and unaudited per file, and the estimated GPT accuracy and disagreement rate with intervals."""
+    return jsonify(audit_report(request.args.get('file_id'))), 200
 
-    return jsonify(results), 200
+
+@app.route('/usage_report', methods=['GET'])
+def get_usage_report():
+    """LLM requests, tokens and estimated cost per file and stage."""
+    return jsonify(usage_report(request.args.get('file_id'))), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Stage and provider latency histograms, tokens, cost, batch sizes, retries and cache hits for Prometheus."""
+    return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route('/get_entries', methods=['GET'])
+def get_entries():
+    try:
+        with app.app_context():
+            rows, next_cursor = page_entries(
+                request.args.get('file_id'),
+                fields=parse_fields(request.args.get('fields'), ENTRY_FIELDS),
+                statuses=parse_list(request.args.get('status')),
+                stages=parse_list(request.args.get('stage')),
+                cursor=request.args.get('cursor'),
+                limit=parse_limit(request.args.get('limit')),
+            )
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return page_response(rows, next_cursor)
 
 
 @app.route('/get_edge_cases', methods=['GET'])
 def get_edge_cases():
-    file_id = request.args.get('file_id')
-    with app.app_context():
-        edge_cases = db.session.query(EdgeCase).filter_by(file_id=file_id).all()
-
-    results = [{
-        "id": edge_case.id,
-        "entry_id": edge_case.entry_id,
-        "file_id": edge_case.file_id,
-        "raw_input": edge_case.raw_input,
-        "reason": edge_case.reason
-    } for edge_case in edge_cases]
+    try:
+        with app.app_context():
+            rows, next_cursor = page_edge_cases(
+                request.args.get('file_id'),
+                fields=parse_fields(request.args.get('fields'), EDGE_CASE_FIELDS),
+                cursor=request.args.get('cursor'),
+                limit=parse_limit(request.args.get('limit')),
+            )
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(results), 200
+    return page_response(rows, next_cursor)
 
 
 if __name__ == '__main__':
+    # The debug reloader runs this file in a watcher process and a serving child; only the child
+    # (WERKZEUG_RUN_MAIN set) serves requests, so only it starts workers.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_workers()
     app.run(debug=True)
@@ -1,129 +1,263 @@
-import os
 import sys
 import json
-import requests
-from app import create_app
+from app import get_app
+from app.config import config
 from app.database import db
 from models.lead_model import Lead
 from models.entry_model import Entry
-
-
-app = create_app()
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-
-
-def get_leads_for_deepseek(file_id):
+from app.services import wire_format
+from app.services.batching import run_stage_batches
+from app.services.providers import ProviderError, deepseek_chat
+from app.services.checkpoints import mark_stage
+from app.services.bulk_write import bulk_update, match_results, write_in_chunks
+
+
+app = get_app()
+
+MODEL = "deepseek-chat"
+PRIORITY_LEVELS = ("Urgent", "High", "Medium", "Low")
+MAX_OUTPUT_TOKENS = 8192
+# Priority, accuracy score and a short note per lead
+OUTPUT_TOKENS_PER_LEAD = 90
+
+PRIORITY_GUIDE = (
+    "- 'Urgent': Needs immediate action.\n"
+    "- 'High': Strong growth potential but not immediate.\n"
+    "- 'Medium': Moderate relevance but not urgent.\n"
+    "- 'Low': Weak intent or unclear need.\n\n"
+)
+
+AUDIT_PROMPT = (
+    "You are an independent AI auditor. Your task is to evaluate the accuracy of lead classifications made by "
+    "another AI. Each lead consists of:\n"
+    "- Raw Inquiry: The original text the user provided.\n"
+    "- Structured Data: AI-extracted details such as company name, industry, budget, urgency, and sentiment.\n"
+    "- Priority Level assigned by GPT: The AI's classification of the lead.\n\n"
+
+    "Your job is to verify if the classification is correct. Assign a corrected priority level based on all "
+    "available data.\n"
+    + PRIORITY_GUIDE +
+
+    "Return the following for each lead:\n"
+    "1. 'deepseek_priority_level': Your own classification of priority level from the input data.\n"
+    "2. 'deepseek_notes': If the GPT AI made a mistake, explain briefly why - comparison between your own "
+    "classification and the other AI's. If the priority level is matched, this value can be empty.\n"
+    "3. 'deepseek_accuracy_score': A score from 1-100 number - percentage on how accurate GPT AI's "
+    "classification was. 1 represents strong misclassification and 100 is an exact match in the priority level."
+    "It can be any number in the range, depending on the misclassification level. If GPT said 'High' but you "
+    "consider it 'Urgent', the accuracy score can be 70-90 for example, depending on the input data. If GPT "
+    "said 'Low', but you consider it 'High', it can be 20-50% accurate for example, and so on.\n\n"
+
+    "The order of the inputs and outputs is important, pay attention to it. Below is the required output, it "
+    "should be a LIST of dictionaries, each entry line should have a corresponding output dictionary in the "
+    "list. The output length is not important - it can be as long as needed to get the full output.  If the "
+    "input data has 20 entries, the output should be a list of 20 dictionaries.\n\n"
+
+    "Expected format:\n"
+    "[\n"
+    "{'id': 'value', 'deepseek_priority_level' : 'value', 'deepseek_notes' : 'value', 'deepseek_accuracy_score': 'value' },\n"
+    "{'id': 'value', 'deepseek_priority_level' : 'value', 'deepseek_notes' : 'value', 'deepseek_accuracy_score': 'value' },\n"
+    "{'id': 'value', 'deepseek_priority_level' : 'value', 'deepseek_notes' : 'value', 'deepseek_accuracy_score': 'value' },\n"
+    "... \n"
+    "]"
+)
+
+# AUDIT_MODE=independent: DeepSeek labels each lead without seeing GPT's priority.
+CLASSIFY_PROMPT = (
+    "You are an independent AI analyst. Each lead consists of:\n"
+    "- Raw Inquiry: The original text the user provided.\n"
+    "- Structured Data: AI-extracted details such as company name, industry, budget, urgency, and sentiment.\n\n"
+
+    "Assign a priority level based on all available data.\n"
+    + PRIORITY_GUIDE +
+
+    "Return a JSON LIST with one dictionary per input lead, in input order:\n"
+    "[\n"
+    "{'id': 'value', 'deepseek_priority_level' : 'value'},\n"
+    "... \n"
+    "]"
+)
+# {"id": ..., "deepseek_priority_level": "..."} per lead
+OUTPUT_TOKENS_PER_CLASSIFICATION = 20
+
+NOTES_PROMPT = (
+    "You are an independent AI auditor. Two AIs assigned different priority levels ('Urgent', 'High', 'Medium', "
+    "'Low') to each of the leads below. Each lead has the raw inquiry, the structured data, GPT's priority level "
+    "and your own (DeepSeek's) priority level.\n"
+    "For each lead explain VERY BRIEFLY why GPT's priority level is wrong or where the two differ.\n\n"
+
+    "Return a JSON LIST with one dictionary per input lead, in input order:\n"
+    "[\n"
+    "{'id': 'value', 'deepseek_notes' : 'value'},\n"
+    "... \n"
+    "]"
+)
+# A short note per lead
+OUTPUT_TOKENS_PER_NOTE = 70
+
+# COMPACT_WIRE_FORMAT: leads go out as rows (see lead_row) and answers come back as [id, code, ...] rows.
+LEAD_ROW_COLUMNS = (
+    "inquiry, company, industry, business model, budget, monthly revenue, monthly growth goal, urgency, sentiment, "
+    "notes"
+)
+COMPACT_LEGEND = (
+    "Priorities and urgency are codes: U (Urgent), H (High), M (Medium), L (Low). Sentiment is H (Hot), N (Neutral) "
+    "or C (Cold). Values missing at the end of a row are unknown.\n"
+)
+COMPACT_ANSWER = "Return ONLY a JSON list with one row per input row, in input order. "
+
+COMPACT_AUDIT_PROMPT = (
+    "You are an independent AI auditor. Another AI (GPT) assigned a priority level to each lead below. Verify it "
+    "and assign your own priority level based on all available data.\n"
+    + PRIORITY_GUIDE +
+    f"Each input row is a JSON array: [id, GPT priority, {LEAD_ROW_COLUMNS}].\n"
+    + COMPACT_LEGEND + COMPACT_ANSWER + wire_format.row_format("id", "priority", "score", "note") + ".\n"
+    "priority is your code. score (1-100) is how accurate GPT's priority was: 100 for the same level, about 70-90 "
+    "one level apart, 20-50 further apart. Add note, a VERY BRIEF reason, only when your priority differs from GPT's."
+)
+COMPACT_OUTPUT_TOKENS_PER_LEAD = 30
+
+COMPACT_CLASSIFY_PROMPT = (
+    "You are an independent AI analyst. Assign a priority level to each lead below based on all available data.\n"
+    + PRIORITY_GUIDE +
+    f"Each input row is a JSON array: [id, {LEAD_ROW_COLUMNS}].\n"
+    + COMPACT_LEGEND + COMPACT_ANSWER + wire_format.row_format("id", "priority") + ", priority as a code."
+)
+COMPACT_OUTPUT_TOKENS_PER_CLASSIFICATION = 8
+
+COMPACT_NOTES_PROMPT = (
+    "You are an independent AI auditor. Two AIs assigned different priority levels to each lead below: GPT and "
+    "you (DeepSeek). For each lead explain VERY BRIEFLY why GPT's priority level is wrong or where the two differ.\n"
+    f"Each input row is a JSON array: [id, GPT priority, your priority, {LEAD_ROW_COLUMNS}].\n"
+    + COMPACT_LEGEND + COMPACT_ANSWER + wire_format.row_format("id", "note") + "."
+)
+
+
+def get_leads_for_deepseek(file_id, entry_ids=None, stage=None):
     with app.app_context():
-        return (
+        query = (
             db.session.query(Lead, Entry)
             .join(Entry, Entry.id == Lead.entry_id)
             .filter(Lead.file_id == file_id)
-            .all()
         )
+        if stage:
+            query = query.filter(Entry.stage == stage)
+        if entry_ids is not None:
+            query = query.filter(Lead.entry_id.in_(entry_ids))
+        return query.all()
+
+
+def lead_input(lead, entry):
+    return {
+        "id": lead.entry_id,
+        "raw_inquiry": entry.raw_input,
+        "structured_data": {
+            "Company Name": lead.company_name,
+            "Industry": lead.industry,
+            "Business Model": lead.business_model,
+            "Budget": lead.budget,
+            "Revenue (Monthly)": lead.revenue,
+            "Growth Goal (Monthly)": lead.growth_goal,
+            "Urgency": lead.urgency,
+            "Lead Sentiment": lead.lead_sentiment,
+            "Additional Notes": lead.additional_notes,
+        },
+    }
+
+
+def lead_row(lead, entry, *codes):
+    """
+    A lead as [*codes, inquiry, fields...] in LEAD_ROW_COLUMNS order. The id column is added in front
+    when the batch is sent, so the result cache key does not depend on the entry id.
+    """
+    return {
+        "id": lead.entry_id,
+        "row": wire_format.row(
+            *codes, entry.raw_input, lead.company_name, lead.industry, lead.business_model,
+            lead.budget, lead.revenue, lead.growth_goal, wire_format.code(wire_format.PRIORITY_CODES, lead.urgency),
+            wire_format.code(wire_format.SENTIMENT_CODES, lead.lead_sentiment), lead.additional_notes,
+        ),
+    }
+
+
+def priority_code(level):
+    return wire_format.code(wire_format.PRIORITY_CODES, level)
+
+
+def decode_audit_row(row):
+    return {
+        "id": int(row[0]),
+        "deepseek_priority_level": wire_format.PRIORITY_LEVELS.get(row[1], row[1]),
+        "deepseek_accuracy_score": float(str(row[2]).replace("%", "")),
+        "deepseek_notes": (row[3] if len(row) > 3 else None) or None,
+    }
+
+
+def decode_classification_row(row):
+    return {"id": int(row[0]), "deepseek_priority_level": wire_format.PRIORITY_LEVELS.get(row[1], row[1])}
+
+
+def decode_note_row(row):
+    return {"id": int(row[0]), "deepseek_notes": (row[1] if len(row) > 1 else None) or None}
 
 
 def call_deepseek_audit(leads):
-    MAX_BATCH_SIZE = 40
-    total_leads = len(leads)
-    all_audit_results = []
-
-    for i in range(0, total_leads, MAX_BATCH_SIZE):
-        batch_leads = leads[i:i + MAX_BATCH_SIZE]
-
-        input_data = [
-            {
-                "id": lead.entry_id,
-                "raw_inquiry": entry.raw_input,
-                "structured_data": {
-                    "Company Name": lead.company_name,
-                    "Industry": lead.industry,
-                    "Business Model": lead.business_model,
-                    "Budget": lead.budget,
-                    "Revenue (Monthly)": lead.revenue,
-                    "Growth Goal (Monthly)": lead.growth_goal,
-                    "Urgency": lead.urgency,
-                    "Lead Sentiment": lead.lead_sentiment,
-                    "Additional Notes": lead.additional_notes,
-                },
-                "leads_ai_priority_level": lead.leads_AI_priority_level,
-            }
-            for lead, entry in batch_leads
-        ]
-
-        prompt = (
-            "You are an independent AI auditor. Your task is to evaluate the accuracy of lead classifications made by "
-            "another AI. Each lead consists of:\n"
-            "- Raw Inquiry: The original text the user provided.\n"
-            "- Structured Data: AI-extracted details such as company name, industry, budget, urgency, and sentiment.\n"
-            "- Priority Level assigned by GPT: The AI's classification of the lead.\n\n"
-
-            "Your job is to verify if the classification is correct. Assign a corrected priority level based on all "
-            "available data.\n"
-            "- 'Urgent': Needs immediate action.\n"
-            "- 'High': Strong growth potential but not immediate.\n"
-            "- 'Medium': Moderate relevance but not urgent.\n"
-            "- 'Low': Weak intent or unclear need.\n\n"
-
-            "Return the following for each lead:\n"
-            "1. 'deepseek_priority_level': Your own classification of priority level from the input data.\n"
-            "2. 'deepseek_notes': If the GPT AI made a mistake, explain briefly why - comparison between your own "
-            "classification and the other AI's. If the priority level is matched, this value can be empty.\n"
-            "3. 'deepseek_accuracy_score': A score from 1-100 number - percentage on how accurate GPT AI's "
-            "classification was. 1 represents strong misclassification and 100 is an exact match in the priority level."
-            "It can be any number in the range, depending on the misclassification level. If GPT said 'High' but you "
-            "consider it 'Urgent', the accuracy score can be 70-90 for example, depending on the input data. If GPT "
-            "said 'Low', but you consider it 'High', it can be 20-50% accurate for example, and so on.\n\n"
-
-            "The order of the inputs and outputs is important, pay attention to it. Below is the required output, it "
-            "should be a LIST of dictionaries, each entry line should have a corresponding output dictionary in the "
-            "list. The output length is not important - it can be as long as needed to get the full output.  If the "
-            "input data has 20 entries, the output should be a list of 20 dictionaries.\n\n"
-
-            "Expected format:\n"
-            "[\n"
-            "{'id': 'value', 'deepseek_priority_level' : 'value', 'deepseek_notes' : 'value', 'deepseek_accuracy_score': 'value' },\n"
-            "{'id': 'value', 'deepseek_priority_level' : 'value', 'deepseek_notes' : 'value', 'deepseek_accuracy_score': 'value' },\n"
-            "{'id': 'value', 'deepseek_priority_level' : 'value', 'deepseek_notes' : 'value', 'deepseek_accuracy_score': 'value' },\n"
-            "... \n"
-            "]"
-        )
+    if wire_format.enabled():
+        input_data = [lead_row(lead, entry, priority_code(lead.leads_AI_priority_level)) for lead, entry in leads]
+        return run_stage_batches("audit", input_data, call_deepseek_rows_batch(COMPACT_AUDIT_PROMPT, decode_audit_row),
+                                 provider="deepseek", model=MODEL, prompt=COMPACT_AUDIT_PROMPT,
+                                 output_tokens=COMPACT_OUTPUT_TOKENS_PER_LEAD, validate=is_valid_audit)
 
-        headers = {
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json",
-        }
-
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": json.dumps(input_data)},
-            ],
-            "temperature": 0.2,
-            "max_tokens": 8192,
-        }
-
-        response = requests.post("https://api.deepseek.com/v1/chat/completions", json=payload, headers=headers)
-
-        if response.status_code != 200:
-            print(f"❌ DeepSeek API Error: {response.status_code}, {response.text}")
-            return None
+    input_data = [
+        {**lead_input(lead, entry), "leads_ai_priority_level": lead.leads_AI_priority_level}
+        for lead, entry in leads
+    ]
 
-        try:
-            raw_response = response.json()
-            deepseek_text_output = raw_response["choices"][0]["message"]["content"]
-            batch_results = parse_deepseek_output(deepseek_text_output, batch_leads)
+    return run_stage_batches("audit", input_data, call_deepseek_audit_batch, provider="deepseek", model=MODEL,
+                             prompt=AUDIT_PROMPT, output_tokens=OUTPUT_TOKENS_PER_LEAD, validate=is_valid_audit)
 
-            if batch_results:
-                all_audit_results.extend(batch_results)
-            else:
-                print("⚠️ Skipping this batch due to failed parsing.")
 
-        except Exception as e:
-            print(f"❌ Failed to parse DeepSeek response: {e}")
-            return None
+def is_valid_audit(result):
+    return result["deepseek_priority_level"] in PRIORITY_LEVELS and 1 <= result["deepseek_accuracy_score"] <= 100
+
+
+def request_deepseek(prompt, input_data):
+    """Sends one chat request and returns the response JSON, or None on an API error."""
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": wire_format.dumps(input_data)},
+        ],
+        "temperature": 0.2,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+    }
+
+    try:
+        return deepseek_chat(payload)
+    except ProviderError as e:
+        print(f"❌ DeepSeek API Error: {e}")
+        return None
+
+
+def call_deepseek_audit_batch(input_data):
+    raw_response = request_deepseek(AUDIT_PROMPT, input_data)
+    if raw_response is None:
+        return None
+
+    try:
+        deepseek_text_output = raw_response["choices"][0]["message"]["content"]
+        batch_results = parse_deepseek_output(deepseek_text_output, input_data)
+
+        if not batch_results:
+            print("⚠️ Skipping this batch due to failed parsing.")
+            return []
 
-    return all_audit_results
+        return batch_results
+
+    except Exception as e:
+        print(f"❌ Failed to parse DeepSeek response: {e}")
+        return None
 
 
 def parse_deepseek_output(response_text, leads):
@@ -141,10 +275,11 @@ def parse_deepseek_output(response_text, leads):
             lead_id = int(entry["id"])
             priority = entry["deepseek_priority_level"]
             notes = entry["deepseek_notes"] if entry["deepseek_notes"] else None
-            accuracy = float(entry["deepseek_accuracy_score"])
+            accuracy = entry["deepseek_accuracy_score"]
 
             if isinstance(accuracy, str):
-                accuracy = float(accuracy.replace("%", ""))
+                accuracy = accuracy.replace("%", "")
+            accuracy = float(accuracy)
 
             results.append({
                 "id": lead_id,
@@ -153,44 +288,243 @@ def parse_deepseek_output(response_text, leads):
                 "deepseek_accuracy_score": accuracy,
             })
 
-        except (KeyError, ValueError):
-            print(f"⚠️ Skipping malformed entry: {entry}")
+        except (KeyError, ValueError, TypeError):
+            print(f"⚠️ Skipping malformed entry, it will be retried: {entry}")
             continue
 
     return results
 
 
-def process_deepseek_audit(file_id):
-    leads = get_leads_for_deepseek(file_id)
+def process_deepseek_audit(file_id, entry_ids=None):
+    if config.AUDIT_MODE == "independent":
+        return score_independent_audit(file_id, entry_ids)
+    if config.AUDIT_MODE == "sample":
+        from app.services.audit_sampling import process_sampled_audit
+        return process_sampled_audit(file_id, entry_ids)
+
+    leads = get_leads_for_deepseek(file_id, entry_ids, stage="prioritised")
 
     if not leads:
-        print(f"⚠️ No leads found for audit with file_id '{file_id}'.")
+        print(f"⚠️ No leads waiting for audit with file_id '{file_id}'.")
+        return False
+
+    audited = audit_leads(leads)
+    if audited is None:
         return False
 
+    total_score = sum(audit_entry["deepseek_accuracy_score"] for row, audit_entry in audited)
+    overall_accuracy = total_score / len(audited) if audited else 0
+    print(f"\n✅ DeepSeek audit completed for file_id '{file_id}' with {overall_accuracy:.2f}% model accuracy.")
+
+    if len(audited) != len(leads):
+        print(f"⚠️ {len(leads) - len(audited)} leads were not audited and stay prioritised for a resume.")
+        return False
+
+    return True
+
+
+def audit_leads(leads, status="audited"):
+    """
+    Reviews (lead, entry) rows with DeepSeek and stores the results with the given audit_status.
+    Returns the [(row, result)] pairs stored, or None if DeepSeek returned nothing usable.
+    """
     audit_results = call_deepseek_audit(leads)
 
-    if not audit_results or len(audit_results) != len(leads):
+    if not audit_results:
         print("❌ Error: Mismatch in response length or invalid response format.")
-        return False
+        return None
+
+    audited = match_results(leads, audit_results, key=lambda row: row[0].entry_id)
 
-    total_score = sum(entry["deepseek_accuracy_score"] for entry in audit_results)
-    overall_accuracy = total_score / len(leads) if leads else 0
+    def write_chunk(chunk):
+        bulk_update(Lead, [{
+            "id": lead.id,
+            "audit_AI_priority_level": audit_entry["deepseek_priority_level"],
+            "audit_AI_notes": audit_entry["deepseek_notes"],
+            "audit_accuracy_score": audit_entry["deepseek_accuracy_score"],
+            "audit_status": status,
+        } for (lead, entry), audit_entry in chunk])
+        mark_stage([lead.entry_id for (lead, entry), audit_entry in chunk], "audited")
 
     with app.app_context():
-        for lead, entry in leads:
-            for audit_entry in audit_results:
-                if audit_entry["id"] == lead.entry_id:
-                    lead.audit_AI_priority_level = audit_entry["deepseek_priority_level"]
-                    lead.audit_AI_notes = audit_entry["deepseek_notes"]
-                    lead.audit_accuracy_score = audit_entry["deepseek_accuracy_score"]
-                    db.session.add(lead)
+        write_in_chunks(audited, write_chunk)
 
-        db.session.commit()
+    return audited
+
+
+def call_deepseek_json_batch(prompt, fields):
+    """Batch caller for prompts answered with a JSON list of {"id": ..., <fields>} dictionaries."""
+
+    def call_batch(input_data):
+        raw_response = request_deepseek(prompt, input_data)
+        if raw_response is None:
+            return None
+
+        try:
+            items = json.loads(raw_response["choices"][0]["message"]["content"])
+        except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
+            print(f"❌ Failed to parse DeepSeek response: {e}")
+            return None
+
+        results = []
+        for item in items if isinstance(items, list) else []:
+            try:
+                results.append({"id": int(item["id"]), **{field: item[field] for field in fields}})
+            except (KeyError, ValueError, TypeError):
+                print(f"⚠️ Skipping malformed entry, it will be retried: {item}")
+        return results
+
+    return call_batch
+
+
+def call_deepseek_rows_batch(prompt, decode):
+    """Batch caller for the compact prompts, answered with a JSON list of rows; decode(row) builds each result."""
+
+    def call_batch(input_data):
+        raw_response = request_deepseek(prompt, [[item["id"], *item["row"]] for item in input_data])
+        if raw_response is None:
+            return None
+
+        try:
+            rows = wire_format.parse_rows(raw_response["choices"][0]["message"]["content"])
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"❌ Failed to parse DeepSeek response: {e}")
+            return None
+        if rows is None:
+            print("❌ Failed to parse DeepSeek response.")
+            return None
+
+        results = []
+        for row in rows:
+            try:
+                results.append(decode(row))
+            except (IndexError, ValueError, TypeError):
+                print(f"⚠️ Skipping malformed entry, it will be retried: {row}")
+        return results
+
+    return call_batch
+
+
+def classify_independently(file_id, entry_ids=None):
+    """
+    AUDIT_MODE=independent: DeepSeek assigns its own priority (stored as the audit priority) to
+    structured leads without seeing GPT's, so it can run while GPT assigns priorities.
+    """
+    with app.app_context():
+        query = (
+            db.session.query(Lead, Entry)
+            .join(Entry, Entry.id == Lead.entry_id)
+            .filter(Lead.file_id == file_id, Lead.audit_AI_priority_level.is_(None))
+            .filter(Entry.stage.in_(("structured", "prioritised")))
+        )
+        if entry_ids is not None:
+            query = query.filter(Lead.entry_id.in_(entry_ids))
+        leads = query.all()
+
+    if not leads:
+        print(f"⚠️ No leads waiting for independent classification with file_id '{file_id}'.")
+        return True
+
+    print(f"Classifying {len(leads)} leads independently with DeepSeek for file_id '{file_id}'...")
+    if wire_format.enabled():
+        input_data = [lead_row(lead, entry) for lead, entry in leads]
+        call_batch = call_deepseek_rows_batch(COMPACT_CLASSIFY_PROMPT, decode_classification_row)
+        prompt, output_tokens = COMPACT_CLASSIFY_PROMPT, COMPACT_OUTPUT_TOKENS_PER_CLASSIFICATION
+    else:
+        input_data = [lead_input(lead, entry) for lead, entry in leads]
+        call_batch = call_deepseek_json_batch(CLASSIFY_PROMPT, ("deepseek_priority_level",))
+        prompt, output_tokens = CLASSIFY_PROMPT, OUTPUT_TOKENS_PER_CLASSIFICATION
+
+    results = run_stage_batches(
+        "classification", input_data, call_batch, provider="deepseek", model=MODEL, prompt=prompt,
+        output_tokens=output_tokens, validate=lambda result: result["deepseek_priority_level"] in PRIORITY_LEVELS,
+    )
+    classified = [
+        (lead.id, result["deepseek_priority_level"])
+        for (lead, entry), result in match_results(leads, results, key=lambda row: row[0].entry_id)
+    ]
+
+    def write_chunk(chunk):
+        bulk_update(Lead, [{"id": lead_id, "audit_AI_priority_level": level} for lead_id, level in chunk])
+
+    with app.app_context():
+        write_in_chunks(classified, write_chunk)
+
+    if len(classified) != len(leads):
+        print(f"⚠️ {len(leads) - len(classified)} leads were not classified by DeepSeek and wait for a resume.")
+        return False
 
-    print(f"\n✅ DeepSeek audit completed for file_id '{file_id}' with {overall_accuracy:.2f}% model accuracy.")
     return True
 
 
+def score_independent_audit(file_id, entry_ids=None):
+    """
+    AUDIT_MODE=independent: scores GPT's priority against DeepSeek's locally with AUDIT_SCORE_MATRIX
+    and, if AUDIT_DISAGREEMENT_NOTES is on, asks DeepSeek to explain only the disagreements.
+    """
+    # Leads whose classification did not finish alongside the priority stage (e.g. on a resume).
+    classified = classify_independently(file_id, entry_ids)
+
+    waiting = get_leads_for_deepseek(file_id, entry_ids, stage="prioritised")
+    leads = [(lead, entry) for lead, entry in waiting if lead.audit_AI_priority_level is not None]
+    unlabeled = len(waiting) - len(leads)
+    if not leads:
+        if unlabeled:
+            print(f"⚠️ {unlabeled} leads of file_id '{file_id}' have no DeepSeek priority and stay prioritised "
+                  f"for a resume.")
+        else:
+            print(f"⚠️ No leads waiting for audit with file_id '{file_id}'.")
+        return False
+
+    matrix = config.AUDIT_SCORE_MATRIX
+    disagreements = [(lead, entry) for lead, entry in leads
+                     if lead.leads_AI_priority_level != lead.audit_AI_priority_level]
+    notes = {}
+
+    if disagreements and config.AUDIT_DISAGREEMENT_NOTES:
+        if wire_format.enabled():
+            input_data = [
+                lead_row(lead, entry, priority_code(lead.leads_AI_priority_level),
+                         priority_code(lead.audit_AI_priority_level))
+                for lead, entry in disagreements
+            ]
+            call_batch, prompt = call_deepseek_rows_batch(COMPACT_NOTES_PROMPT, decode_note_row), COMPACT_NOTES_PROMPT
+        else:
+            input_data = [
+                {**lead_input(lead, entry), "gpt_priority_level": lead.leads_AI_priority_level,
+                 "deepseek_priority_level": lead.audit_AI_priority_level}
+                for lead, entry in disagreements
+            ]
+            call_batch, prompt = call_deepseek_json_batch(NOTES_PROMPT, ("deepseek_notes",)), NOTES_PROMPT
+
+        results = run_stage_batches("audit_notes", input_data, call_batch, provider="deepseek", model=MODEL,
+                                    prompt=prompt, output_tokens=OUTPUT_TOKENS_PER_NOTE)
+        # A disagreement without a note is still scored; the score does not depend on it.
+        notes = {entry_id: result["deepseek_notes"] or None for entry_id, result in results.items()}
+
+    scored = [
+        (lead.id, lead.entry_id, matrix[lead.leads_AI_priority_level][lead.audit_AI_priority_level],
+         notes.get(lead.entry_id))
+        for lead, entry in leads
+    ]
+
+    def write_chunk(chunk):
+        bulk_update(Lead, [{"id": lead_id, "audit_AI_notes": note, "audit_accuracy_score": score,
+                            "audit_status": "audited"} for lead_id, entry_id, score, note in chunk])
+        mark_stage([entry_id for lead_id, entry_id, score, note in chunk], "audited")
+
+    with app.app_context():
+        write_in_chunks(scored, write_chunk)
+
+    overall_accuracy = sum(score for lead_id, entry_id, score, note in scored) / len(scored)
+    print(f"\n✅ DeepSeek audit completed for file_id '{file_id}' with {overall_accuracy:.2f}% model accuracy "
+          f"({len(disagreements)} disagreements).")
+
+    if unlabeled:
+        print(f"⚠️ {unlabeled} leads have no DeepSeek priority and stay prioritised for a resume.")
+    return classified and not unlabeled
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         file_id = sys.argv[1]
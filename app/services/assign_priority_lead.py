@@ -1,127 +1,217 @@
 import sys
 import os
 import json
-from openai import OpenAI
 from sqlalchemy import text
 
-from app import create_app
+from app import get_app
 from app.database import db
 from models.lead_model import Lead
+from models.entry_model import Entry
 from app.config import config
 from sqlalchemy.orm.attributes import flag_modified
-
-app = create_app()
-client = OpenAI(api_key=config.OPENAI_API_KEY)
-
-
-def get_leads_by_file(file_id):
+from app.services.batching import run_stage_batches
+from app.services import wire_format
+from app.services.providers import openai_chat
+from app.services.checkpoints import mark_stage
+from app.services.bulk_write import bulk_update, match_results, write_in_chunks
+
+app = get_app()
+
+MODEL = "gpt-4o-2024-08-06"
+# {"entry_id": ..., "priority_level": "..."} per lead
+OUTPUT_TOKENS_PER_LEAD = 20
+
+PRIORITY_PROMPT = (
+    "You are an AI responsible for determining lead priority levels. "
+    "Each lead has structured data, including company name, industry, budget, revenue, "
+    "growth goals, urgency, and lead sentiment. "
+    "Assign a priority level based on overall lead potential:\n\n"
+    "- 'Urgent': Critical business need, high budget, immediate action required.\n"
+    "- 'High': Strong growth potential, clear budget, and serious interest.\n"
+    "- 'Medium': Business shows interest but lacks strong urgency or budget.\n"
+    "- 'Low': Weak interest, unclear goals, or very low budget.\n\n"
+    "Ensure each lead gets exactly one of these four priority levels."
+)
+
+# COMPACT_WIRE_FORMAT: a row per lead and {"i": id, "p": code} per answer.
+COMPACT_PRIORITY_PROMPT = (
+    PRIORITY_PROMPT + "\n\n"
+    "Each input row is a JSON array: [id, industry, business model, budget, monthly revenue, monthly growth goal, "
+    "urgency, sentiment]. Values missing at the end of a row are unknown. Urgency is U (Urgent), H (High), "
+    "M (Medium) or L (Low); sentiment is H (Hot), N (Neutral) or C (Cold).\n"
+    "Answer with one {'i': id, 'p': priority} per row, where p is U (Urgent), H (High), M (Medium) or L (Low)."
+)
+COMPACT_OUTPUT_TOKENS_PER_LEAD = 8
+
+
+def get_leads_by_file(file_id, entry_ids=None, stage=None):
     with app.app_context():
-        return db.session.query(Lead).filter_by(file_id=file_id).all()
+        query = db.session.query(Lead).filter_by(file_id=file_id)
+        if stage:
+            query = query.join(Entry, Entry.id == Lead.entry_id).filter(Entry.stage == stage)
+        if entry_ids is not None:
+            query = query.filter(Lead.entry_id.in_(entry_ids))
+        return query.all()
 
 
 def assign_priorities(leads):
     if not leads:
-        return []
-
-    prompt = (
-        "You are an AI responsible for determining lead priority levels. "
-        "Each lead has structured data, including company name, industry, budget, revenue, "
-        "growth goals, urgency, and lead sentiment. "
-        "Assign a priority level based on overall lead potential:\n\n"
-        "- 'Urgent': Critical business need, high budget, immediate action required.\n"
-        "- 'High': Strong growth potential, clear budget, and serious interest.\n"
-        "- 'Medium': Business shows interest but lacks strong urgency or budget.\n"
-        "- 'Low': Weak interest, unclear goals, or very low budget.\n\n"
-        "Ensure each lead gets exactly one of these four priority levels."
-    )
+        return {}
 
-    input_data = [
-        {"entry_id": lead.entry_id, "industry": lead.industry, "model": lead.business_model, "budget": lead.budget,
-         "revenue": lead.revenue, "growth_goal": lead.growth_goal,
-         "urgency": lead.urgency, "lead_sentiment": lead.lead_sentiment}
-        for lead in leads]
+    if wire_format.enabled():
+        input_data = [{"entry_id": lead.entry_id, "row": priority_row(lead)} for lead in leads]
+        call_batch, prompt, output_tokens = (assign_priorities_compact_batch, COMPACT_PRIORITY_PROMPT,
+                                             COMPACT_OUTPUT_TOKENS_PER_LEAD)
+    else:
+        input_data = [
+            {"entry_id": lead.entry_id, "industry": lead.industry, "model": lead.business_model, "budget": lead.budget,
+             "revenue": lead.revenue, "growth_goal": lead.growth_goal,
+             "urgency": lead.urgency, "lead_sentiment": lead.lead_sentiment}
+            for lead in leads]
+        call_batch, prompt, output_tokens = assign_priorities_batch, PRIORITY_PROMPT, OUTPUT_TOKENS_PER_LEAD
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": json.dumps(input_data)}
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "priority_assignment",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "priorities": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "entry_id": {"type": "integer"},
-                                        "priority_level": {
-                                            "type": "string",
-                                            "enum": ["Urgent", "High", "Medium", "Low"]
-                                        }
-                                    },
-                                    "required": ["entry_id", "priority_level"],
-                                    "additionalProperties": False
-                                }
+        priorities = run_stage_batches("priority", input_data, call_batch, provider="openai",
+                                       model=MODEL, prompt=prompt, output_tokens=output_tokens,
+                                       id_key="entry_id")
+        return priorities or {}
+    except Exception as e:
+        print(f"❌ OpenAI API Error: {e}")
+        return {}
+
+
+def assign_priorities_batch(input_data):
+    response = openai_chat(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": PRIORITY_PROMPT},
+            {"role": "user", "content": json.dumps(input_data)}
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "priority_assignment",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "priorities": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "entry_id": {"type": "integer"},
+                                    "priority_level": {
+                                        "type": "string",
+                                        "enum": ["Urgent", "High", "Medium", "Low"]
+                                    }
+                                },
+                                "required": ["entry_id", "priority_level"],
+                                "additionalProperties": False
                             }
-                        },
-                        "required": ["priorities"],
-                        "additionalProperties": False
+                        }
                     },
-                    "strict": True
-                }
-            },
-            temperature=0.0
-        )
-
-        structured_output = json.loads(response.choices[0].message.content)
-
-        if "priorities" not in structured_output:
-            raise ValueError("❌ OpenAI Response Missing 'priorities' Key!")
+                    "required": ["priorities"],
+                    "additionalProperties": False
+                },
+                "strict": True
+            }
+        },
+        temperature=0.0
+    )
 
-        return structured_output["priorities"]
+    structured_output = json.loads(response.choices[0].message.content)
+
+    if "priorities" not in structured_output:
+        raise ValueError("❌ OpenAI Response Missing 'priorities' Key!")
+
+    return structured_output["priorities"]
+
+
+def priority_row(lead):
+    # Without the entry id, which the batch caller puts in front, so the result cache key stays per content.
+    return wire_format.row(lead.industry, lead.business_model, lead.budget, lead.revenue,
+                           lead.growth_goal, wire_format.code(wire_format.PRIORITY_CODES, lead.urgency),
+                           wire_format.code(wire_format.SENTIMENT_CODES, lead.lead_sentiment))
+
+
+def assign_priorities_compact_batch(input_data):
+    response = openai_chat(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": COMPACT_PRIORITY_PROMPT},
+            {"role": "user", "content": wire_format.dumps([[item["entry_id"], *item["row"]] for item in input_data])}
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "priority_codes",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "p": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "i": {"type": "integer"},
+                                    "p": {"type": "string", "enum": list(wire_format.PRIORITY_LEVELS)}
+                                },
+                                "required": ["i", "p"],
+                                "additionalProperties": False
+                            }
+                        }
+                    },
+                    "required": ["p"],
+                    "additionalProperties": False
+                },
+                "strict": True
+            }
+        },
+        temperature=0.0
+    )
 
-    except Exception as e:
-        print(f"❌ OpenAI API Error: {e}")
-        return []
+    answers = json.loads(response.choices[0].message.content)["p"]
+    return [{"entry_id": answer["i"], "priority_level": wire_format.PRIORITY_LEVELS[answer["p"]]}
+            for answer in answers]
 
 
-def process_priority_assignment(file_id):
+def process_priority_assignment(file_id, entry_ids=None):
     with app.app_context():
-        leads = get_leads_by_file(file_id)
+        leads = get_leads_by_file(file_id, entry_ids, stage="structured")
 
         if not leads:
-            print(f"⚠️ No leads found for file_id '{file_id}'. Skipping priority assignment.")
+            print(f"⚠️ No leads waiting for priority assignment for file_id '{file_id}'. Skipping.")
             return False
 
         print(f"Assigning priorities for {len(leads)} success-flagged leads from file_id '{file_id}'...")
 
         priorities = assign_priorities(leads)
 
-        if not priorities or len(priorities) != len(leads):
-            print(
-                f"❌ Error: Mismatch in response length for file_id '{file_id}'! Expected {len(leads)}, got {len(priorities)}")
+        if not priorities:
+            print(f"❌ Error: No priorities returned for file_id '{file_id}'!")
             return False
 
-        try:
-            for lead, priority in zip(leads, priorities):
-                priority_level = priority["priority_level"]
+        # Plain values, so leads expired by a chunk commit are not reloaded one by one.
+        prioritised = [
+            (lead.id, lead.entry_id, priority["priority_level"])
+            for lead, priority in match_results(leads, priorities, key=lambda lead: lead.entry_id)
+        ]
 
-                lead.leads_AI_priority_level = priority_level
-                db.session.add(lead)
+        def write_chunk(chunk):
+            bulk_update(Lead, [{"id": lead_id, "leads_AI_priority_level": level} for lead_id, entry_id, level in chunk])
+            mark_stage([entry_id for lead_id, entry_id, level in chunk], "prioritised")
 
-            db.session.commit()
+        try:
+            write_in_chunks(prioritised, write_chunk)
             print("✅ Priorities updated in the database! (Leads AI)")
 
         except Exception as e:
-            db.session.rollback()
             print(f"❌ Commit failed: {e}")
+            return False
+
+    if len(prioritised) != len(leads):
+        print(f"⚠️ Expected {len(leads)} priorities, got {len(prioritised)}. The rest stay structured for a resume.")
+        return False
 
     return True
 
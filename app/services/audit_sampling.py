@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import math
+import zlib
+from statistics import NormalDist
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import case, func
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.lead_model import Lead
+from models.entry_model import Entry
+from app.services.bulk_write import bulk_update, write_in_chunks
+from app.services.checkpoints import mark_stage
+from app.services.assign_priority_audit import audit_leads, get_leads_for_deepseek
+
+app = get_app()
+
+# AUDIT_MODE=sample: DeepSeek reviews a stratified sample of each file, one stratum per GPT priority
+# level, and the file's accuracy and disagreement rate are estimated from it with confidence intervals.
+# Leads outside the sample are marked audit_status "unaudited". When the estimated disagreement rate
+# exceeds AUDIT_ESCALATION_THRESHOLD the unaudited leads are audited as well, and so are later chunks.
+# Sample sizes are topped up against the file's running totals, so streaming chunks end up with the
+# same sample as a barrier run.
+OBSERVED = ("sampled", "audited")
+
+
+def stratum_sample_size(size):
+    return min(size, max(config.AUDIT_SAMPLE_MIN_PER_LEVEL, math.ceil(size * config.AUDIT_SAMPLE_RATE)))
+
+
+def sample_order(row):
+    # Stable pseudo-random order, so a resume or a rerun picks the same leads.
+    return zlib.crc32(str(row[0].entry_id).encode("utf-8"))
+
+
+def stratified_sample(file_id, leads):
+    """Splits (lead, entry) rows into (sample, rest), topping up each priority level's sample for the file."""
+    levels = (audit_report(file_id).get(file_id) or {}).get("levels", {})
+    strata = {}
+    for row in leads:
+        strata.setdefault(row[0].leads_AI_priority_level, []).append(row)
+
+    sample, rest = [], []
+    for level, rows in strata.items():
+        seen = levels.get(str(level), {"leads": 0, "audited": 0})
+        wanted = stratum_sample_size(seen["leads"] + len(rows)) - seen["audited"]
+        rows.sort(key=sample_order)
+        sample.extend(rows[:max(wanted, 0)])
+        rest.extend(rows[max(wanted, 0):])
+    return sample, rest
+
+
+def mark_unaudited(rows):
+    def write_chunk(chunk):
+        bulk_update(Lead, [{"id": lead.id, "audit_status": "unaudited"} for lead, entry in chunk])
+        mark_stage([lead.entry_id for lead, entry in chunk], "audited")
+
+    with app.app_context():
+        write_in_chunks(rows, write_chunk)
+
+
+def get_unaudited_leads(file_id):
+    with app.app_context():
+        return (
+            db.session.query(Lead, Entry)
+            .join(Entry, Entry.id == Lead.entry_id)
+            .filter(Lead.file_id == file_id, Lead.audit_status == "unaudited")
+            .all()
+        )
+
+
+def should_escalate(report):
+    return bool(report) and report["disagreement_rate"] is not None and \
+        report["disagreement_rate"]["estimate"] > config.AUDIT_ESCALATION_THRESHOLD
+
+
+def audit_all(rows, status="audited"):
+    """Audits every row; True if all of them got a result."""
+    audited = audit_leads(rows, status)
+    return audited is not None and len(audited) == len(rows)
+
+
+def process_sampled_audit(file_id, entry_ids=None):
+    leads = get_leads_for_deepseek(file_id, entry_ids, stage="prioritised")
+    report = audit_report(file_id).get(file_id)
+
+    if not leads and not (should_escalate(report) and report["unaudited"]):
+        print(f"⚠️ No leads waiting for audit with file_id '{file_id}'.")
+        return False
+
+    complete = True
+    if leads and should_escalate(report):
+        print(f"Auditing all {len(leads)} leads of file_id '{file_id}' (audit escalated)...")
+        complete = audit_all(leads)
+    elif leads:
+        sample, rest = stratified_sample(file_id, leads)
+        print(f"Auditing a sample of {len(sample)} of {len(leads)} leads from file_id '{file_id}'...")
+        if sample:
+            complete = audit_all(sample, "sampled")
+        mark_unaudited(rest)
+        report = audit_report(file_id).get(file_id)
+
+        if should_escalate(report):
+            rate = report["disagreement_rate"]["estimate"]
+            print(f"⚠️ Estimated disagreement {rate:.1%} is above {config.AUDIT_ESCALATION_THRESHOLD:.1%}; "
+                  f"escalating to a full audit of file_id '{file_id}'.")
+
+    if should_escalate(report) and report["unaudited"]:
+        unaudited = get_unaudited_leads(file_id)
+        complete = audit_all(unaudited) and complete
+
+    report = audit_report(file_id).get(file_id)
+    if report and report["accuracy"]:
+        accuracy = report["accuracy"]
+        print(f"\n✅ DeepSeek audit completed for file_id '{file_id}' with {accuracy['estimate']:.2f}% model accuracy "
+              f"({accuracy['low']:.2f}-{accuracy['high']:.2f}% at {report['confidence']:.0%} confidence, "
+              f"{report['audited']} of {report['leads']} leads audited).")
+
+    if not complete:
+        print("⚠️ Some leads were not audited; sampled leads stay prioritised for a resume.")
+    return complete
+
+
+def stratified_estimate(strata, confidence):
+    """
+    Mean of a population from stratified samples, with a normal-approximation confidence interval
+    and the finite population correction. strata is [(leads, sampled, sum, sum of squares)]; levels
+    without a sampled lead are left out. Returns {"estimate", "low", "high"}, or None without samples.
+    """
+    observed = [stratum for stratum in strata if stratum[1]]
+    covered = sum(size for size, sampled, total, squares in observed)
+    if not covered:
+        return None
+
+    mean = variance = 0.0
+    for size, sampled, total, squares in observed:
+        weight = size / covered
+        stratum_mean = total / sampled
+        spread = max(squares - sampled * stratum_mean ** 2, 0.0) / (sampled - 1) if sampled > 1 else 0.0
+        mean += weight * stratum_mean
+        variance += weight ** 2 * (1 - sampled / size) * spread / sampled
+
+    margin = NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(variance)
+    return {"estimate": round(mean, 4), "low": round(mean - margin, 4), "high": round(mean + margin, 4)}
+
+
+def audit_report(file_id=None):
+    """
+    Per file that reached the audit: leads, leads audited (sampled or in full) and unaudited, the
+    estimated accuracy score and GPT/DeepSeek disagreement rate with their confidence intervals, and
+    the same per GPT priority level.
+    """
+    disagreement = case((Lead.audit_AI_priority_level != Lead.leads_AI_priority_level, 1), else_=0)
+    observed = Lead.audit_status.in_(OBSERVED)
+
+    with app.app_context():
+        query = (
+            db.session.query(
+                Lead.file_id, Lead.leads_AI_priority_level, func.count(Lead.id),
+                func.sum(case((observed, 1), else_=0)),
+                func.coalesce(func.sum(Lead.audit_accuracy_score), 0.0),
+                func.coalesce(func.sum(Lead.audit_accuracy_score * Lead.audit_accuracy_score), 0.0),
+                func.sum(case((observed, disagreement), else_=0)),
+            )
+            .filter(Lead.audit_status.isnot(None))
+            .group_by(Lead.file_id, Lead.leads_AI_priority_level)
+        )
+        if file_id:
+            query = query.filter(Lead.file_id == file_id)
+        rows = query.all()
+
+    files = {}
+    for row_file_id, level, leads, audited, score_sum, score_squares, disagreements in rows:
+        files.setdefault(row_file_id, []).append((level, leads, audited, score_sum, score_squares, disagreements))
+
+    report = {}
+    for report_file_id, strata in files.items():
+        leads = sum(stratum[1] for stratum in strata)
+        audited = sum(stratum[2] for stratum in strata)
+        report[report_file_id] = {
+            "leads": leads,
+            "audited": audited,
+            "unaudited": leads - audited,
+            "confidence": config.AUDIT_CONFIDENCE,
+            "accuracy": stratified_estimate([(size, sampled, total, squares)
+                                             for level, size, sampled, total, squares, d in strata],
+                                            config.AUDIT_CONFIDENCE),
+            # Disagreement is 0 or 1 per lead, so its sum is also its sum of squares.
+            "disagreement_rate": stratified_estimate([(size, sampled, d, d)
+                                                      for level, size, sampled, total, squares, d in strata],
+                                                     config.AUDIT_CONFIDENCE),
+            "levels": {
+                str(level): {
+                    "leads": size,
+                    "audited": sampled,
+                    "mean_accuracy": round(total / sampled, 2) if sampled else None,
+                    "disagreement_rate": round(d / sampled, 4) if sampled else None,
+                }
+                for level, size, sampled, total, squares, d in strata
+            },
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # python app/services/audit_sampling.py [file_id]
+    print(json.dumps(audit_report(sys.argv[1] if len(sys.argv) > 1 else None), indent=4))
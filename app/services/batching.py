@@ -0,0 +1,143 @@
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.config import config
+from app.services import metrics
+from app.services.result_cache import result_cache
+from app.services.token_planner import plan_batches
+from app.services.checkpoints import record_attempts
+
+_provider_slots = {}
+_provider_slots_lock = threading.Lock()
+
+
+def max_in_flight(provider):
+    return max(1, getattr(config, f"{provider.upper()}_MAX_IN_FLIGHT", 1))
+
+
+def provider_slot(provider):
+    """Process-wide semaphore limiting open requests per provider, shared by every stage."""
+    with _provider_slots_lock:
+        if provider not in _provider_slots:
+            _provider_slots[provider] = threading.BoundedSemaphore(max_in_flight(provider))
+        return _provider_slots[provider]
+
+
+def chunk(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class BatchResults(dict):
+    """
+    Results merged by id. attempts holds the number of requests each id needed when it took
+    more than one; unresolved lists the ids still missing after every retry.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = {}
+        self.unresolved = []
+
+
+def run_batches(batches, call_batch, provider, id_key="id", validate=None, on_results=None):
+    """
+    Runs call_batch(batch) for every batch with at most max_in_flight(provider) requests open at once.
+
+    call_batch returns a list of result dicts carrying id_key, or None if the batch failed.
+    Results are merged by id as batches complete, so their order does not matter. Results whose
+    id was not in the batch, or that fail validate(result), are discarded.
+
+    When a batch fails or comes back short, only the missing ids are retried: split in halves
+    recursively down to single items, until an id has been sent BATCH_MAX_ATTEMPTS times.
+    on_results(batch, valid_results) is called for every request that returned usable results.
+    Ids that never resolve are left out of the results so callers can leave them for a resume.
+    """
+    results = BatchResults()
+    if not batches:
+        return results
+
+    slot = provider_slot(provider)
+    attempts = {}
+    attempts_lock = threading.Lock()
+
+    def attempt(batch):
+        with attempts_lock:
+            for item in batch:
+                attempts[item[id_key]] = attempts.get(item[id_key], 0) + 1
+
+        metrics.record_batch(len(batch))
+        with slot:
+            try:
+                returned = call_batch(batch)
+            except Exception as e:
+                print(f"❌ Batch of {len(batch)} failed ({provider}): {e}")
+                returned = None
+
+        expected = {item[id_key] for item in batch}
+        valid = {}
+        for result in returned or []:
+            if isinstance(result, dict) and result.get(id_key) in expected:
+                if validate is None or validate(result):
+                    valid[result[id_key]] = result
+
+        if valid and on_results:
+            on_results(batch, valid)
+        return valid
+
+    def resolve(batch):
+        valid = attempt(batch)
+        retry = [item for item in batch
+                 if item[id_key] not in valid and attempts[item[id_key]] < config.BATCH_MAX_ATTEMPTS]
+
+        if retry:
+            metrics.record_batch_retry(len(retry))
+            print(f"🔁 Retrying {len(retry)}/{len(batch)} items ({provider}).")
+            half = (len(retry) + 1) // 2
+            for part in (retry[:half], retry[half:]):
+                if part:
+                    valid.update(resolve(part))
+
+        return valid
+
+    workers = min(len(batches), max_in_flight(provider))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{provider}-batch") as pool:
+        # Each worker gets a copy of the caller's context so its requests are counted against this file and stage.
+        futures = [pool.submit(contextvars.copy_context().run, resolve, batch) for batch in batches]
+
+        for future in as_completed(futures):
+            results.update(future.result())
+
+    results.attempts = {item_id: count for item_id, count in attempts.items() if count > 1}
+    results.unresolved = [item_id for item_id in attempts if item_id not in results]
+    return results
+
+
+def run_stage_batches(stage, items, call_batch, provider, model, prompt, output_tokens, id_key="id", validate=None):
+    """
+    Serves what it can from the result cache, packs the remaining items into token-budgeted
+    batches and runs them concurrently. Every valid result is cached as soon as it returns,
+    and entries that needed retries are recorded against the stage.
+    """
+    cached = result_cache.lookup(stage, model, prompt, items, id_key)
+    pending = [item for item in items if item[id_key] not in cached]
+    if config.LLM_CACHE_ENABLED:
+        metrics.record_cache(stage, len(cached), len(pending))
+
+    if cached:
+        print(f"♻️ {len(cached)}/{len(items)} {stage} results served from cache.")
+
+    def cache_results(batch, valid_results):
+        result_cache.store(stage, model, prompt, batch, valid_results, id_key)
+
+    batches = plan_batches(pending, model, prompt, output_tokens)
+    with metrics.scope(stage=stage):
+        results = run_batches(batches, call_batch, provider, id_key, validate=validate, on_results=cache_results)
+
+    if results.attempts or results.unresolved:
+        print(f"🔁 {stage}: {len(results.attempts)} entries needed retries, {len(results.unresolved)} unresolved.")
+        record_attempts(stage, results.attempts, results.unresolved)
+
+    results.update(cached)
+    return results
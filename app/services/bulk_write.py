@@ -0,0 +1,40 @@
+from sqlalchemy import insert, update
+
+from app.config import config
+from app.database import db
+
+
+def match_results(items, results, key):
+    """Pairs each item with its result by id in one pass; items without a result are left out."""
+    return [(item, results[key(item)]) for item in items if key(item) in results]
+
+
+def bulk_insert(model, rows):
+    """Inserts plain dict rows with a single executemany in the caller's transaction."""
+    if rows:
+        db.session.execute(insert(model), rows)
+
+
+def bulk_update(model, mappings):
+    """Updates rows by primary key (each mapping carries "id") with a single executemany in the caller's transaction."""
+    if mappings:
+        db.session.execute(update(model), mappings)
+
+
+def write_in_chunks(items, write_chunk, chunk_size=None):
+    """
+    Calls write_chunk(chunk) for consecutive chunks of items and commits after each one, so a
+    chunk's results and its stage checkpoint land together. A failing chunk is rolled back and
+    re-raised; chunks committed before it stay done. Runs in the caller's app context.
+    """
+    chunk_size = chunk_size or config.WRITE_CHUNK_SIZE
+
+    for i in range(0, len(items), chunk_size):
+        try:
+            write_chunk(items[i:i + chunk_size])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return len(items)
@@ -0,0 +1,45 @@
+from sqlalchemy import and_, func, or_
+
+from app import get_app
+from app.database import db
+from models.entry_model import Entry
+from models.batch_attempt_model import BatchAttempt
+
+app = get_app()
+
+ID_CHUNK_SIZE = 500
+
+
+def mark_stage(entry_ids, stage):
+    """Records that the entries finished a stage. Runs in the caller's app context and transaction."""
+    entry_ids = list(entry_ids)
+    for i in range(0, len(entry_ids), ID_CHUNK_SIZE):
+        db.session.query(Entry).filter(Entry.id.in_(entry_ids[i:i + ID_CHUNK_SIZE])).update(
+            {"stage": stage}, synchronize_session=False)
+
+
+def unfinished_entries(file_id):
+    """Returns {stage: count} for entries of the file that still have stages to run."""
+    rows = (
+        db.session.query(Entry.stage, func.count(Entry.id))
+        .filter(Entry.file_id == file_id)
+        .filter(or_(Entry.stage == "pending", and_(Entry.status == "success", Entry.stage != "audited")))
+        .group_by(Entry.stage)
+        .all()
+    )
+    return {stage: count for stage, count in rows}
+
+
+def record_attempts(stage, attempts, unresolved):
+    """Stores how many requests each retried entry needed, and which entries never resolved."""
+    unresolved = set(unresolved)
+    with app.app_context():
+        db.session.add_all([
+            BatchAttempt(entry_id=entry_id, stage=stage, attempts=count, resolved=entry_id not in unresolved)
+            for entry_id, count in attempts.items()
+        ])
+        db.session.add_all([
+            BatchAttempt(entry_id=entry_id, stage=stage, attempts=1, resolved=False)
+            for entry_id in unresolved if entry_id not in attempts
+        ])
+        db.session.commit()
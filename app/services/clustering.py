@@ -0,0 +1,307 @@
+import os
+import re
+import sys
+import json
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+try:
+    import numpy as np
+except ImportError:  # Without NumPy only entries that are identical after normalization are clustered.
+    np = None
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.entry_model import ENTRY_STAGES, Entry
+from models.lead_model import Lead
+from models.edge_case_model import EdgeCase
+from app.services.bulk_write import bulk_insert, bulk_update, write_in_chunks
+from app.services.prefilter import normalize
+from app.services.token_planner import estimate_tokens, plan_batches
+
+app = get_app()
+
+SHINGLE_SIZE = 5
+NUM_PERM = 96
+# 16 bands of 6 rows: pairs at 0.8 similarity share a band 99% of the time, unrelated texts almost never.
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIGNATURE_CHUNK = 1000
+# Representatives kept per bucket. Form templates put thousands of texts in the same buckets; a
+# near-duplicate shares several bands with its representative, so a capped bucket rarely hides it.
+MAX_BUCKET_SIZE = 10
+# Lead columns filled by the structuring stage, copied from a representative's lead to members with the same
+# cluster_key. Reworded near-duplicates can name another company or budget, so they are structured themselves.
+STRUCTURED_FIELDS = (
+    "company_name", "industry", "business_model", "budget", "revenue", "growth_goal", "urgency",
+    "lead_sentiment", "additional_notes",
+)
+
+
+def cluster_key(text):
+    """The text without case, whitespace and punctuation differences."""
+    return " ".join(re.sub(r"[^\w\s]", " ", normalize(text)).split())
+
+
+def minhash_signatures(texts):
+    """(len(texts), NUM_PERM) MinHash signatures over the character 5-grams of each text."""
+    rng = np.random.default_rng(42)
+    multipliers = rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+    # Base 257 keeps every 5-byte shingle distinct.
+    powers = np.array([257 ** k for k in range(SHINGLE_SIZE)], dtype=np.uint64)
+    shift = np.uint64(32)
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+
+    for start in range(0, len(texts), SIGNATURE_CHUNK):
+        encoded = [text.encode().ljust(SHINGLE_SIZE) for text in texts[start:start + SIGNATURE_CHUNK]]
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        lengths = np.array([len(text) for text in encoded])
+        counts = lengths - SHINGLE_SIZE + 1
+
+        # Shingles starting in one text and ending in the next are skipped.
+        windows = len(data) - SHINGLE_SIZE + 1
+        shingles = sum(data[k:k + windows] * powers[k] for k in range(SHINGLE_SIZE))
+        text_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        bounds = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        shingles = shingles[np.repeat(text_starts - bounds, counts) + np.arange(counts.sum())]
+
+        # Multiply-shift hashing: the high 32 bits of a * x + b act as one random permutation.
+        for perm in range(NUM_PERM):
+            hashed = ((shingles * multipliers[perm] + offsets[perm]) >> shift).astype(np.uint32)
+            signatures[start:start + len(encoded), perm] = np.minimum.reduceat(hashed, bounds)
+
+    return signatures
+
+
+def band_keys(signatures):
+    """One hash per LSH band per text, as BANDS lists of ints."""
+    mix = np.random.default_rng(7).integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+    return [
+        (signatures[:, band * ROWS:(band + 1) * ROWS].astype(np.uint64) * mix).sum(axis=1).tolist()
+        for band in range(BANDS)
+    ]
+
+
+def find_clusters(ids, texts, threshold=None):
+    """
+    Returns {id: representative id} for every text that duplicates an earlier one. Texts are taken
+    in order and each joins the most similar earlier representative at or above the threshold, so
+    every member is close to its representative itself rather than through a chain of others.
+    """
+    threshold = threshold or config.CLUSTERING_THRESHOLD
+    duplicate_of = {}
+    first_by_key = {}
+    unique_ids = []
+    unique_texts = []
+
+    # Texts that only differ in case, whitespace or punctuation never need a signature.
+    for entry_id, text in zip(ids, texts):
+        key = cluster_key(text)
+        if key in first_by_key:
+            duplicate_of[entry_id] = first_by_key[key]
+        else:
+            first_by_key[key] = entry_id
+            unique_ids.append(entry_id)
+            unique_texts.append(key)
+
+    if np is None or len(unique_ids) < 2:
+        return duplicate_of
+
+    signatures = minhash_signatures(unique_texts)
+    keys = band_keys(signatures)
+    buckets = [{} for _ in range(BANDS)]
+    required = int(np.ceil(threshold * NUM_PERM))
+
+    for row, entry_id in enumerate(unique_ids):
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(buckets[band].get(keys[band][row], ()))
+
+        if candidates:
+            candidates = np.fromiter(candidates, dtype=np.int64)
+            matches = (signatures[candidates] == signatures[row]).sum(axis=1)
+            best = int(matches.argmax())
+            if matches[best] >= required:
+                duplicate_of[entry_id] = unique_ids[candidates[best]]
+                continue
+
+        for band in range(BANDS):
+            bucket = buckets[band].setdefault(keys[band][row], [])
+            if len(bucket) < MAX_BUCKET_SIZE:
+                bucket.append(row)
+
+    # Exact duplicates of a text that joined a cluster point at that cluster's representative.
+    return {
+        entry_id: duplicate_of.get(representative, representative) for entry_id, representative in duplicate_of.items()
+    }
+
+
+def cluster_entries(file_id):
+    """Links near-duplicate entries of a freshly ingested file to their representative. Returns the number linked."""
+    if not config.CLUSTERING_ENABLED:
+        return 0
+
+    started = time.monotonic()
+    with app.app_context():
+        if db.session.query(Entry.id).filter(Entry.file_id == file_id, Entry.duplicate_of.isnot(None)).first():
+            print(f"⚠️ file_id '{file_id}' is already clustered.")
+            return 0
+
+        rows = db.session.query(Entry.id, Entry.raw_input).filter(
+            Entry.file_id == file_id, Entry.stage == "pending").order_by(Entry.id).all()
+        duplicate_of = find_clusters([row.id for row in rows], [row.raw_input for row in rows])
+
+        def write_chunk(chunk):
+            bulk_update(Entry, [{"id": entry_id, "duplicate_of": representative} for entry_id, representative in chunk])
+
+        write_in_chunks(list(duplicate_of.items()), write_chunk)
+
+    elapsed = time.monotonic() - started
+    clusters = len(rows) - len(duplicate_of)
+    print(f"🔗 Clustered {len(rows)} entries of '{file_id}' into {clusters} in {elapsed:.2f}s; "
+          f"{len(duplicate_of)} near-duplicates will copy their representative's results.")
+    return len(duplicate_of)
+
+
+def representatives(entries):
+    """The entries the LLM stages should process; duplicates wait for their representative."""
+    return [entry for entry in entries if entry.duplicate_of is None]
+
+
+def structuring_entries(entries):
+    """
+    The entries structuring should send to the LLM: representatives and near-duplicates worded differently
+    from theirs. Members with their representative's cluster_key wait for its lead (fan_out_leads).
+    """
+    linked = sorted({entry.duplicate_of for entry in entries if entry.duplicate_of is not None})
+    sources = {}
+    with app.app_context():
+        for start in range(0, len(linked), config.WRITE_CHUNK_SIZE):
+            ids = linked[start:start + config.WRITE_CHUNK_SIZE]
+            sources.update(db.session.query(Entry.id, Entry.raw_input).filter(Entry.id.in_(ids)).all())
+
+    return [
+        entry for entry in entries
+        if entry.duplicate_of is None
+        or cluster_key(entry.raw_input) != cluster_key(sources.get(entry.duplicate_of, ""))
+    ]
+
+
+def fan_out_flags(file_id, entry_ids=None):
+    """Copies the flag (and edge case reason) of flagged representatives to their pending duplicates."""
+    representative = aliased(Entry)
+
+    with app.app_context():
+        query = (
+            db.session.query(Entry.id, Entry.raw_input, representative.status, EdgeCase.reason)
+            .join(representative, representative.id == Entry.duplicate_of)
+            .outerjoin(EdgeCase, EdgeCase.entry_id == representative.id)
+            .filter(Entry.file_id == file_id, Entry.stage == "pending", representative.stage != "pending")
+        )
+        if entry_ids is not None:
+            query = query.filter(Entry.id.in_(entry_ids))
+        members = list({row.id: row for row in query}.values())
+
+        def write_chunk(chunk):
+            bulk_update(Entry, [
+                {"id": row.id, "status": row.status, "stage": "flagged", "flag_source": "cluster"} for row in chunk
+            ])
+            bulk_insert(EdgeCase, [
+                {"entry_id": row.id, "file_id": file_id, "raw_input": row.raw_input, "reason": row.reason}
+                for row in chunk if row.status == "edge case"
+            ])
+
+        write_in_chunks(members, write_chunk)
+
+    if members:
+        print(f"🔗 Copied flags to {len(members)} near-duplicate entries.")
+    return len(members)
+
+
+def fan_out_leads(file_id, entry_ids=None):
+    """Copies the structured lead of each structured representative to its flagged 'success' exact duplicates."""
+    representative = aliased(Entry)
+
+    with app.app_context():
+        query = (
+            db.session.query(Entry.id, Entry.file_id, Entry.raw_input, representative.raw_input.label("source"),
+                             *[getattr(Lead, field) for field in STRUCTURED_FIELDS])
+            .join(representative, representative.id == Entry.duplicate_of)
+            .join(Lead, Lead.entry_id == representative.id)
+            .filter(Entry.status == "success", Entry.stage == "flagged")
+            .filter(representative.stage.in_(ENTRY_STAGES[ENTRY_STAGES.index("structured"):]))
+        )
+        if file_id:
+            query = query.filter(Entry.file_id == file_id)
+        if entry_ids is not None:
+            query = query.filter(Entry.id.in_(entry_ids))
+        exact = (row for row in query if cluster_key(row.raw_input) == cluster_key(row.source))
+        members = list({row.id: row for row in exact}.values())
+
+        def write_chunk(chunk):
+            bulk_insert(Lead, [
+                {"file_id": row.file_id, "entry_id": row.id, **dict(zip(STRUCTURED_FIELDS, row[4:]))} for row in chunk
+            ])
+            bulk_update(Entry, [{"id": row.id, "stage": "structured"} for row in chunk])
+
+        write_in_chunks(members, write_chunk)
+
+    if members:
+        print(f"🔗 Copied structured leads to {len(members)} duplicate entries.")
+    return len(members)
+
+
+def cluster_report(file_id=None):
+    """
+    Per file: entries, clusters, the cluster ratio (clusters / entries), the largest cluster, and
+    the flagging requests and input tokens the duplicates did not need.
+    """
+    from app.services.flag_entries import FLAGGING_PROMPT, MODEL, OUTPUT_TOKENS_PER_ENTRY
+
+    with app.app_context():
+        totals_query = db.session.query(Entry.file_id, func.count(Entry.id)).group_by(Entry.file_id)
+        members_query = db.session.query(Entry.file_id, Entry.duplicate_of, Entry.raw_input).filter(
+            Entry.duplicate_of.isnot(None))
+        if file_id:
+            totals_query = totals_query.filter(Entry.file_id == file_id)
+            members_query = members_query.filter(Entry.file_id == file_id)
+        totals = dict(totals_query.all())
+
+        files = {}
+        for member_file_id, representative_id, raw_input in members_query:
+            data = files.setdefault(member_file_id, {"sizes": {}, "items": []})
+            data["sizes"][representative_id] = data["sizes"].get(representative_id, 1) + 1
+            data["items"].append({"text": raw_input})
+
+    report = {}
+    for cluster_file_id, entries in totals.items():
+        data = files.get(cluster_file_id, {"sizes": {}, "items": []})
+        clusters = entries - len(data["items"])
+        report[cluster_file_id] = {
+            "entries": entries,
+            "clusters": clusters,
+            "cluster_ratio": round(clusters / entries, 4) if entries else 1.0,
+            "duplicates": len(data["items"]),
+            "largest_cluster": max(data["sizes"].values(), default=1),
+            "flagging_calls_saved": len(plan_batches(data["items"], MODEL, FLAGGING_PROMPT, OUTPUT_TOKENS_PER_ENTRY)),
+            "input_tokens_saved": sum(estimate_tokens(item) for item in data["items"]),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # python app/services/clustering.py report [file_id]
+    # python app/services/clustering.py cluster <file_id>   (files ingested before clustering existed)
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    argument = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if command == "cluster" and argument:
+        cluster_entries(argument)
+    else:
+        print(json.dumps(cluster_report(argument), indent=4))
@@ -0,0 +1,249 @@
+import os
+import csv
+import gzip
+import json
+import zlib
+import hashlib
+import logging
+
+from sqlalchemy import func
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Arrow downloads are optional; gzip CSV always works.
+    pa = None
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.entry_model import Entry
+from models.lead_model import Lead
+from app.services.pagination import LEAD_FIELDS
+
+app = get_app()
+
+OUTPUT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "output"))
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Cached download artifacts live in output/exports/<file_id>.<etag>.<extension>.
+EXPORT_FOLDER = os.path.join(OUTPUT_FOLDER, "exports")
+EXPORT_FORMATS = {
+    "parquet": {"extension": "parquet", "mimetype": "application/vnd.apache.parquet", "needs_pyarrow": True},
+    "arrow": {"extension": "arrow", "mimetype": "application/vnd.apache.arrow.file", "needs_pyarrow": True},
+    "csv.gz": {"extension": "csv.gz", "mimetype": "application/gzip", "needs_pyarrow": False},
+}
+# Bump when the artifact layout changes so cached files are rebuilt.
+EXPORT_SCHEMA_VERSION = 2
+NUMERIC_FIELDS = {"id": "int64", "entry_id": "int64", "audit_accuracy_score": "float64"}
+
+
+# Columns of the end-of-run JSON/CSV copies in output/, mapped to Lead fields.
+OUTPUT_COLUMNS = {
+    "Company Name": "company_name",
+    "Industry": "industry",
+    "Business Model": "business_model",
+    "Budget": "budget",
+    "Revenue": "revenue",
+    "Growth Goal": "growth_goal",
+    "Urgency": "urgency",
+    "Lead Sentiment": "lead_sentiment",
+    "Additional Notes": "additional_notes",
+    "DeepSeek Priority Level": "audit_AI_priority_level",
+    "Audit Status": "audit_status",
+}
+
+
+def save_leads_to_output(file_id):
+    """Writes output/<file_id>.json and .csv, streaming the leads from the database in batches."""
+    json_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.json")
+    csv_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.csv")
+    fields = list(OUTPUT_COLUMNS.values())
+
+    with app.app_context():
+        with open(json_path, "w", encoding="utf-8") as f:
+            rows = ({column: lead[field] for column, field in OUTPUT_COLUMNS.items()}
+                    for lead in iter_leads(file_id, fields))
+            for chunk in encode_rows(rows, "json"):
+                f.write(chunk.decode("utf-8"))
+
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(OUTPUT_COLUMNS.keys())
+            writer.writerows([lead[field] for field in fields] for lead in iter_leads(file_id, fields))
+
+    print(f"✅ Leads saved to: {json_path} and {csv_path}")
+
+
+def iter_leads(file_id, fields, batch_size=None):
+    """
+    Yields a file's leads as dicts of the requested fields, in the /get_leads order, fetching
+    batch_size rows per round trip so memory stays flat. Runs in the caller's app context.
+    """
+    columns = [getattr(Lead, field) for field in fields]
+    query = (
+        db.session.query(*columns)
+        .filter(Lead.file_id == file_id)
+        .order_by(Lead.audit_AI_priority_level.desc(), Lead.id.desc())
+        .yield_per(batch_size or config.EXPORT_YIELD_PER)
+    )
+
+    for record in query:
+        yield dict(zip(fields, record))
+
+
+def _json_array_parts(rows):
+    yield "["
+    for n, row in enumerate(rows):
+        yield ("," if n else "") + json.dumps(row)
+    yield "]"
+
+
+def encode_rows(rows, stream_format):
+    """Serializes rows as NDJSON lines or a single JSON array, in UTF-8 chunks of about STREAM_CHUNK_BYTES."""
+    if stream_format == "ndjson":
+        parts = (json.dumps(row) + "\n" for row in rows)
+    else:
+        parts = _json_array_parts(rows)
+
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Compresses a byte stream into one gzip member, flushing after every chunk so clients can decode as it arrives."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def available_export_formats():
+    return [name for name, spec in EXPORT_FORMATS.items() if pa is not None or not spec["needs_pyarrow"]]
+
+
+def export_etag(file_id, export_format):
+    """
+    Fingerprint of a file's leads, from the lead count, the highest lead id, the number of
+    entries at each stage and of leads per audit status. Leads are only inserted by structuring
+    and only updated as entries move through priority and audit, or when a sampled audit is
+    escalated, so any change to them changes one of these. Runs in the caller's app context.
+    """
+    lead_count, max_lead_id = (
+        db.session.query(func.count(Lead.id), func.max(Lead.id)).filter(Lead.file_id == file_id).one()
+    )
+    stages = [
+        [stage, count] for stage, count in db.session.query(Entry.stage, func.count(Entry.id))
+        .filter(Entry.file_id == file_id)
+        .group_by(Entry.stage)
+        .order_by(Entry.stage)
+    ]
+    audit_statuses = [
+        [status, count] for status, count in db.session.query(Lead.audit_status, func.count(Lead.id))
+        .filter(Lead.file_id == file_id)
+        .group_by(Lead.audit_status)
+        .order_by(Lead.audit_status)
+    ]
+    version = json.dumps([EXPORT_SCHEMA_VERSION, file_id, export_format, lead_count, max_lead_id, stages,
+                          audit_statuses])
+    return hashlib.sha256(version.encode("utf-8")).hexdigest()[:32]
+
+
+def export_path(file_id, export_format, etag):
+    return os.path.join(EXPORT_FOLDER, f"{file_id}.{etag}.{EXPORT_FORMATS[export_format]['extension']}")
+
+
+def get_export(file_id, export_format):
+    """
+    Returns (path, etag) of the file's export in export_format, building it only when the
+    leads changed since the cached artifact was written. Runs in the caller's app context.
+    """
+    etag = export_etag(file_id, export_format)
+    path = export_path(file_id, export_format, etag)
+
+    if not os.path.exists(path):
+        os.makedirs(EXPORT_FOLDER, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            rows = write_export(file_id, export_format, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        remove_stale_exports(file_id, export_format, path)
+        logging.info(f"Built {export_format} export for file_id {file_id}: {rows} leads")
+
+    return path, etag
+
+
+def remove_stale_exports(file_id, export_format, current_path):
+    suffix = f".{EXPORT_FORMATS[export_format]['extension']}"
+    for name in os.listdir(EXPORT_FOLDER):
+        path = os.path.join(EXPORT_FOLDER, name)
+        stem = name[:-len(suffix)] if name.endswith(suffix) else None
+        # <file_id>.<32 hex etag><suffix>
+        if stem and stem.rsplit(".", 1)[0] == file_id and path != current_path:
+            os.remove(path)
+
+
+def lead_batches(file_id, fields, batch_size=None):
+    """Yields lists of up to batch_size lead rows (as value tuples in fields order)."""
+    batch_size = batch_size or config.EXPORT_YIELD_PER
+    batch = []
+    for lead in iter_leads(file_id, fields, batch_size):
+        batch.append([lead[field] for field in fields])
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def arrow_schema(fields):
+    return pa.schema([(field, getattr(pa, NUMERIC_FIELDS.get(field, "string"))()) for field in fields])
+
+
+def write_export(file_id, export_format, path):
+    """Writes every lead of the file to path one batch at a time. Returns the number of leads written."""
+    fields = list(LEAD_FIELDS)
+    total = 0
+
+    if export_format == "csv.gz":
+        with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for batch in lead_batches(file_id, fields):
+                writer.writerows(batch)
+                total += len(batch)
+        return total
+
+    schema = arrow_schema(fields)
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    try:
+        for batch in lead_batches(file_id, fields):
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch([pa.array(column, type=schema.field(n).type)
+                                                for n, column in enumerate(columns)], schema=schema))
+            total += len(batch)
+    finally:
+        writer.close()
+
+    return total
@@ -0,0 +1,128 @@
+import json
+
+from app.services.batching import run_stage_batches
+from app.services import wire_format
+from app.services.providers import openai_chat
+from app.services.bulk_write import match_results
+from app.services.flag_entries import FLAGGING_PROMPT, MODEL, OUTPUT_TOKENS_PER_ENTRY, store_flags
+from app.services.lead_qualifier import (COMPACT_LEAD_KEYS, COMPACT_LEAD_SCHEMA, LEAD_FIELD_INSTRUCTIONS,
+                                         LEAD_FIELD_SCHEMA, estimate_compact_structuring_output,
+                                         estimate_structuring_output, expand_compact_lead, store_leads)
+
+
+# Flagging and structuring in one request: each inquiry is sent once instead of twice.
+FUSED_PROMPT = (
+    FLAGGING_PROMPT +
+    "\n\nFor every entry flagged 'success', also fill 'lead' with these details:"
+    + LEAD_FIELD_INSTRUCTIONS +
+    " For 'fail' and 'edge case' entries set 'lead' to null."
+)
+COMPACT_FUSED_PROMPT = (
+    FLAGGING_PROMPT +
+    "\n\nFor every entry flagged 'success', also fill 'lead' with these details:"
+    + LEAD_FIELD_INSTRUCTIONS +
+    " Key 'lead' with: " + COMPACT_LEAD_KEYS +
+    " For 'fail' and 'edge case' entries set 'lead' to null."
+)
+
+
+def estimate_fused_output(item, input_tokens):
+    if wire_format.enabled():
+        return OUTPUT_TOKENS_PER_ENTRY + estimate_compact_structuring_output(item, input_tokens)
+    return OUTPUT_TOKENS_PER_ENTRY + estimate_structuring_output(item, input_tokens)
+
+
+def flag_and_structure(file_id, entries):
+    """
+    Flags entries and extracts the lead fields of the successful ones in one request per batch,
+    then writes Entry, EdgeCase and Lead rows through the same functions as the separate stages.
+    Returns True if every entry got a result.
+    """
+    print(f"Flagging and structuring {len(entries)} entries for file_id '{file_id}'..")
+    input_data = [{"id": entry.id, "text": entry.raw_input} for entry in entries]
+    prompt = COMPACT_FUSED_PROMPT if wire_format.enabled() else FUSED_PROMPT
+
+    try:
+        results = run_stage_batches("flag_structure", input_data, flag_and_structure_batch, provider="openai",
+                                    model=MODEL, prompt=prompt, output_tokens=estimate_fused_output,
+                                    validate=lambda result: result["flag"] != "success" or result["lead"] is not None)
+    except Exception as e:
+        print(f"❌ OpenAI API Error: {e}")
+        return False
+
+    flagged = match_results(entries, results, key=lambda entry: entry.id)
+    store_flags(file_id, flagged)
+
+    structured = [(entry, result["lead"]) for entry, result in flagged if result["flag"] == "success"]
+    if structured:
+        store_leads(structured)
+
+    if len(flagged) != len(entries):
+        print(f"⚠️ {len(entries) - len(flagged)} entries were not flagged and stay pending for a resume.")
+        return False
+
+    return True
+
+
+def flag_and_structure_batch(batch_data):
+    input_texts = [item["text"] for item in batch_data]
+    compact = wire_format.enabled()
+    lead_schema = COMPACT_LEAD_SCHEMA if compact else LEAD_FIELD_SCHEMA
+
+    response = openai_chat(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": COMPACT_FUSED_PROMPT if compact else FUSED_PROMPT},
+            {"role": "user", "content": wire_format.dumps(input_texts)}
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "entry_flags_and_leads",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "entries": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "flag": {"type": "string", "enum": ["success", "fail", "edge case"]},
+                                    "reason": {"type": ["string", "null"]},
+                                    "lead": {
+                                        "anyOf": [
+                                            {
+                                                "type": "object",
+                                                "properties": lead_schema,
+                                                "required": list(lead_schema),
+                                                "additionalProperties": False
+                                            },
+                                            {"type": "null"}
+                                        ]
+                                    }
+                                },
+                                "required": ["flag", "reason", "lead"],
+                                "additionalProperties": False
+                            }
+                        }
+                    },
+                    "required": ["entries"],
+                    "additionalProperties": False
+                },
+                "strict": True
+            }
+        },
+        temperature=0.2
+    )
+
+    batch_results = json.loads(response.choices[0].message.content)["entries"]
+
+    if len(batch_results) != len(batch_data):
+        raise ValueError(f"Expected {len(batch_data)} results, but got {len(batch_results)}")
+
+    # The model answers in input order; ids are attached here so batches can be merged in any order.
+    return [
+        {"id": item["id"], "flag": result["flag"], "reason": result["reason"],
+         "lead": expand_compact_lead(result["lead"]) if compact and result["lead"] else result["lead"]}
+        for item, result in zip(batch_data, batch_results)
+    ]
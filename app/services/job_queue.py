@@ -0,0 +1,224 @@
+import os
+import json
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.job_model import Job
+from app.services import metrics
+from app.services.pipeline import STAGES, PipelineError, count_entries, run_pipeline
+from app.services.export import save_leads_to_output
+
+app = get_app()
+
+JOB_STAGES = ("populate",) + STAGES
+ACTIVE_STATUSES = ("queued", "running")
+
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def process_upload(file_id, file_name, mode=None, on_progress=None):
+    """Runs the full pipeline for an uploaded file already saved in data/. Raises PipelineError on failure."""
+    from scripts.populate_db import populate_db
+
+    on_progress = on_progress or (lambda stage, status, entries=0: None)
+
+    on_progress("populate", "running")
+    with metrics.span("populate", file_id):
+        populated = populate_db(file_name)
+    if not populated:
+        raise PipelineError(f"Database population failed for file_id: {file_id}")
+    on_progress("populate", "completed", count_entries(file_id))
+    print(f"✅ Data stored successfully for file_id: {file_id}.\n")
+
+    return resume_file(file_id, mode, on_progress)
+
+
+def resume_file(file_id, mode=None, on_progress=None):
+    """Runs every stage for the entries of an already populated file that have not finished it."""
+    timings = run_pipeline(file_id, mode, on_progress)
+    save_leads_to_output(file_id)
+
+    print(f"\nAll processes completed successfully for file_id: {file_id}\n")
+    logging.info(f"All processes completed successfully for file_id: {file_id}")
+    return timings
+
+
+def worker_owner():
+    """Recorded on the jobs this process claims, so a restart can tell whose running jobs were interrupted."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_is_gone(owner):
+    """True if the process that claimed a job no longer runs. Jobs claimed on another host are left alone."""
+    if not owner:
+        return True
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return False
+    # This process has not started its workers yet, so a job under its pid was claimed by an earlier
+    # process that got the same pid (e.g. pid 1 in a restarted container).
+    if int(pid) == os.getpid():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def start_workers():
+    """Starts the local worker threads once per process and fails running jobs whose worker process is gone."""
+    with _workers_lock:
+        if _workers:
+            return
+
+        with app.app_context():
+            Job.__table__.create(bind=db.engine, checkfirst=True)
+            running = db.session.query(Job.id, Job.owner).filter(Job.status == "running").all()
+            interrupted = [job_id for job_id, owner in running if owner_is_gone(owner)]
+            if interrupted:
+                db.session.execute(
+                    update(Job)
+                    .where(Job.id.in_(interrupted), Job.status == "running")
+                    .values(status="failed", error="Interrupted by a server restart.", finished_at=datetime.utcnow())
+                )
+                db.session.commit()
+
+        for n in range(config.JOB_WORKERS):
+            worker = threading.Thread(target=_worker_loop, name=f"job-worker-{n + 1}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def enqueue_job(file_id, file_name=None, mode=None, action="process"):
+    start_workers()
+
+    job = Job(
+        id=uuid.uuid4().hex,
+        file_id=file_id,
+        file_name=file_name,
+        action=action,
+        mode=mode or config.PIPELINE_MODE,
+        status="queued",
+        progress=json.dumps({stage: {"status": "pending", "entries": 0} for stage in JOB_STAGES}),
+    )
+
+    with app.app_context():
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+    _wakeup.set()
+    logging.info(f"Queued job {job_id} for file_id: {file_id}")
+    return job_id
+
+
+def has_active_job(file_id):
+    with app.app_context():
+        return db.session.query(Job).filter(Job.file_id == file_id, Job.status.in_(ACTIVE_STATUSES)).first() is not None
+
+
+def get_job(job_id):
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return None
+
+        return {
+            "job_id": job.id,
+            "file_id": job.file_id,
+            "file_name": job.file_name,
+            "action": job.action,
+            "mode": job.mode,
+            "status": job.status,
+            "stage": job.stage,
+            "progress": json.loads(job.progress) if job.progress else {},
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+
+def _update_job(job_id, **values):
+    with app.app_context():
+        db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.session.commit()
+
+
+def _claim_next_job():
+    with app.app_context():
+        while True:
+            candidate = db.session.query(Job.id).filter_by(status="queued").order_by(Job.created_at).first()
+            if candidate is None:
+                return None
+
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == candidate.id, Job.status == "queued")
+                .values(status="running", owner=worker_owner(), started_at=datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+
+            if claimed:
+                return candidate.id
+
+
+def _worker_loop():
+    while True:
+        try:
+            job_id = _claim_next_job()
+        except Exception:
+            logging.exception("Failed to claim the next job")
+            job_id = None
+
+        if job_id is None:
+            _wakeup.wait(timeout=config.JOB_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+
+        run_job(job_id)
+
+
+def run_job(job_id):
+    job = get_job(job_id)
+    progress = job["progress"] or {stage: {"status": "pending", "entries": 0} for stage in JOB_STAGES}
+    progress_lock = threading.Lock()
+
+    def on_progress(stage, status, entries=0):
+        with progress_lock:
+            progress[stage]["status"] = status
+            progress[stage]["entries"] += entries
+            _update_job(job_id, stage=stage, progress=json.dumps(progress))
+
+    logging.info(f"Processing job {job_id} for file_id: {job['file_id']}")
+
+    try:
+        if job["action"] == "resume":
+            on_progress("populate", "skipped")
+            timings = resume_file(job["file_id"], job["mode"], on_progress)
+        else:
+            timings = process_upload(job["file_id"], job["file_name"], job["mode"], on_progress)
+    except PipelineError as e:
+        logging.error(str(e))
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        return
+    except Exception as e:
+        logging.exception(f"Job {job_id} crashed")
+        _update_job(job_id, status="failed", error=f"Unexpected error: {e}", finished_at=datetime.utcnow())
+        return
+
+    _update_job(job_id, status="completed", result=json.dumps({"timings": timings}), finished_at=datetime.utcnow())
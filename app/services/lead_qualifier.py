@@ -1,52 +1,123 @@
 import sys
 import os
 import json
-from openai import OpenAI
-from app import create_app
+from app import get_app
 from app.database import db
 from models.entry_model import Entry
 from models.lead_model import Lead
 from app.config import config
+from app.services.batching import run_stage_batches
+from app.services import wire_format
+from app.services.providers import openai_chat
+from app.services.bulk_write import bulk_insert, bulk_update, match_results, write_in_chunks
+from app.services.clustering import fan_out_leads, structuring_entries
 
-app = create_app()
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+app = get_app()
 
+MODEL = "gpt-4o-2024-08-06"
 
-def get_success_entries(file_id=None):
+# Field instructions and schema shared with the fused flag-and-structure stage.
+LEAD_FIELD_INSTRUCTIONS = (
+    "Company Name: If mentioned, otherwise null."
+    "Industry: The industry type (e.g., SaaS, Retail, Marketing, etc.)."
+    "Business Model: One of ['B2B', 'B2C', 'DTC', 'Unknown']." 
+    "Budget: The amount the user is willing to spend (e.g., marketing, services, investment)."
+    "Revenue (Monthly): ONLY if the user explicitly states it. Do NOT confuse with budget. Convert to monthly."
+    "Growth Goal (Monthly): If the user mentions growth objective. Do NOT confuse with budget. Convert to monthly."
+    "Urgency: ['Urgent', 'High', 'Medium', 'Low'] based on how soon they need help."
+    "Lead Sentiment: ['Hot', 'Neutral', 'Cold'] based on interest level."
+    "Additional Notes: ONLY extract specific user requests, not the entire inquiry."
+)
+LEAD_FIELD_SCHEMA = {
+    "Company Name": {"type": ["string", "null"]},
+    "Industry": {"type": ["string", "null"]},
+    "Business Model": {"type": ["string", "null"], "enum": ["B2B", "B2C", "DTC", "Unknown"]},
+    "Budget": {"type": ["string", "null"]},
+    "Revenue (Monthly)": {"type": ["string", "null"]},
+    "Growth Goal (Monthly)": {"type": ["string", "null"]},
+    "Urgency": {"type": ["string", "null"], "enum": ["Urgent", "High", "Medium", "Low"]},
+    "Lead Sentiment": {"type": ["string", "null"], "enum": ["Hot", "Neutral", "Cold"]},
+    "Additional Notes": {"type": ["string", "null"]}
+}
+
+STRUCTURING_PROMPT = (
+    "You are an AI responsible for structuring business inquiries."
+    "Extract the following details while maintaining structure:"
+    + LEAD_FIELD_INSTRUCTIONS +
+    "Ensure every extracted entry corresponds 1:1 with input."
+    "Return JSON with 'entries': [{id: int, Company Name: str, Industry: str, Business Model: str, Budget: str, "
+    "Revenue: str, Growth Goal: str, Urgency: str, Lead Sentiment: str, Additional Notes: str}]"
+)
+
+# COMPACT_WIRE_FORMAT: [id, inquiry] rows in, short keys and codes out.
+COMPACT_LEAD_FIELDS = {
+    "co": "Company Name",
+    "ind": "Industry",
+    "bm": "Business Model",
+    "bud": "Budget",
+    "rev": "Revenue (Monthly)",
+    "goal": "Growth Goal (Monthly)",
+    "urg": "Urgency",
+    "sent": "Lead Sentiment",
+    "note": "Additional Notes",
+}
+COMPACT_LEAD_SCHEMA = {
+    **{key: LEAD_FIELD_SCHEMA[field] for key, field in COMPACT_LEAD_FIELDS.items()},
+    "urg": {"type": ["string", "null"], "enum": list(wire_format.PRIORITY_LEVELS)},
+    "sent": {"type": ["string", "null"], "enum": list(wire_format.SENTIMENTS)},
+}
+COMPACT_LEAD_KEYS = (
+    ", ".join(f"{key} ({field})" for key, field in COMPACT_LEAD_FIELDS.items()) +
+    ". Write urg as U (Urgent), H (High), M (Medium) or L (Low) and sent as H (Hot), N (Neutral) or C (Cold)."
+)
+COMPACT_STRUCTURING_PROMPT = (
+    "You are an AI responsible for structuring business inquiries."
+    "Extract the following details while maintaining structure:"
+    + LEAD_FIELD_INSTRUCTIONS +
+    "Ensure every extracted entry corresponds 1:1 with input.\n"
+    "Each input row is a JSON array: [id, inquiry]. Return 'entries' with one object per row, keyed: id, "
+    + COMPACT_LEAD_KEYS
+)
+
+
+def get_success_entries(file_id=None, entry_ids=None, stage=None):
     with app.app_context():
         query = db.session.query(Entry).filter_by(status="success")
         if file_id:
             query = query.filter_by(file_id=file_id)
+        if stage:
+            query = query.filter_by(stage=stage)
+        if entry_ids is not None:
+            query = query.filter(Entry.id.in_(entry_ids))
         return query.all()
 
 
 def qualify_leads(entries):
     input_data = [{"id": entry.id, "text": entry.raw_input} for entry in entries]
+    if wire_format.enabled():
+        return run_stage_batches("structuring", input_data, qualify_compact_batch, provider="openai", model=MODEL,
+                                 prompt=COMPACT_STRUCTURING_PROMPT, output_tokens=estimate_compact_structuring_output)
+    return run_stage_batches("structuring", input_data, qualify_batch, provider="openai", model=MODEL,
+                             prompt=STRUCTURING_PROMPT, output_tokens=estimate_structuring_output)
 
-    prompt = (
-        "You are an AI responsible for structuring business inquiries."
-        "Extract the following details while maintaining structure:"
-        "Company Name: If mentioned, otherwise null."
-        "Industry: The industry type (e.g., SaaS, Retail, Marketing, etc.)."
-        "Business Model: One of ['B2B', 'B2C', 'DTC', 'Unknown']." 
-        "Budget: The amount the user is willing to spend (e.g., marketing, services, investment)."
-        "Revenue (Monthly): ONLY if the user explicitly states it. Do NOT confuse with budget. Convert to monthly."
-        "Growth Goal (Monthly): If the user mentions growth objective. Do NOT confuse with budget. Convert to monthly."
-        "Urgency: ['Urgent', 'High', 'Medium', 'Low'] based on how soon they need help."
-        "Lead Sentiment: ['Hot', 'Neutral', 'Cold'] based on interest level."
-        "Additional Notes: ONLY extract specific user requests, not the entire inquiry."
-        "Ensure every extracted entry corresponds 1:1 with input."
-        "Return JSON with 'entries': [{id: int, Company Name: str, Industry: str, Business Model: str, Budget: str, "
-        "Revenue: str, Growth Goal: str, Urgency: str, Lead Sentiment: str, Additional Notes: str}]"
-    )
 
+def estimate_structuring_output(item, input_tokens):
+    # Ten keyed fields per entry, plus "Additional Notes" which grows with the inquiry.
+    return 120 + input_tokens // 2
+
+
+def estimate_compact_structuring_output(item, input_tokens):
+    return 70 + input_tokens // 2
+
+
+def qualify_batch(input_data):
     messages = [
-        {"role": "system", "content": prompt},
+        {"role": "system", "content": STRUCTURING_PROMPT},
         {"role": "user", "content": json.dumps({"entries": input_data})},
     ]
 
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-08-06",
+    response = openai_chat(
+        model=MODEL,
         messages=messages,
         response_format={
             "type": "json_schema",
@@ -59,22 +130,8 @@ def qualify_leads(entries):
                             "type": "array",
                             "items": {
                                 "type": "object",
-                                "properties": {
-                                    "id": {"type": "integer"},
-                                    "Company Name": {"type": ["string", "null"]},
-                                    "Industry": {"type": ["string", "null"]},
-                                    "Business Model": {"type": ["string", "null"], "enum": ["B2B", "B2C", "DTC", "Unknown"]},
-                                    "Budget": {"type": ["string", "null"]},
-                                    "Revenue (Monthly)": {"type": ["string", "null"]},
-                                    "Growth Goal (Monthly)": {"type": ["string", "null"]},
-                                    "Urgency": {"type": ["string", "null"], "enum": ["Urgent", "High", "Medium", "Low"]},
-                                    "Lead Sentiment": {"type": ["string", "null"], "enum": ["Hot", "Neutral", "Cold"]},
-                                    "Additional Notes": {"type": ["string", "null"]}
-                                },
-                                "required": [
-                                    "id", "Company Name", "Industry", "Business Model", "Budget", "Revenue (Monthly)",
-                                    "Growth Goal (Monthly)", "Urgency", "Lead Sentiment", "Additional Notes"
-                                ],
+                                "properties": {"id": {"type": "integer"}, **LEAD_FIELD_SCHEMA},
+                                "required": ["id", *LEAD_FIELD_SCHEMA],
                                 "additionalProperties": False
                             }
                         }
@@ -90,61 +147,119 @@ def qualify_leads(entries):
 
     structured_data = json.loads(response.choices[0].message.content)
 
-    if len(structured_data["entries"]) != len(entries):
-        raise ValueError(f"Expected {len(entries)} responses, but got {len(structured_data['entries'])}")
+    if len(structured_data["entries"]) != len(input_data):
+        raise ValueError(f"Expected {len(input_data)} responses, but got {len(structured_data['entries'])}")
 
-    return structured_data
+    return structured_data["entries"]
 
 
-def store_leads(entries, structured_data):
+def qualify_compact_batch(input_data):
+    response = openai_chat(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": COMPACT_STRUCTURING_PROMPT},
+            {"role": "user", "content": wire_format.dumps([[item["id"], item["text"]] for item in input_data])},
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "lead_fields",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "entries": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {"id": {"type": "integer"}, **COMPACT_LEAD_SCHEMA},
+                                "required": ["id", *COMPACT_LEAD_SCHEMA],
+                                "additionalProperties": False
+                            }
+                        }
+                    },
+                    "required": ["entries"],
+                    "additionalProperties": False
+                },
+                "strict": True
+            }
+        },
+        temperature=0.2
+    )
+
+    entries = json.loads(response.choices[0].message.content)["entries"]
+
+    if len(entries) != len(input_data):
+        raise ValueError(f"Expected {len(input_data)} responses, but got {len(entries)}")
+
+    return [{"id": entry["id"], **expand_compact_lead(entry)} for entry in entries]
+
+
+def expand_compact_lead(fields):
+    """Back to the keyed fields store_leads uses."""
+    return {
+        **{field: fields[key] for key, field in COMPACT_LEAD_FIELDS.items()},
+        "Urgency": wire_format.PRIORITY_LEVELS.get(fields["urg"], fields["urg"]),
+        "Lead Sentiment": wire_format.SENTIMENTS.get(fields["sent"], fields["sent"]),
+    }
+
+
+def store_leads(structured):
+    """Inserts a Lead per (entry, structured data) pair and marks the entries structured."""
+
+    def write_chunk(chunk):
+        bulk_insert(Lead, [{
+            "file_id": entry.file_id,
+            "entry_id": entry.id,
+            "company_name": structured_entry["Company Name"],
+            "industry": structured_entry["Industry"],
+            "business_model": structured_entry["Business Model"],
+            "budget": structured_entry["Budget"],
+            "revenue": structured_entry["Revenue (Monthly)"],
+            "growth_goal": structured_entry["Growth Goal (Monthly)"],
+            "urgency": structured_entry["Urgency"],
+            "lead_sentiment": structured_entry["Lead Sentiment"],
+            "additional_notes": structured_entry["Additional Notes"],
+        } for entry, structured_entry in chunk])
+        bulk_update(Entry, [{"id": entry.id, "stage": "structured"} for entry, structured_entry in chunk])
+
     with app.app_context():
-        structured_data_dict = {entry["id"]: entry for entry in structured_data["entries"]}
-
-        for entry in entries:
-            if entry.id not in structured_data_dict:
-                raise ValueError(f"❌ ERROR: No structured data found for Entry ID {entry.id}")
-
-            structured_entry = structured_data_dict[entry.id]
-
-            lead = Lead(
-                file_id=entry.file_id,
-                entry_id=entry.id,
-                company_name=structured_entry["Company Name"],
-                industry=structured_entry["Industry"],
-                business_model=structured_entry["Business Model"],
-                budget=structured_entry["Budget"],
-                revenue=structured_entry["Revenue (Monthly)"],
-                growth_goal=structured_entry["Growth Goal (Monthly)"],
-                urgency=structured_entry["Urgency"],
-                lead_sentiment=structured_entry["Lead Sentiment"],
-                additional_notes=structured_entry["Additional Notes"],
-                leads_AI_priority_level=None,
-                audit_AI_priority_level=None,
-                audit_AI_notes=None,
-                audit_accuracy_score=None,
-            )
-
-            db.session.add(lead)
-
-        db.session.commit()
+        write_in_chunks(structured, write_chunk)
         print("✅ Structured leads stored successfully.")
 
 
-def process_lead_qualification(file_id=None):
-    entries = get_success_entries(file_id)
+def process_lead_qualification(file_id=None, entry_ids=None):
+    entries = get_success_entries(file_id, entry_ids, stage="flagged")
+    if not entries and config.FUSED_FLAGGING:
+        print(f"✅ Leads of file_id {file_id or 'ALL'} were structured during flagging.")
+        return True
     if not entries:
-        print(f"⚠️ No entries found with status 'success' for file_id: {file_id or 'ALL'}")
+        print(f"⚠️ No entries waiting for structuring with status 'success' for file_id: {file_id or 'ALL'}")
         return False
 
+    # Exact duplicates copy their representative's lead instead of being structured again.
+    entries = structuring_entries(entries)
+    completed = structure_with_llm(entries) if entries else True
+    fan_out_leads(file_id, entry_ids)
+    return completed
+
+
+def structure_with_llm(entries):
     try:
         structured_data = qualify_leads(entries)
-        store_leads(entries, structured_data)
-        print("✅ Lead qualification process completed.")
-        return True
+        structured = match_results(entries, structured_data, key=lambda entry: entry.id)
+        if structured:
+            store_leads(structured)
     except Exception as e:
         print(f"❌ Lead qualification failed: {e}")
         return False
 
+    if len(structured) != len(entries):
+        print(f"⚠️ {len(entries) - len(structured)} entries were not structured and stay flagged for a resume.")
+        return False
+
+    print("✅ Lead qualification process completed.")
+    return True
+
 
 if __name__ == "__main__":
     file_id = sys.argv[1] if len(sys.argv) > 1 else None
@@ -0,0 +1,292 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import threading
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+try:
+    import numpy as np
+except ImportError:  # The local classifier is optional; without NumPy every entry goes to the LLM.
+    np = None
+
+from sqlalchemy import or_
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.entry_model import Entry
+from app.services.bulk_write import bulk_update, write_in_chunks
+
+app = get_app()
+
+LABELS = ("success", "fail", "edge case")
+# Edge cases need the reason only the LLM gives, so the classifier never assigns them itself.
+LOCAL_LABELS = ("success", "fail")
+TOKEN_PATTERN = re.compile(r"\d+k\b|\d+|[a-z]+|\$")
+EVALUATION_THRESHOLDS = (0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+BATCH_SIZE = 256
+EPOCHS = 30
+LEARNING_RATE = 2.0
+L2 = 1e-5
+
+_model = None
+_model_mtime = None
+_model_lock = threading.Lock()
+
+
+def tokenize(text):
+    words = ["<num>k" if word[-1] == "k" and word[0].isdigit() else "<num>" if word[0].isdigit() else word
+             for word in TOKEN_PATTERN.findall(text.lower())]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class LocalClassifier:
+    """TF-IDF features over words and word pairs, with a softmax regression trained in NumPy."""
+
+    def __init__(self, vocabulary, idf, weights, bias, labels, metadata=None):
+        self.vocabulary = vocabulary
+        self.index = {term: n for n, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.labels = labels
+        self.metadata = metadata or {}
+
+    @classmethod
+    def fit(cls, texts, labels, max_features=None):
+        max_features = max_features or config.LOCAL_CLASSIFIER_MAX_FEATURES
+        documents = [Counter(tokenize(text)) for text in texts]
+
+        document_frequency = Counter(term for document in documents for term in document)
+        terms = [term for term, count in document_frequency.most_common(max_features) if count >= 2]
+        vocabulary = sorted(terms)
+        idf = np.array([math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1 for term in vocabulary],
+                       dtype=np.float32)
+
+        classes = [label for label in LABELS if label in set(labels)]
+        model = cls(vocabulary, idf, np.zeros((len(vocabulary), len(classes)), dtype=np.float32),
+                    np.zeros(len(classes), dtype=np.float32), classes)
+
+        rows = [model._vectorize(document) for document in documents]
+        targets = np.array([classes.index(label) for label in labels])
+        model._train(rows, targets)
+        model.metadata = {"trained_at": time.time(), "examples": len(texts),
+                          "label_counts": dict(Counter(labels)), "features": len(vocabulary)}
+        return model
+
+    def _vectorize(self, counts):
+        """Sparse TF-IDF row as (indices, values), L2-normalized."""
+        pairs = [(self.index[term], 1 + math.log(count)) for term, count in counts.items() if term in self.index]
+        if not pairs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        indices = np.array([index for index, tf in pairs], dtype=np.int64)
+        values = np.array([tf for index, tf in pairs], dtype=np.float32) * self.idf[indices]
+        return indices, values / np.linalg.norm(values)
+
+    def _stack(self, rows):
+        """
+        Concatenates sparse rows CSR-style into (indices, values, row of each value, row count), so
+        scores and gradients scatter-add over the nonzeros instead of a (rows x vocabulary) matrix.
+        """
+        return (np.concatenate([indices for indices, _ in rows]), np.concatenate([values for _, values in rows]),
+                np.repeat(np.arange(len(rows)), [len(indices) for indices, _ in rows]), len(rows))
+
+    def _softmax(self, batch):
+        indices, values, row_ids, size = batch
+        scores = np.tile(self.bias, (size, 1))
+        np.add.at(scores, row_ids, values[:, None] * self.weights[indices])
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def _train(self, rows, targets):
+        rng = np.random.default_rng(0)
+        one_hot = np.eye(len(self.labels), dtype=np.float32)[targets]
+
+        for epoch in range(EPOCHS):
+            learning_rate = LEARNING_RATE / (1 + epoch / 10)
+            order = rng.permutation(len(rows))
+            for start in range(0, len(rows), BATCH_SIZE):
+                batch = order[start:start + BATCH_SIZE]
+                stacked = self._stack([rows[n] for n in batch])
+                indices, values, row_ids, size = stacked
+                error = self._softmax(stacked) - one_hot[batch]
+                gradient = np.zeros_like(self.weights)
+                np.add.at(gradient, indices, values[:, None] * error[row_ids])
+                self.weights -= learning_rate * (gradient / size + L2 * self.weights)
+                self.bias -= learning_rate * error.mean(axis=0)
+
+    def predict_proba(self, texts):
+        """Returns an (n, len(labels)) array of label probabilities."""
+        rows = [self._vectorize(Counter(tokenize(text))) for text in texts]
+        return np.vstack([self._softmax(self._stack(rows[start:start + 1024]))
+                          for start in range(0, len(rows), 1024)]) if rows else \
+            np.zeros((0, len(self.labels)), dtype=np.float32)
+
+    def predict(self, texts):
+        """Returns (label, probability) per text."""
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1) if len(probabilities) else []
+        return [(self.labels[n], float(probabilities[row, n])) for row, n in enumerate(best)]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            vocabulary=np.array(self.vocabulary, dtype=str),
+            idf=self.idf,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array(self.labels, dtype=str),
+            metadata=np.array(json.dumps(self.metadata)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                [str(term) for term in data["vocabulary"]],
+                data["idf"],
+                data["weights"],
+                data["bias"],
+                [str(label) for label in data["labels"]],
+                json.loads(str(data["metadata"])),
+            )
+
+
+def get_model():
+    """The trained model, reloaded when the file on disk changes. None when disabled or not trained."""
+    global _model, _model_mtime
+
+    if np is None or not config.LOCAL_CLASSIFIER_ENABLED or not os.path.exists(config.LOCAL_CLASSIFIER_PATH):
+        return None
+
+    with _model_lock:
+        mtime = os.path.getmtime(config.LOCAL_CLASSIFIER_PATH)
+        if _model is None or mtime != _model_mtime:
+            _model = LocalClassifier.load(config.LOCAL_CLASSIFIER_PATH)
+            _model_mtime = mtime
+        return _model
+
+
+def classify_entries(file_id, entries, threshold=None):
+    """
+    Flags entries the local model is confident about ('success' or 'fail' with probability at
+    or above the threshold) without an API call. Returns the entries that still need the LLM.
+    """
+    model = get_model()
+    if model is None or not entries:
+        return entries
+
+    threshold = threshold or config.LOCAL_CLASSIFIER_THRESHOLD
+    started = time.monotonic()
+    decided = []
+    remaining = []
+
+    for entry, (label, probability) in zip(entries, model.predict([entry.raw_input for entry in entries])):
+        if label in LOCAL_LABELS and probability >= threshold:
+            decided.append((entry, label))
+        else:
+            remaining.append(entry)
+
+    if decided:
+        def write_chunk(chunk):
+            bulk_update(Entry, [
+                {"id": entry.id, "status": label, "stage": "flagged", "flag_source": "classifier"}
+                for entry, label in chunk
+            ])
+
+        with app.app_context():
+            write_in_chunks(decided, write_chunk)
+
+    elapsed = (time.monotonic() - started) * 1000
+    print(f"🤖 Local classifier flagged {len(decided)} of {len(entries)} entries in {elapsed:.0f} ms; "
+          f"{len(remaining)} go to the LLM.")
+    return remaining
+
+
+def labelled_entries():
+    """(id, text, label) for every entry whose flag came from the LLM, the only labels worth learning from."""
+    with app.app_context():
+        return db.session.query(Entry.id, Entry.raw_input, Entry.status).filter(
+            Entry.stage != "pending",
+            Entry.status.in_(LABELS),
+            or_(Entry.flag_source.is_(None), Entry.flag_source == "llm"),
+        ).order_by(Entry.id).all()
+
+
+def train():
+    if np is None:
+        print("❌ NumPy is required for the local classifier: pip install numpy")
+        return None
+
+    rows = labelled_entries()
+    if len(rows) < config.LOCAL_CLASSIFIER_MIN_EXAMPLES:
+        print(f"❌ Only {len(rows)} LLM-flagged entries; at least {config.LOCAL_CLASSIFIER_MIN_EXAMPLES} are needed.")
+        return None
+
+    started = time.monotonic()
+    model = LocalClassifier.fit([text for _, text, _ in rows], [label for _, _, label in rows])
+    model.save(config.LOCAL_CLASSIFIER_PATH)
+    print(f"✅ Trained on {len(rows)} entries ({model.metadata['features']} features) in "
+          f"{time.monotonic() - started:.1f}s. Saved to {config.LOCAL_CLASSIFIER_PATH}")
+    return model
+
+
+def evaluate(holdout_every=5):
+    """
+    Trains on 4/5 of the LLM-flagged entries and replays the rest: for each threshold, the share
+    of entries handled locally (LLM calls avoided) and how often those local flags match the LLM's.
+    """
+    if np is None:
+        print("❌ NumPy is required for the local classifier: pip install numpy")
+        return None
+
+    rows = labelled_entries()
+    train_rows = [row for row in rows if row[0] % holdout_every]
+    test_rows = [row for row in rows if not row[0] % holdout_every]
+    if len(train_rows) < config.LOCAL_CLASSIFIER_MIN_EXAMPLES or not test_rows:
+        print(f"❌ Not enough LLM-flagged entries to evaluate ({len(rows)}).")
+        return None
+
+    model = LocalClassifier.fit([text for _, text, _ in train_rows], [label for _, _, label in train_rows])
+    started = time.monotonic()
+    predictions = model.predict([text for _, text, _ in test_rows])
+    per_entry_ms = (time.monotonic() - started) * 1000 / len(test_rows)
+    expected = [label for _, _, label in test_rows]
+
+    report = {
+        "train": len(train_rows),
+        "test": len(test_rows),
+        "argmax_agreement": sum(label == gold for (label, _), gold in zip(predictions, expected)) / len(test_rows),
+        "ms_per_entry": round(per_entry_ms, 4),
+        "thresholds": {},
+    }
+    for threshold in sorted(set(EVALUATION_THRESHOLDS + (config.LOCAL_CLASSIFIER_THRESHOLD,))):
+        handled = [(label, gold) for (label, probability), gold in zip(predictions, expected)
+                   if label in LOCAL_LABELS and probability >= threshold]
+        report["thresholds"][threshold] = {
+            "calls_avoided": round(len(handled) / len(test_rows), 4),
+            "agreement": round(sum(label == gold for label, gold in handled) / len(handled), 4) if handled else None,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # python app/services/local_classifier.py train|evaluate|info
+    command = sys.argv[1] if len(sys.argv) > 1 else "info"
+
+    if command == "train":
+        train()
+    elif command == "evaluate":
+        print(json.dumps(evaluate(), indent=4))
+    else:
+        model = get_model()
+        print(json.dumps(model.metadata if model else {"trained": False}, indent=4))
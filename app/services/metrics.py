@@ -0,0 +1,275 @@
+import sys
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.token_usage_model import TokenUsage
+
+app = get_app()
+
+# In-process Prometheus metrics, served in the text exposition format on /metrics, and the token/cost
+# ledger stored per file and stage. Spans and provider calls find the file and stage they belong to in
+# a context variable, which the batch and priority thread pools copy into their workers.
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+STAGE_SECONDS_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600)
+BATCH_ITEMS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 200)
+
+_scope = contextvars.ContextVar("metrics_scope", default={})
+_registry = []
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [f"{self.name}{format_labels(key)} {value:g}" for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][n] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            for key, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f"{self.name}_bucket{format_labels(key + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', '+Inf'),))} {series['count']}")
+                lines.append(f"{self.name}_sum{format_labels(key)} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{format_labels(key)} {series['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("lead_pipeline_stage_seconds", "Wall time of one stage run (a whole file or one chunk).",
+                          STAGE_SECONDS_BUCKETS)
+STAGE_ERRORS = Counter("lead_pipeline_stage_errors_total", "Stage runs that raised an exception.")
+REQUEST_SECONDS = Histogram("llm_request_seconds", "Latency of each provider request attempt.", SECONDS_BUCKETS)
+RETRIES = Counter("llm_request_retries_total", "Provider requests retried after a 429, 5xx, timeout or connection error.")
+RATE_LIMIT_WAIT = Counter("llm_rate_limit_wait_seconds_total", "Time spent waiting for the local rate limiter.")
+TOKENS = Counter("llm_tokens_total", "Tokens reported by the providers.")
+CACHED_TOKENS = Counter("llm_cached_prompt_tokens_total", "Prompt tokens the provider served from its prefix cache.")
+COST = Counter("llm_cost_usd_total", "Estimated spend from MODEL_PRICES.")
+BATCH_ITEMS = Histogram("llm_batch_items", "Items per batch request, including retried halves.", BATCH_ITEMS_BUCKETS)
+BATCH_RETRIES = Counter("llm_batch_retries_total", "Items re-sent because their batch failed or came back short.")
+CACHE_LOOKUPS = Counter("llm_cache_lookups_total", "Result cache lookups per stage, by hit or miss.")
+
+
+def current_scope():
+    return _scope.get()
+
+
+@contextmanager
+def scope(**labels):
+    """Adds labels (file_id, stage) to everything recorded inside the block, in this thread."""
+    token = _scope.set({**_scope.get(), **{name: value for name, value in labels.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def span(stage, file_id=None):
+    """Times a pipeline stage run, and stores the token usage recorded inside it when it ends."""
+    started = time.monotonic()
+    try:
+        with scope(file_id=file_id, stage=stage):
+            yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        logging.info(f"Stage {stage} for file_id {file_id} took {seconds:.3f}s")
+        flush_usage()
+
+
+def request_cost(model, prompt_tokens, completion_tokens):
+    prices = config.MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    return (prompt_tokens * prices["input"] + completion_tokens * prices["output"]) / 1_000_000
+
+
+def cached_prompt_tokens(usage):
+    # OpenAI reports prompt_tokens_details.cached_tokens, DeepSeek prompt_cache_hit_tokens.
+    details = usage.get("prompt_tokens_details") or {}
+    return details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0
+
+
+def record_request(provider, model, seconds, outcome, usage=None):
+    """Called for every provider request attempt; usage is {"prompt_tokens", "completion_tokens"} on success."""
+    REQUEST_SECONDS.observe(seconds, provider=provider, model=model, outcome=outcome)
+    if usage is None:
+        return
+
+    stage = current_scope().get("stage", "unknown")
+    file_id = current_scope().get("file_id")
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    cost = request_cost(model, prompt_tokens, completion_tokens)
+
+    TOKENS.inc(prompt_tokens, provider=provider, model=model, stage=stage, type="prompt")
+    TOKENS.inc(completion_tokens, provider=provider, model=model, stage=stage, type="completion")
+    CACHED_TOKENS.inc(cached_prompt_tokens(usage), provider=provider, model=model, stage=stage)
+    COST.inc(cost, provider=provider, model=model, stage=stage)
+
+    if file_id is None:
+        return
+    with _usage_lock:
+        totals = _usage.setdefault((file_id, stage, provider, model), [0, 0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += prompt_tokens
+        totals[2] += completion_tokens
+        totals[3] += cost
+
+
+def record_retry(provider, reason):
+    RETRIES.inc(provider=provider, reason=reason)
+
+
+def record_rate_limit_wait(provider, seconds):
+    RATE_LIMIT_WAIT.inc(seconds, provider=provider)
+
+
+def record_batch(items):
+    BATCH_ITEMS.observe(items, stage=current_scope().get("stage", "unknown"))
+
+
+def record_batch_retry(items):
+    BATCH_RETRIES.inc(items, stage=current_scope().get("stage", "unknown"))
+
+
+def record_cache(stage, hits, misses):
+    CACHE_LOOKUPS.inc(hits, stage=stage, result="hit")
+    CACHE_LOOKUPS.inc(misses, stage=stage, result="miss")
+
+
+def flush_usage():
+    """Adds the token usage recorded since the last flush to the token_usage ledger."""
+    with _usage_lock:
+        pending = dict(_usage)
+        _usage.clear()
+    if not pending:
+        return
+
+    rows = [
+        {"file_id": file_id, "stage": stage, "provider": provider, "model": model, "requests": requests,
+         "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cost_usd": cost}
+        for (file_id, stage, provider, model), (requests, prompt_tokens, completion_tokens, cost) in pending.items()
+    ]
+    insert = sqlite_insert(TokenUsage)
+    upsert = insert.on_conflict_do_update(
+        index_elements=["file_id", "stage", "model"],
+        set_={
+            "requests": TokenUsage.requests + insert.excluded.requests,
+            "prompt_tokens": TokenUsage.prompt_tokens + insert.excluded.prompt_tokens,
+            "completion_tokens": TokenUsage.completion_tokens + insert.excluded.completion_tokens,
+            "cost_usd": TokenUsage.cost_usd + insert.excluded.cost_usd,
+            "updated_at": func.current_timestamp(),
+        },
+    )
+
+    with app.app_context():
+        try:
+            db.session.execute(upsert, rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logging.exception("Could not store token usage")
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def usage_report(file_id=None):
+    """Requests, tokens and estimated cost per file and stage from the token_usage ledger."""
+    with app.app_context():
+        query = db.session.query(TokenUsage).order_by(TokenUsage.file_id, TokenUsage.id)
+        if file_id:
+            query = query.filter(TokenUsage.file_id == file_id)
+        rows = query.all()
+
+    report = {}
+    for row in rows:
+        data = report.setdefault(row.file_id, {"stages": {}, "requests": 0, "prompt_tokens": 0,
+                                               "completion_tokens": 0, "cost_usd": 0.0})
+        data["stages"][f"{row.stage} ({row.model})"] = {
+            "requests": row.requests,
+            "prompt_tokens": row.prompt_tokens,
+            "completion_tokens": row.completion_tokens,
+            "cost_usd": round(row.cost_usd, 4),
+        }
+        data["requests"] += row.requests
+        data["prompt_tokens"] += row.prompt_tokens
+        data["completion_tokens"] += row.completion_tokens
+        data["cost_usd"] = round(data["cost_usd"] + row.cost_usd, 4)
+    return report
+
+
+if __name__ == "__main__":
+    # python app/services/metrics.py [file_id]
+    print(json.dumps(usage_report(sys.argv[1] if len(sys.argv) > 1 else None), indent=4))
@@ -0,0 +1,143 @@
+import json
+import base64
+
+from sqlalchemy import and_, or_, tuple_
+
+from app.config import config
+from app.database import db
+from models.entry_model import Entry
+from models.lead_model import Lead
+from models.edge_case_model import EdgeCase
+
+# Columns each /get_* endpoint returns by default, in response order; fields= picks a subset.
+LEAD_FIELDS = (
+    "id", "file_id", "entry_id", "company_name", "industry", "business_model", "budget", "revenue",
+    "growth_goal", "urgency", "lead_sentiment", "additional_notes", "leads_AI_priority_level",
+    "audit_AI_priority_level", "audit_AI_notes", "audit_accuracy_score", "audit_status",
+)
+ENTRY_FIELDS = ("id", "raw_input", "status", "file_id", "stage", "flag_source", "duplicate_of")
+EDGE_CASE_FIELDS = ("id", "entry_id", "file_id", "raw_input", "reason")
+
+
+class PaginationError(ValueError):
+    """Invalid query parameters; the message is returned to the client."""
+
+
+def parse_fields(value, available):
+    if not value:
+        return list(available)
+
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}.")
+    return fields
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def parse_limit(value):
+    if not value:
+        return config.API_PAGE_SIZE
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError("limit must be an integer.")
+
+    if not 1 <= limit <= config.API_MAX_PAGE_SIZE:
+        raise PaginationError(f"limit must be between 1 and {config.API_MAX_PAGE_SIZE}.")
+    return limit
+
+
+def parse_float(value, name):
+    if value is None or value == "":
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be a number.")
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError("Invalid cursor.")
+    return values
+
+
+def fetch_page(model, file_id, fields, filters=(), sort_column=None, cursor=None, limit=None):
+    """
+    Returns (rows, next_cursor) for one page of a file's rows, selecting only the requested columns.
+    Rows are ordered by id, or by sort_column descending (NULLs last) then id descending, and the
+    cursor holds the sort key of the last row, so every page is an index range scan however deep it is.
+    """
+    limit = limit or config.API_PAGE_SIZE
+    key_columns = [sort_column, model.id] if sort_column is not None else [model.id]
+    columns = [getattr(model, field) for field in fields]
+    columns += [column for column in key_columns if column.key not in fields]
+
+    query = db.session.query(*columns).filter(model.file_id == file_id)
+    for condition in filters:
+        query = query.filter(condition)
+
+    if sort_column is None:
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            query = query.filter(model.id > last_id)
+        query = query.order_by(model.id)
+    else:
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, 2)
+            if last_value is None:
+                query = query.filter(and_(sort_column.is_(None), model.id < last_id))
+            else:
+                query = query.filter(or_(tuple_(sort_column, model.id) < (last_value, last_id), sort_column.is_(None)))
+        query = query.order_by(sort_column.desc(), model.id.desc())
+
+    records = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]._mapping
+        next_cursor = encode_cursor([last[column.key] for column in key_columns])
+
+    # The requested fields are the leading columns of every record.
+    rows = [dict(zip(fields, record)) for record in records]
+    return rows, next_cursor
+
+
+def page_leads(file_id, fields=None, priorities=None, min_accuracy=None, cursor=None, limit=None):
+    filters = []
+    if priorities:
+        filters.append(Lead.audit_AI_priority_level.in_(priorities))
+    if min_accuracy is not None:
+        filters.append(Lead.audit_accuracy_score >= min_accuracy)
+
+    return fetch_page(Lead, file_id, fields or list(LEAD_FIELDS), filters,
+                      sort_column=Lead.audit_AI_priority_level, cursor=cursor, limit=limit)
+
+
+def page_entries(file_id, fields=None, statuses=None, stages=None, cursor=None, limit=None):
+    filters = []
+    if statuses:
+        filters.append(Entry.status.in_(statuses))
+    if stages:
+        filters.append(Entry.stage.in_(stages))
+
+    return fetch_page(Entry, file_id, fields or list(ENTRY_FIELDS), filters, cursor=cursor, limit=limit)
+
+
+def page_edge_cases(file_id, fields=None, cursor=None, limit=None):
+    return fetch_page(EdgeCase, file_id, fields or list(EDGE_CASE_FIELDS), cursor=cursor, limit=limit)
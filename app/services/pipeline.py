@@ -0,0 +1,247 @@
+import time
+import queue
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import and_, or_
+
+from app import get_app
+from app.config import config
+from app.database import db
+from app.services import metrics
+from models.entry_model import ENTRY_STAGES, Entry
+from app.services.checkpoints import unfinished_entries
+from app.services.flag_entries import flag_entries
+from app.services.lead_qualifier import get_success_entries, process_lead_qualification
+from app.services.assign_priority_lead import process_priority_assignment
+from app.services.assign_priority_audit import classify_independently, process_deepseek_audit
+
+app = get_app()
+
+PIPELINE_MODES = ("barrier", "streaming")
+STAGES = ("flagging", "structuring", "priority", "audit")
+# Entry.stage recorded once an entry has completed each pipeline stage.
+STAGE_RESULTS = {"flagging": "flagged", "structuring": "structured", "priority": "prioritised", "audit": "audited"}
+
+_DONE = object()
+
+
+class PipelineError(Exception):
+    pass
+
+
+def run_pipeline(file_id, mode=None, on_progress=None):
+    """
+    Runs flagging, structuring, priority assignment and the audit for a populated file.
+    Every stage only picks up entries that have not completed it yet, so running this again
+    on a partially processed file resumes it.
+
+    on_progress(stage, status, entries) is called when a stage starts, whenever entries get
+    through it (once per stage in barrier mode, once per chunk in streaming mode; entries is
+    the number that just got through) and when it completes.
+    Returns a timing summary; raises PipelineError with a user-facing message if entries are
+    left unfinished or a stage crashes.
+    """
+    on_progress = on_progress or (lambda stage, status, entries=0: None)
+    mode = mode or config.PIPELINE_MODE
+    if mode not in PIPELINE_MODES:
+        raise PipelineError(f"Unknown pipeline mode '{mode}'. Use one of: {', '.join(PIPELINE_MODES)}.")
+
+    started = time.monotonic()
+    if mode == "streaming":
+        first_audit_at = run_streaming(file_id, on_progress)
+    else:
+        first_audit_at = run_barrier(file_id, on_progress)
+    total = time.monotonic() - started
+
+    with app.app_context():
+        remaining = unfinished_entries(file_id)
+
+    if remaining:
+        summary = ", ".join(f"{count} {stage}" for stage, count in remaining.items())
+        raise PipelineError(
+            f"{sum(remaining.values())} entries did not finish processing for file_id: {file_id} ({summary}). "
+            f"Resume with POST /resume-file?file_id={file_id}"
+        )
+
+    timings = {
+        "mode": mode,
+        "total_seconds": round(total, 3),
+        "first_audit_seconds": round(first_audit_at - started, 3),
+    }
+    logging.info(f"Pipeline timings for file_id {file_id}: {timings}")
+    return timings
+
+
+def run_barrier(file_id, on_progress):
+    """Runs each stage over the whole file. A stage that leaves entries behind does not stop the later ones."""
+    stages = [
+        ("flagging", flag_entries, "✅ Entries flagged successfully.", "⚠️ Flagging incomplete."),
+        ("structuring", process_lead_qualification, "✅ Leads categorized successfully.",
+         "⚠️ Lead qualification incomplete."),
+        ("priority", run_priority, "✅ Priority levels assigned successfully (Leads AI).",
+         "⚠️ GPT priority assignment incomplete."),
+        ("audit", process_deepseek_audit,
+         "✅ Priority levels assigned and evaluated Leads AI successfully (Audit AI).", "⚠️ DeepSeek audit incomplete."),
+    ]
+
+    for stage, run_stage, done_message, incomplete_message in stages:
+        on_progress(stage, "running")
+        before = count_entries(file_id, min_stage=STAGE_RESULTS[stage])
+        with metrics.span(stage, file_id):
+            completed = run_stage(file_id)
+        on_progress(stage, "completed", count_entries(file_id, min_stage=STAGE_RESULTS[stage]) - before)
+
+        if completed:
+            print(f"{done_message}\n")
+        else:
+            logging.warning(f"{incomplete_message} file_id: {file_id}")
+            print(f"{incomplete_message}\n")
+
+    return time.monotonic()
+
+
+def run_priority(file_id, entry_ids=None):
+    """
+    GPT priority assignment. With AUDIT_MODE=independent, DeepSeek's own classification runs at the
+    same time, so the audit that follows only has to score the two labels.
+    """
+    if config.AUDIT_MODE != "independent":
+        return process_priority_assignment(file_id, entry_ids=entry_ids)
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="priority") as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, process_priority_assignment, file_id, entry_ids=entry_ids),
+            pool.submit(contextvars.copy_context().run, classify_independently, file_id, entry_ids=entry_ids),
+        ]
+        return all([future.result() for future in futures])
+
+
+def count_entries(file_id, status=None, min_stage=None, entry_ids=None):
+    with app.app_context():
+        query = db.session.query(Entry).filter_by(file_id=file_id)
+        if entry_ids is not None:
+            query = query.filter(Entry.id.in_(entry_ids))
+        if status:
+            query = query.filter_by(status=status)
+        if min_stage:
+            query = query.filter(Entry.stage.in_(ENTRY_STAGES[ENTRY_STAGES.index(min_stage):]))
+        return query.count()
+
+
+def run_streaming(file_id, on_progress):
+    """
+    Splits the file into chunks of entry ids and passes each chunk through all stages as soon
+    as the previous stage is done with it. Stages run in their own threads, connected by
+    bounded queues, so flagging of later chunks overlaps with structuring, priority assignment
+    and the audit of earlier ones. Returns the time the first chunk finished its audit.
+    """
+    with app.app_context():
+        entry_ids = [
+            row.id for row in db.session.query(Entry.id)
+            .filter(Entry.file_id == file_id)
+            .filter(or_(Entry.stage == "pending", and_(Entry.status == "success", Entry.stage != "audited")))
+            .order_by(Entry.id)
+        ]
+
+    size = config.PIPELINE_CHUNK_SIZE
+    source = queue.Queue()
+    for i in range(0, len(entry_ids), size):
+        source.put(entry_ids[i:i + size])
+    source.put(_DONE)
+
+    queues = [source] + [queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE) for _ in range(3)]
+    failed = threading.Event()
+    errors = []
+    first_audit_at = []
+
+    def get(inbox):
+        while not failed.is_set():
+            try:
+                return inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def put(outbox, item):
+        while not failed.is_set():
+            try:
+                outbox.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    # Each stage only handles the entries of a chunk that are waiting for it; entries a stage
+    # could not finish are still passed on and simply ignored downstream until a resume.
+    def flag(chunk):
+        flag_entries(file_id, entry_ids=chunk)
+        return [entry.id for entry in get_success_entries(file_id, entry_ids=chunk)]
+
+    def structure(chunk):
+        process_lead_qualification(file_id, entry_ids=chunk)
+        return chunk
+
+    def prioritise(chunk):
+        run_priority(file_id, entry_ids=chunk)
+        return chunk
+
+    def audit(chunk):
+        if process_deepseek_audit(file_id, entry_ids=chunk) and not first_audit_at:
+            first_audit_at.append(time.monotonic())
+        return chunk
+
+    handlers = [
+        (flag, f"Flagging process failed for file_id: {file_id}"),
+        (structure, f"Lead qualification failed for file_id: {file_id}"),
+        (prioritise, f"GPT priority assignment failed for file_id: {file_id}"),
+        (audit, f"DeepSeek audit failed for file_id: {file_id}"),
+    ]
+
+    def worker(stage, handle, error, inbox, outbox):
+        on_progress(stage, "running")
+        try:
+            while True:
+                chunk = get(inbox)
+                if chunk is _DONE:
+                    break
+
+                before = count_entries(file_id, min_stage=STAGE_RESULTS[stage], entry_ids=chunk)
+                with metrics.span(stage, file_id):
+                    result = handle(chunk)
+                after = count_entries(file_id, min_stage=STAGE_RESULTS[stage], entry_ids=chunk)
+                on_progress(stage, "running", after - before)
+
+                if result and outbox is not None:
+                    put(outbox, result)
+        except Exception as e:
+            logging.exception(f"Streaming stage crashed for file_id {file_id}")
+            errors.append(f"{error} ({e})")
+            failed.set()
+        finally:
+            if outbox is not None:
+                put(outbox, _DONE)
+            if not failed.is_set():
+                on_progress(stage, "completed")
+
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(stage, handle, error, queues[n], queues[n + 1] if n + 1 < len(queues) else None),
+            name=f"pipeline-{stage}",
+            daemon=True,
+        )
+        for n, (stage, (handle, error)) in enumerate(zip(STAGES, handlers))
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise PipelineError(errors[0])
+
+    print(f"✅ Streaming pipeline completed for file_id: {file_id}.\n")
+    return first_audit_at[0] if first_audit_at else time.monotonic()
@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+import json
+import math
+import unicodedata
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import func
+
+from app import get_app
+from app.config import config
+from app.database import db
+from models.entry_model import Entry
+from models.prefilter_hit_model import PrefilterHit
+from app.services.bulk_write import bulk_insert, bulk_update, write_in_chunks
+from app.services.token_planner import estimate_tokens, plan_batches
+
+app = get_app()
+
+# Spam phrases. Like every rule they only fail a text that also has no business term.
+BLOCKLIST = [
+    r"\b(viagra|cialis|casino|lottery|jackpot|sweepstakes)\b",
+    r"\b(crypto|bitcoin|forex) (giveaway|doubler|signals?)\b",
+    r"\bclick (here|this link|the link) (to|and) (claim|win|collect|redeem)\b",
+    r"\b(free money|you have won|claim your (prize|reward))\b",
+    r"^\W*https?://\S+\W*$",
+]
+# Any of these means the text might be a lead (or an edge case) and goes to the LLM, whatever rules it fails.
+BUSINESS_SIGNAL = re.compile(
+    r"(\$|€|£|\d+\s?k\b|\b(business|company|agency|firm|brand|startup|store|shop\w*|ecommerce|saas|"
+    r"revenue|budget|profit|sales|clients?|customers?|patients?|leads?|marketing|ads?|seo|"
+    r"scal\w*|grow\w*|team|hir\w*|staff|employees?|operations?|fulfil\w*|process\w*|consult\w*|coach\w*|"
+    r"services?|partner\w*|collaborat\w*|invest\w*|month\w*|year\w*|call|meet\w*|job|media|podcast|"
+    r"practice|clinic|dental|restaurant|salon|studio|project|product|website|app|platform|"
+    r"zoom|teams|skype|webex|calendly|demo|quote|proposal|details|help|"
+    r"amazon|etsy|woocommerce|wordpress|hubspot|salesforce|instagram|tiktok|facebook|linkedin|youtube)\b)",
+    re.IGNORECASE,
+)
+VOWELS = set("aeiouy")
+
+
+def normalize(text):
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def char_entropy(text):
+    chars = [char for char in text if not char.isspace()]
+    if not chars:
+        return 0.0
+    counts = Counter(chars)
+    return -sum(count / len(chars) * math.log2(count / len(chars)) for count in counts.values())
+
+
+def blocklist_patterns():
+    return [re.compile(pattern, re.IGNORECASE) for pattern in BLOCKLIST + config.PREFILTER_BLOCKLIST]
+
+
+def junk_rules(text, patterns=None):
+    """Returns the names of the junk rules a text fires, whether or not it has a business term."""
+    original = unicodedata.normalize("NFKC", text)
+    text = normalize(text)
+    chars = [char for char in text if not char.isspace()]
+    letters = [char for char in chars if char.isalpha()]
+    hits = []
+
+    if len(text) < config.PREFILTER_MIN_CHARS:
+        hits.append("too_short")
+    if config.PREFILTER_MIN_ENTROPY and chars and char_entropy(text) < config.PREFILTER_MIN_ENTROPY:
+        hits.append("low_entropy")
+    if config.PREFILTER_MIN_ALPHA_RATIO and chars and len(letters) / len(chars) < config.PREFILTER_MIN_ALPHA_RATIO:
+        hits.append("few_letters")
+    if config.PREFILTER_MIN_LATIN_RATIO and letters and \
+            sum(char.isascii() for char in letters) / len(letters) < config.PREFILTER_MIN_LATIN_RATIO:
+        hits.append("unsupported_alphabet")
+
+    # Upper-case words are mostly acronyms (CRM, PPC, SMB), which have no vowels to count.
+    latin_words = [word.lower() for word in re.findall(r"[^\W\d_]+", original)
+                   if word.isascii() and len(word) > 2 and not word.isupper()]
+    if config.PREFILTER_MAX_VOWELLESS_RATIO and latin_words and \
+            sum(not VOWELS & set(word) for word in latin_words) / len(latin_words) > config.PREFILTER_MAX_VOWELLESS_RATIO:
+        hits.append("gibberish")
+
+    if any(pattern.search(text) for pattern in (patterns or blocklist_patterns())):
+        hits.append("blocklist")
+
+    return hits
+
+
+def rule_hits(text, patterns=None):
+    """
+    Returns the names of the rules a text fails, ending with no_business_signal. A text only fails when
+    junk rules fire and it has no business term; an empty list means the LLM should classify it.
+    """
+    hits = junk_rules(text, patterns)
+    if not hits or BUSINESS_SIGNAL.search(normalize(text)):
+        return []
+    return hits + ["no_business_signal"]
+
+
+def prefilter_entries(file_id, entries):
+    """
+    Flags entries that fail a local rule as 'fail' without an API call and records which rules
+    fired. Returns the entries that still need the LLM.
+    """
+    if not config.PREFILTER_ENABLED or not entries:
+        return entries
+
+    patterns = blocklist_patterns()
+    rejected = []
+    remaining = []
+
+    for entry in entries:
+        hits = rule_hits(entry.raw_input, patterns)
+        if hits:
+            rejected.append((entry, hits))
+        else:
+            remaining.append(entry)
+
+    if not rejected:
+        return remaining
+
+    def write_chunk(chunk):
+        bulk_update(Entry, [
+            {"id": entry.id, "status": "fail", "stage": "flagged", "flag_source": "prefilter"} for entry, hits in chunk
+        ])
+        bulk_insert(PrefilterHit, [
+            {"entry_id": entry.id, "file_id": file_id, "rules": ",".join(hits)} for entry, hits in chunk
+        ])
+
+    with app.app_context():
+        write_in_chunks(rejected, write_chunk)
+
+    print(f"🧹 Prefilter failed {len(rejected)} of {len(entries)} entries without an API call.")
+    return remaining
+
+
+def prefilter_report(file_id=None):
+    """
+    Per file: entries failed by the prefilter, how often each rule fired, and the flagging
+    requests and input tokens those entries would have needed.
+    """
+    from app.services.flag_entries import FLAGGING_PROMPT, MODEL, OUTPUT_TOKENS_PER_ENTRY
+
+    with app.app_context():
+        query = db.session.query(PrefilterHit.file_id, PrefilterHit.rules, Entry.id, Entry.raw_input).join(
+            Entry, Entry.id == PrefilterHit.entry_id)
+        if file_id:
+            query = query.filter(PrefilterHit.file_id == file_id)
+
+        totals_query = db.session.query(Entry.file_id, func.count(Entry.id)).group_by(Entry.file_id)
+        if file_id:
+            totals_query = totals_query.filter(Entry.file_id == file_id)
+        totals = dict(totals_query.all())
+
+        files = {}
+        for hit_file_id, rules, entry_id, raw_input in query:
+            files.setdefault(hit_file_id, {"rules": Counter(), "items": []})
+            files[hit_file_id]["rules"].update(rules.split(","))
+            files[hit_file_id]["items"].append({"id": entry_id, "text": raw_input})
+
+    report = {}
+    for hit_file_id, data in files.items():
+        items = data["items"]
+        report[hit_file_id] = {
+            "entries": totals.get(hit_file_id, 0),
+            "prefiltered": len(items),
+            "rules": dict(data["rules"].most_common()),
+            "api_calls_saved": len(plan_batches(items, MODEL, FLAGGING_PROMPT, OUTPUT_TOKENS_PER_ENTRY)),
+            "input_tokens_saved": sum(estimate_tokens(item) for item in items),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # python app/services/prefilter.py [file_id]
+    print(json.dumps(prefilter_report(sys.argv[1] if len(sys.argv) > 1 else None), indent=4))
@@ -0,0 +1,227 @@
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import config
+from app.services import metrics
+from app.services.token_planner import estimate_tokens
+
+# One place for every LLM request: shared clients with pooled keep-alive connections, timeouts,
+# jittered exponential backoff on 429/5xx and per-provider request and token rate limits.
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+_clients = {}
+_limiters = {}
+_lock = threading.Lock()
+
+
+class ProviderError(Exception):
+    """A request that still failed after every retry."""
+
+    def __init__(self, provider, message, status_code=None):
+        super().__init__(f"{provider}: {message}")
+        self.status_code = status_code
+
+
+class RetryableError(Exception):
+    """A 429, 5xx, timeout or connection failure worth another attempt."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills per_minute units a minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Takes amount now, going into debt if needed, and returns the seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            # A single request larger than the bucket would otherwise never fit.
+            self.available -= min(amount, self.capacity)
+            return max(0.0, -self.available / self.rate)
+
+    def refund(self, amount):
+        with self.lock:
+            self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one provider. A limit of 0 is unlimited."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens):
+        """Reserves one request and the estimated tokens, sleeping until they are available. Returns the wait."""
+        wait = max(
+            self.requests.reserve(1) if self.requests else 0.0,
+            self.tokens.reserve(tokens) if self.tokens else 0.0,
+        )
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, estimated, actual):
+        """Corrects the token bucket once the provider reports the tokens a request really used."""
+        if self.tokens and actual is not None:
+            self.tokens.refund(estimated - actual)
+
+
+def rate_limiter(provider):
+    with _lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(
+                getattr(config, f"{provider.upper()}_REQUESTS_PER_MINUTE", 0),
+                getattr(config, f"{provider.upper()}_TOKENS_PER_MINUTE", 0),
+            )
+        return _limiters[provider]
+
+
+def openai_client():
+    # The SDK is imported with the first OpenAI request; it is the slowest import of the API and the CLIs.
+    import openai
+
+    with _lock:
+        if "openai" not in _clients:
+            # Retries are handled below so they go through the rate limiter too.
+            _clients["openai"] = openai.OpenAI(
+                api_key=config.OPENAI_API_KEY,
+                base_url=config.OPENAI_BASE_URL,
+                timeout=openai.Timeout(config.PROVIDER_READ_TIMEOUT, connect=config.PROVIDER_CONNECT_TIMEOUT),
+                max_retries=0,
+            )
+        return _clients["openai"]
+
+
+def http_session():
+    """Session shared by the OpenAI-compatible HTTP providers, with a keep-alive pool per host."""
+    with _lock:
+        if "http" not in _clients:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.PROVIDER_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _clients["http"] = session
+        return _clients["http"]
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, or the provider's Retry-After when it sends one."""
+    if retry_after is not None:
+        return min(retry_after, config.PROVIDER_BACKOFF_MAX)
+    return random.uniform(0, min(config.PROVIDER_BACKOFF_MAX, config.PROVIDER_BACKOFF_BASE * 2 ** attempt))
+
+
+def retry_after_seconds(headers):
+    try:
+        return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+    except ValueError:
+        return None
+
+
+def with_retries(provider, model, send, estimated_tokens):
+    """
+    Runs send() under the provider's rate limits. send returns (result, usage) or raises RetryableError;
+    retryable failures are retried with backoff up to PROVIDER_MAX_RETRIES times. usage is the
+    provider's {"prompt_tokens", "completion_tokens", "total_tokens"}, or None if it sent none.
+    Every attempt is timed and the usage is recorded in the metrics and the token ledger.
+    """
+    limiter = rate_limiter(provider)
+
+    for attempt in range(config.PROVIDER_MAX_RETRIES + 1):
+        waited = limiter.acquire(estimated_tokens)
+        if waited:
+            metrics.record_rate_limit_wait(provider, waited)
+
+        started = time.monotonic()
+        try:
+            result, usage = send()
+        except RetryableError as e:
+            metrics.record_request(provider, model, time.monotonic() - started, str(e.status_code or "network"))
+            limiter.settle(estimated_tokens, 0)
+            if attempt == config.PROVIDER_MAX_RETRIES:
+                raise ProviderError(provider, f"gave up after {attempt + 1} attempts: {e}", e.status_code) from e
+
+            metrics.record_retry(provider, str(e.status_code or "network"))
+            delay = backoff_delay(attempt, e.retry_after)
+            print(f"🔁 {provider} {e}; retrying in {delay:.1f}s ({attempt + 1}/{config.PROVIDER_MAX_RETRIES}).")
+            time.sleep(delay)
+        except ProviderError as e:
+            metrics.record_request(provider, model, time.monotonic() - started, str(e.status_code or "error"))
+            limiter.settle(estimated_tokens, 0)
+            raise
+        else:
+            metrics.record_request(provider, model, time.monotonic() - started, "ok", usage or {})
+            limiter.settle(estimated_tokens, (usage or {}).get("total_tokens"))
+            return result
+
+
+def request_tokens(messages, max_tokens=None):
+    return sum(estimate_tokens(message["content"]) for message in messages) + (max_tokens or 0)
+
+
+def openai_chat(**kwargs):
+    """chat.completions.create through the shared client; returns the SDK response."""
+    import openai
+
+    client = openai_client()
+
+    def send():
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except openai.RateLimitError as e:
+            raise RetryableError("rate limited (429)", 429, retry_after_seconds(e.response.headers)) from e
+        except openai.APIStatusError as e:
+            if e.status_code in RETRY_STATUSES:
+                raise RetryableError(f"HTTP {e.status_code}", e.status_code,
+                                     retry_after_seconds(e.response.headers)) from e
+            raise ProviderError("openai", str(e), e.status_code) from e
+        except (openai.APITimeoutError, openai.APIConnectionError) as e:
+            raise RetryableError(type(e).__name__) from e
+
+        usage = getattr(response, "usage", None)
+        return response, usage.model_dump() if usage is not None else None
+
+    return with_retries("openai", kwargs["model"], send, request_tokens(kwargs["messages"], kwargs.get("max_tokens")))
+
+
+def deepseek_chat(payload):
+    """POSTs a chat completion to the DeepSeek (OpenAI-compatible) API; returns the response JSON."""
+    session = http_session()
+    headers = {"Authorization": f"Bearer {config.DEEPSEEK_API_KEY}", "Content-Type": "application/json"}
+    url = f"{config.DEEPSEEK_BASE_URL}/chat/completions"
+
+    def send():
+        try:
+            response = session.post(url, json=payload, headers=headers,
+                                    timeout=(config.PROVIDER_CONNECT_TIMEOUT, config.PROVIDER_READ_TIMEOUT))
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise RetryableError(type(e).__name__) from e
+
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableError(f"HTTP {response.status_code}", response.status_code,
+                                 retry_after_seconds(response.headers))
+        if response.status_code != 200:
+            raise ProviderError("deepseek", f"HTTP {response.status_code}: {response.text}", response.status_code)
+
+        body = response.json()
+        return body, body.get("usage")
+
+    return with_retries("deepseek", payload["model"], send,
+                        request_tokens(payload["messages"], payload.get("max_tokens")))
@@ -0,0 +1,184 @@
+import sys
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.config import config
+
+EVICT_EVERY_WRITES = 1000
+
+
+def normalize(value):
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split())
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    return value
+
+
+def prompt_version(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def cache_key(stage, model, prompt, payload):
+    content = json.dumps(normalize(payload), sort_keys=True, ensure_ascii=False)
+    raw = f"{stage}\x1f{model}\x1f{prompt_version(prompt)}\x1f{content}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed store of per-entry LLM results.
+
+    Entries are keyed by stage, model, prompt version and the normalized input, never by
+    entry id, so the same inquiry uploaded in another file is served without an API call.
+    """
+
+    def __init__(self, path, enabled=True, max_entries=None, max_age_days=None):
+        self.path = path
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, stage TEXT NOT NULL, result TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache_stats ("
+                "stage TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, stage, model, prompt, items, id_key="id"):
+        """Returns {id: cached result} for the items already answered, with id_key restored."""
+        if not self.enabled or not items:
+            return {}
+
+        keys = {item[id_key]: cache_key(stage, model, prompt, _payload(item, id_key)) for item in items}
+        found = {}
+
+        with self._lock:
+            conn = self._connection()
+            unique_keys = list(set(keys.values()))
+
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, result FROM llm_cache WHERE key IN ({placeholders})", chunk)
+                found.update({key: json.loads(result) for key, result in rows})
+
+            hit_keys = [key for key in keys.values() if key in found]
+            now = time.time()
+            conn.executemany("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", [(now, key) for key in set(hit_keys)])
+            self._count(conn, stage, hits=len(hit_keys), misses=len(keys) - len(hit_keys))
+            conn.commit()
+
+        return {item_id: {**found[key], id_key: item_id} for item_id, key in keys.items() if key in found}
+
+    def store(self, stage, model, prompt, items, results, id_key="id"):
+        """Caches results ({id: result}) for the given input items."""
+        if not self.enabled or not results:
+            return
+
+        now = time.time()
+        rows = []
+        for item in items:
+            result = results.get(item[id_key])
+            if result is None:
+                continue
+            value = {key: val for key, val in result.items() if key != id_key}
+            rows.append((cache_key(stage, model, prompt, _payload(item, id_key)), stage, json.dumps(value), now, now))
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)", rows)
+            conn.commit()
+
+            self._writes += len(rows)
+            if self._writes >= EVICT_EVERY_WRITES:
+                self._writes = 0
+                self._evict(conn)
+
+    def evict(self):
+        with self._lock:
+            return self._evict(self._connection())
+
+    def _evict(self, conn):
+        removed = 0
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,)).rowcount
+        if self.max_entries:
+            removed += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        conn.commit()
+        return removed
+
+    def _count(self, conn, stage, hits, misses):
+        conn.execute(
+            "INSERT INTO llm_cache_stats (stage, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT(stage) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            (stage, hits, misses),
+        )
+
+    def stats(self):
+        with self._lock:
+            conn = self._connection()
+            size = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            counters = {
+                stage: {"hits": hits, "misses": misses}
+                for stage, hits, misses in conn.execute("SELECT stage, hits, misses FROM llm_cache_stats")
+            }
+        return {"entries": size, "stages": counters}
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_cache")
+            conn.execute("DELETE FROM llm_cache_stats")
+            conn.commit()
+
+
+def _payload(item, id_key):
+    return {key: value for key, value in item.items() if key != id_key}
+
+
+result_cache = ResultCache(
+    config.LLM_CACHE_PATH,
+    enabled=config.LLM_CACHE_ENABLED,
+    max_entries=config.LLM_CACHE_MAX_ENTRIES,
+    max_age_days=config.LLM_CACHE_MAX_AGE_DAYS,
+)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "clear":
+        result_cache.clear()
+        print("✅ LLM result cache cleared.")
+    elif command == "evict":
+        print(f"✅ Evicted {result_cache.evict()} cached results.")
+    else:
+        print(json.dumps(result_cache.stats(), indent=4))
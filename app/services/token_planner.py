@@ -0,0 +1,55 @@
+import json
+import math
+
+from app.config import config
+
+# Rough local estimate; English prose and JSON average close to 4 characters per token,
+# 3.5 keeps the estimate on the safe side for numbers and punctuation.
+CHARS_PER_TOKEN = 3.5
+DEFAULT_BUDGET = {"input": 8000, "output": 4000}
+
+
+def estimate_tokens(value):
+    text = value if isinstance(value, str) else json.dumps(value)
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def token_budget(model):
+    return config.MODEL_TOKEN_BUDGETS.get(model, DEFAULT_BUDGET)
+
+
+def plan_batches(items, model, prompt, output_tokens, max_items=None):
+    """
+    Packs items into batches that stay within the model's input and output token budget.
+
+    prompt is the system prompt sent with every batch. output_tokens is either a fixed
+    estimate per item or a callable (item, input_tokens) -> estimate. An item that exceeds
+    the budget on its own is still sent, alone in its batch.
+    """
+    budget = token_budget(model)
+    max_items = max_items or config.BATCH_MAX_ITEMS
+    prompt_tokens = estimate_tokens(prompt)
+
+    batches = []
+    batch, batch_input, batch_output = [], prompt_tokens, 0
+
+    for item in items:
+        item_input = estimate_tokens(item)
+        item_output = output_tokens(item, item_input) if callable(output_tokens) else output_tokens
+
+        if batch and (
+            batch_input + item_input > budget["input"]
+            or batch_output + item_output > budget["output"]
+            or len(batch) >= max_items
+        ):
+            batches.append(batch)
+            batch, batch_input, batch_output = [], prompt_tokens, 0
+
+        batch.append(item)
+        batch_input += item_input
+        batch_output += item_output
+
+    if batch:
+        batches.append(batch)
+
+    return batches
@@ -0,0 +1,51 @@
+import json
+
+from app.config import config
+
+# Compact request and response encoding for the LLM stages (COMPACT_WIRE_FORMAT=1). Records are sent as
+# JSON arrays in a fixed column order described once in the stage's system prompt, trailing nulls are
+# dropped, enum values travel as one-letter codes and answers carry only ids and codes. The system prompts
+# never change between batches, so providers that cache prompt prefixes can reuse them.
+PRIORITY_CODES = {"Urgent": "U", "High": "H", "Medium": "M", "Low": "L"}
+SENTIMENT_CODES = {"Hot": "H", "Neutral": "N", "Cold": "C"}
+PRIORITY_LEVELS = {code: level for level, code in PRIORITY_CODES.items()}
+SENTIMENTS = {code: sentiment for sentiment, code in SENTIMENT_CODES.items()}
+
+
+def enabled():
+    return config.COMPACT_WIRE_FORMAT
+
+
+def dumps(value):
+    """JSON for a request body; compact mode drops the spaces and sends UTF-8 instead of \\u escapes."""
+    if enabled():
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(value)
+
+
+def row(*values):
+    """A record as a JSON array, with trailing nulls and empty strings dropped."""
+    values = list(values)
+    while values and values[-1] in (None, ""):
+        values.pop()
+    return values
+
+
+def code(mapping, value):
+    return mapping.get(value, value)
+
+
+def row_format(*columns):
+    """The line that tells the model (and scripts/mock_llm_server.py) what each answer row holds."""
+    return f"Output row: [{', '.join(columns)}]"
+
+
+def parse_rows(text):
+    """Answer rows from a JSON list of arrays; None if the text is not a JSON list."""
+    try:
+        rows = json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    if not isinstance(rows, list):
+        return None
+    return [item for item in rows if isinstance(item, list) and item]
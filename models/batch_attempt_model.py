@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from app.database import db
+from models.entry_model import Entry
+
+
+class BatchAttempt(db.Model):
+    __table_args__ = (
+        db.Index("ix_batch_attempt_entry_id", "entry_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey(Entry.id, ondelete="CASCADE"), nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # "flagging", "structuring", "priority", "audit"
+    attempts = db.Column(db.Integer, nullable=False)
+    resolved = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<BatchAttempt Entry {self.entry_id}, Stage: {self.stage}, Attempts: {self.attempts}>"
@@ -2,6 +2,11 @@ from app.database import db
 
 
 class EdgeCase(db.Model):
+    __table_args__ = (
+        db.Index("ix_edge_case_file_id", "file_id"),
+        db.Index("ix_edge_case_entry_id", "entry_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     entry_id = db.Column(db.Integer, db.ForeignKey('entry.id'), nullable=False)
     file_id = db.Column(db.String(100), nullable=False)
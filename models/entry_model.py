@@ -1,11 +1,25 @@
 from app.database import db
 
+# Last pipeline stage each entry has completed. Entries not flagged 'success' stop at "flagged".
+ENTRY_STAGES = ("pending", "flagged", "structured", "prioritised", "audited")
+
 
 class Entry(db.Model):
+    __table_args__ = (
+        db.Index("ix_entry_file_id_status", "file_id", "status"),
+        db.Index("ix_entry_file_id_stage", "file_id", "stage"),
+        db.Index("ix_entry_duplicate_of", "duplicate_of"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     raw_input = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(20), nullable=False)  # "success", "fail", "edge case"
     file_id = db.Column(db.String(100), nullable=False)
+    stage = db.Column(db.String(20), nullable=False, default="pending", server_default="pending")
+    flag_source = db.Column(db.String(20), nullable=True)  # "llm", "prefilter", "classifier", "cluster"; NULL before flagging
+    # Representative of this entry's near-duplicate cluster; its flag is copied here, and its structured lead
+    # too when the texts only differ in case, whitespace or punctuation.
+    duplicate_of = db.Column(db.Integer, db.ForeignKey("entry.id"), nullable=True)
 
     def __repr__(self):
-        return f"<Entry {self.id}, Status: {self.status}, 'File: {self.file_id}>"
+        return f"<Entry {self.id}, Status: {self.status}, Stage: {self.stage}, 'File: {self.file_id}>"
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from app.database import db
+
+
+class Job(db.Model):
+    __table_args__ = (
+        db.Index("ix_job_file_id_status", "file_id", "status"),
+        db.Index("ix_job_status_created_at", "status", "created_at"),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    file_id = db.Column(db.String(100), nullable=False)
+    file_name = db.Column(db.String(255), nullable=True)
+    action = db.Column(db.String(20), nullable=False, default="process", server_default="process")  # "process", "resume"
+    mode = db.Column(db.String(20), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # "queued", "running", "completed", "failed"
+    stage = db.Column(db.String(20), nullable=True)
+    owner = db.Column(db.String(255), nullable=True)  # "host:pid" of the process running the job
+    progress = db.Column(db.Text, nullable=True)  # JSON: {stage: {"status": ..., "entries": ...}}
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.id}, File ID: {self.file_id}, Status: {self.status}>"
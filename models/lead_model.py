@@ -3,6 +3,11 @@ from models.entry_model import Entry
 
 
 class Lead(db.Model):
+    __table_args__ = (
+        db.Index("ix_lead_file_id_audit_priority", "file_id", "audit_AI_priority_level"),
+        db.Index("ix_lead_entry_id", "entry_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     file_id = db.Column(db.String(255), nullable=False)
     entry_id = db.Column(db.Integer, db.ForeignKey(Entry.id, ondelete="CASCADE"), nullable=False)
@@ -19,6 +24,9 @@ class Lead(db.Model):
     audit_AI_priority_level = db.Column(db.String(50), nullable=True)
     audit_AI_notes = db.Column(db.Text, nullable=True)
     audit_accuracy_score = db.Column(db.Float, nullable=True)
+    # "audited" (every lead of the file), "sampled" (in an AUDIT_MODE=sample sample) or "unaudited"
+    # (left out of the sample; no audit fields). NULL until the audit stage reaches the lead.
+    audit_status = db.Column(db.String(20), nullable=True)
 
     def __repr__(self):
         return f"<Lead {self.id}, File ID: {self.file_id}>"
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from app.database import db
+from models.entry_model import Entry
+
+
+class PrefilterHit(db.Model):
+    __table_args__ = (
+        db.Index("ix_prefilter_hit_file_id", "file_id"),
+        db.Index("ix_prefilter_hit_entry_id", "entry_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey(Entry.id, ondelete="CASCADE"), nullable=False)
+    file_id = db.Column(db.String(100), nullable=False)
+    rules = db.Column(db.String(255), nullable=False)  # comma-separated names of the rules that fired
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PrefilterHit Entry {self.entry_id}, Rules: {self.rules}>"
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from app.database import db
+
+
+class TokenUsage(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint("file_id", "stage", "model", name="uq_token_usage_file_stage_model"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.String(100), nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # batch stage, e.g. "flagging", "classification", "audit_notes"
+    provider = db.Column(db.String(20), nullable=False)
+    model = db.Column(db.String(50), nullable=False)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cost_usd = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TokenUsage {self.file_id} {self.stage} {self.model}: {self.prompt_tokens}+{self.completion_tokens}>"
@@ -0,0 +1,70 @@
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import config
+from app.services.clustering import find_clusters
+from app.services.token_planner import plan_batches
+from app.services import flag_entries, lead_qualifier
+from scripts.synthetic_leads import synthetic_upload
+
+# Builds synthetic uploads (scripts/synthetic_leads.py) where a share of the inquiries are template
+# copies or resubmissions, times the clustering pass, checks it against the known groups and estimates the API time the
+# duplicates no longer need in flagging and structuring.
+DEFAULT_SIZES = (10_000, 100_000)
+# Share of flagged entries that are leads and go on to structuring.
+SUCCESS_SHARE = 0.7
+
+
+def requests_needed(texts, module, prompt, output_tokens):
+    return len(plan_batches([{"id": n, "text": text} for n, text in enumerate(texts)], module.MODEL, prompt,
+                            output_tokens))
+
+
+def benchmark(total, request_seconds):
+    texts, groups = synthetic_upload(total)
+    ids = list(range(1, total + 1))
+
+    started = time.monotonic()
+    duplicate_of = find_clusters(ids, texts)
+    clustering_seconds = time.monotonic() - started
+
+    linked_correctly = sum(groups[entry_id - 1] == groups[representative - 1]
+                           for entry_id, representative in duplicate_of.items())
+    true_duplicates = total - len(set(groups))
+    kept = [text for entry_id, text in zip(ids, texts) if entry_id not in duplicate_of]
+
+    saved = 0
+    for module, prompt, output_tokens, share in (
+        (flag_entries, flag_entries.FLAGGING_PROMPT, flag_entries.OUTPUT_TOKENS_PER_ENTRY, 1.0),
+        (lead_qualifier, lead_qualifier.STRUCTURING_PROMPT, lead_qualifier.estimate_structuring_output, SUCCESS_SHARE),
+    ):
+        before = requests_needed(texts[:int(len(texts) * share)], module, prompt, output_tokens)
+        after = requests_needed(kept[:int(len(kept) * share)], module, prompt, output_tokens)
+        saved += before - after
+
+    # Requests run OPENAI_MAX_IN_FLIGHT at a time, so wall-clock time saved is the request time divided by that.
+    api_seconds_saved = saved * request_seconds / config.OPENAI_MAX_IN_FLIGHT
+
+    print(f"\n=== {total:,} entries ({true_duplicates:,} generated duplicates) ===")
+    print(f"clusters: {total - len(duplicate_of):,}  cluster ratio: {(total - len(duplicate_of)) / total:.3f}")
+    print(f"duplicates found: {len(duplicate_of):,} (recall {linked_correctly / true_duplicates:.1%}, "
+          f"precision {linked_correctly / max(len(duplicate_of), 1):.1%})")
+    print(f"clustering time: {clustering_seconds:.2f}s ({clustering_seconds * 1e6 / total:.0f} µs per entry)")
+    print(f"flagging + structuring requests saved: {saved:,} ≈ {api_seconds_saved:,.0f}s of API time "
+          f"at {request_seconds}s per request, {config.OPENAI_MAX_IN_FLIGHT} in flight")
+    print(f"API time saved per second of clustering: {api_seconds_saved / clustering_seconds:,.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clustering cost versus LLM time saved on synthetic uploads.")
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--request-seconds", type=float, default=8.0,
+                        help="average latency of one batch request (default 8s)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        benchmark(size, args.request_seconds)
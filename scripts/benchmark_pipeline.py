@@ -0,0 +1,147 @@
+import sys
+import os
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+import requests
+
+# Benchmarks always run against a throwaway database with the result cache and the local classifier off,
+# so every run makes the same LLM calls and leads.db is never touched.
+BENCH_DIR = tempfile.mkdtemp(prefix="lead_pipeline_bench_")
+os.environ["DB_PATH"] = os.path.join(BENCH_DIR, "leads.db")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["LOCAL_CLASSIFIER_ENABLED"] = "0"
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+os.environ.setdefault("DEEPSEEK_API_KEY", "mock")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import get_app
+from app.config import config
+from app.database import db
+from app.services.export import OUTPUT_FOLDER
+from app.services.pipeline import PIPELINE_MODES, PipelineError
+from app.services.job_queue import process_upload
+from scripts.populate_db import DATA_DIR
+from scripts.synthetic_leads import write_upload
+from scripts.mock_llm_server import add_mock_arguments, settings_from_args, start_mock_server
+
+# Drives the same path as POST /process-file?sync=true (ingest, clustering, every stage, output files)
+# over synthetic uploads, with both providers pointed at the mock LLM server, and reports per-stage wall
+# time and entries/second plus the calls, items and tokens the mock served for each kind of request.
+# Usage: python scripts/benchmark_pipeline.py [entries ...] [--batch-items N ...] [--mode streaming]
+#        [mock options, e.g. --openai-latency fixed:0.2 --error-rate 0.02]
+DEFAULT_SIZES = (100, 10_000, 100_000)
+
+app = get_app()
+
+
+def stage_timer():
+    """on_progress callback recording when each stage starts and completes, and the entries it passed."""
+    stages = {}
+
+    def on_progress(stage, status, entries=0):
+        now = time.monotonic()
+        timing = stages.setdefault(stage, {"started": now, "finished": now, "entries": 0})
+        timing["entries"] += entries
+        if status == "completed":
+            timing["finished"] = now
+
+    return stages, on_progress
+
+
+def start_mock(args):
+    """Points both providers at --mock-url, or at a mock server started here; returns (server, url)."""
+    server = None
+    if args.mock_url:
+        mock_url = args.mock_url.rstrip("/")
+    else:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = start_mock_server(settings_from_args(args))
+        mock_url = f"http://127.0.0.1:{server.server_port}"
+    config.OPENAI_BASE_URL = config.DEEPSEEK_BASE_URL = f"{mock_url}/v1"
+    return server, mock_url
+
+
+def process(file_id, file_name, mode, mock_url):
+    """Runs one upload from data/ through the pipeline and removes its output files.
+
+    Returns the stage timings, the elapsed seconds, the mock's per-request stats and the pipeline error, if any.
+    """
+    requests.post(f"{mock_url}/reset")
+    stages, on_progress = stage_timer()
+    started = time.monotonic()
+    try:
+        process_upload(file_id, file_name, mode, on_progress)
+        error = None
+    except PipelineError as e:
+        error = str(e)
+    elapsed = time.monotonic() - started
+    served = requests.get(f"{mock_url}/stats").json()
+
+    for path in (os.path.join(OUTPUT_FOLDER, f"{file_id}.json"), os.path.join(OUTPUT_FOLDER, f"{file_id}.csv")):
+        if os.path.exists(path):
+            os.remove(path)
+    return stages, elapsed, served, error
+
+
+def run(total, batch_items, mode, mock_url):
+    config.BATCH_MAX_ITEMS = batch_items
+    file_id = f"bench_{total}_{batch_items}_{int(time.time())}"
+    file_name = f"{file_id}.ndjson"
+    write_upload(os.path.join(DATA_DIR, file_name), total)
+    try:
+        stages, elapsed, served, error = process(file_id, file_name, mode, mock_url)
+    finally:
+        os.remove(os.path.join(DATA_DIR, file_name))
+
+    print(f"\n=== {total:,} entries, {batch_items} items per batch, {mode} mode ===")
+    if error:
+        print(f"⚠️ {error}")
+    print(f"{'stage':<14}{'wall s':>10}{'entries':>10}{'entries/s':>12}")
+    for stage, timing in stages.items():
+        seconds = timing["finished"] - timing["started"]
+        rate = timing["entries"] / seconds if seconds else 0
+        print(f"{stage:<14}{seconds:>10.2f}{timing['entries']:>10,}{rate:>12,.1f}")
+    print(f"{'total':<14}{elapsed:>10.2f}{total:>10,}{total / elapsed:>12,.1f}")
+
+    print(f"\n{'request':<24}{'calls':>8}{'items':>10}{'prompt tok':>12}{'output tok':>12}  outcomes")
+    for kind, stats in sorted(served.items()):
+        outcomes = ", ".join(f"{outcome} {count}" for outcome, count in sorted(stats["outcomes"].items()))
+        print(f"{kind:<24}{stats['calls']:>8,}{stats['items']:>10,}{stats['prompt_tokens']:>12,}"
+              f"{stats['completion_tokens']:>12,}  {outcomes}")
+    calls = sum(stats["calls"] for stats in served.values())
+    tokens = sum(stats["prompt_tokens"] + stats["completion_tokens"] for stats in served.values())
+    print(f"{'total':<24}{calls:>8,}{'':>10}{tokens:>24,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline throughput against the mock LLM server.")
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--batch-items", nargs="+", type=int, default=[config.BATCH_MAX_ITEMS],
+                        help="BATCH_MAX_ITEMS values to compare (default: the configured one)")
+    parser.add_argument("--mode", choices=PIPELINE_MODES, default=config.PIPELINE_MODE)
+    parser.add_argument("--in-flight", type=int, help="OPENAI_MAX_IN_FLIGHT and DEEPSEEK_MAX_IN_FLIGHT")
+    parser.add_argument("--mock-url", help="use an already running mock_llm_server.py, e.g. http://127.0.0.1:8765")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if args.in_flight:
+        config.OPENAI_MAX_IN_FLIGHT = config.DEEPSEEK_MAX_IN_FLIGHT = args.in_flight
+
+    server, mock_url = start_mock(args)
+
+    with app.app_context():
+        db.create_all()
+
+    try:
+        for size in args.sizes:
+            for batch_items in args.batch_items:
+                run(size, batch_items, args.mode, mock_url)
+    finally:
+        if server:
+            server.shutdown()
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
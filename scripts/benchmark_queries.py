@@ -0,0 +1,192 @@
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import statistics
+
+from sqlalchemy import and_, create_engine, func, or_, select, text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import db
+from models.entry_model import ENTRY_STAGES, Entry
+from models.lead_model import Lead
+from models.job_model import Job
+from models.edge_case_model import EdgeCase
+from models.batch_attempt_model import BatchAttempt
+
+# Builds a throwaway SQLite database per size, filled with synthetic history split into files of
+# FILE_SIZE entries, and times the pipeline's hot queries for one file with and without indexes.
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+FILE_SIZE = 1000
+REPEATS = 5
+INSERT_CHUNK_SIZE = 20_000
+TARGET_FILE = "benchmark_target"
+
+entry_table = Entry.__table__
+lead_table = Lead.__table__
+edge_case_table = EdgeCase.__table__
+
+
+def hot_queries(file_id):
+    """The lookups each pipeline stage and endpoint runs for one file, written as in the services."""
+    return [
+        ("flagging: pending entries",
+         select(entry_table).where(Entry.file_id == file_id, Entry.stage == "pending")),
+        ("structuring: success entries",
+         select(entry_table).where(Entry.status == "success", Entry.file_id == file_id, Entry.stage == "flagged")),
+        ("progress: count_entries",
+         select(func.count()).select_from(entry_table)
+         .where(Entry.file_id == file_id, Entry.stage.in_(ENTRY_STAGES[ENTRY_STAGES.index("structured"):]))),
+        ("resume: unfinished_entries",
+         unfinished_entries_query(file_id)),
+        ("priority: leads join entry",
+         select(lead_table).join(entry_table, Entry.id == Lead.entry_id)
+         .where(Lead.file_id == file_id, Entry.stage == "structured")),
+        ("export: leads by priority",
+         select(lead_table).where(Lead.file_id == file_id).order_by(Lead.audit_AI_priority_level.desc())),
+        ("get_edge_cases",
+         select(edge_case_table).where(EdgeCase.file_id == file_id)),
+    ]
+
+
+def unfinished_entries_query(file_id):
+    # Same statement app.services.checkpoints.unfinished_entries() builds through the session.
+    return (
+        select(Entry.stage, func.count(Entry.id))
+        .where(Entry.file_id == file_id)
+        .where(or_(Entry.stage == "pending", and_(Entry.status == "success", Entry.stage != "audited")))
+        .group_by(Entry.stage)
+    )
+
+
+def synthetic_rows(total):
+    """Yields (entry, lead or None, edge case or None). The target file sits in the middle of the history."""
+    target_file = (total // FILE_SIZE) // 2
+    statuses = ["success"] * 7 + ["fail"] * 2 + ["edge case"]
+    rng = random.Random(42)
+
+    for entry_id in range(1, total + 1):
+        file_number = (entry_id - 1) // FILE_SIZE
+        in_target = file_number == target_file
+        file_id = TARGET_FILE if in_target else f"history_{file_number}"
+        raw_input = f"Inquiry {entry_id}: looking for help growing a SaaS business, budget around ${rng.randint(1, 50)}K."
+
+        if in_target and rng.random() < 0.3:
+            status, stage = "pending", "pending"
+        else:
+            status = rng.choice(statuses)
+            stage = ("structured" if in_target else "audited") if status == "success" else "flagged"
+
+        entry = {"id": entry_id, "raw_input": raw_input, "status": status, "stage": stage, "file_id": file_id}
+        lead = None
+        edge_case = None
+
+        if status == "success":
+            lead = {
+                "file_id": file_id, "entry_id": entry_id, "industry": "SaaS", "business_model": "B2B",
+                "budget": "$10K", "urgency": "High", "lead_sentiment": "Warm",
+                "leads_AI_priority_level": None if in_target else rng.choice(["Urgent", "High", "Medium", "Low"]),
+                "audit_AI_priority_level": None if in_target else rng.choice(["Urgent", "High", "Medium", "Low"]),
+            }
+        elif status == "edge case":
+            edge_case = {"entry_id": entry_id, "file_id": file_id, "raw_input": raw_input,
+                         "reason": "Ambiguous request."}
+
+        yield entry, lead, edge_case
+
+
+def populate(engine, total):
+    batches = {entry_table: [], lead_table: [], edge_case_table: []}
+
+    def flush(conn):
+        for table, rows in batches.items():
+            if rows:
+                conn.execute(table.insert(), rows)
+                rows.clear()
+
+    with engine.begin() as conn:
+        for entry, lead, edge_case in synthetic_rows(total):
+            batches[entry_table].append(entry)
+            if lead:
+                batches[lead_table].append(lead)
+            if edge_case:
+                batches[edge_case_table].append(edge_case)
+
+            if len(batches[entry_table]) >= INSERT_CHUNK_SIZE:
+                flush(conn)
+        flush(conn)
+
+
+def drop_indexes(engine):
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(bind=conn, checkfirst=True)
+
+
+def create_indexes(engine):
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        conn.execute(text("ANALYZE"))
+
+
+def time_query(conn, statement):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        conn.execute(statement).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def query_plan(conn, statement):
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return "; ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def measure(engine):
+    results = {}
+    with engine.connect() as conn:
+        for name, statement in hot_queries(TARGET_FILE):
+            results[name] = (time_query(conn, statement), query_plan(conn, statement))
+    return results
+
+
+def benchmark(total, workdir):
+    path = os.path.join(workdir, f"benchmark_{total}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    drop_indexes(engine)
+
+    started = time.monotonic()
+    populate(engine, total)
+    print(f"\n{total:,} entries ({total // FILE_SIZE:,} files) generated in {time.monotonic() - started:.1f}s")
+
+    before = measure(engine)
+    started = time.monotonic()
+    create_indexes(engine)
+    print(f"Indexes built in {time.monotonic() - started:.1f}s")
+    after = measure(engine)
+    engine.dispose()
+
+    print(f"{'query':<30} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after")
+    for name in before:
+        before_ms, _ = before[name]
+        after_ms, plan = after[name]
+        speedup = before_ms / after_ms if after_ms else float("inf")
+        print(f"{name:<30} {before_ms:>10.2f} {after_ms:>10.2f} {speedup:>7.0f}x  {plan}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    workdir = tempfile.mkdtemp(prefix="lead_benchmark_")
+    try:
+        for size in sizes:
+            benchmark(size, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,140 @@
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Cold start of the API and the CLI entry points: each target is imported in a fresh interpreter
+# (python -X importtime), against a throwaway database. Reports process wall time, the target's own
+# import time, the Flask apps, SQLAlchemy engines and database connections that exist once it is
+# imported, and for the API the latency of the first request. --top lists the slowest packages.
+# Usage: python scripts/benchmark_startup.py [--repeat 5] [--top 10] [targets ...]
+TARGETS = {
+    "api": "app.main",
+    "populate_db": "scripts.populate_db",
+    "resume_file": "scripts.resume_file",
+    "delete_entry": "scripts.delete_entry",
+    "init_db": "scripts.init_db",
+    "migrate_db": "scripts.migrate_db",
+    "metrics": "app.services.metrics",
+    "view_leads": "views.view_leads",
+    "view_entries": "views.view_entries",
+    "view_edge_cases": "views.view_edge_cases",
+}
+FIRST_REQUEST = "/get_leads?file_id=startup_bench"
+
+# Runs in the child interpreter. The connect listener is registered before the target is imported, so
+# connections opened at import time are counted too.
+PROBE = """
+import gc, sys, json, time, importlib
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+connections = []
+event.listen(Engine, "connect", lambda *args: connections.append(1))
+sys.path.insert(0, {root!r})
+try:
+    module = importlib.import_module({module!r})
+except Exception as e:
+    print(json.dumps({{"error": f"{{type(e).__name__}}: {{e}}"}}))
+    sys.exit(0)
+imported = time.perf_counter()
+result = {{"import_seconds": imported - started, "import_connections": len(connections)}}
+if {request!r}:
+    response = module.app.test_client().get({request!r})
+    result["request_seconds"] = time.perf_counter() - imported
+    result["status"] = response.status_code
+import flask
+# type() rather than isinstance(): openai's lazy numpy/pandas proxies import them on any attribute access.
+types = [type(obj) for obj in gc.get_objects()]
+result["apps"] = sum(issubclass(kind, flask.Flask) for kind in types)
+result["engines"] = sum(issubclass(kind, Engine) for kind in types)
+result["connections"] = len(connections)
+print(json.dumps(result))
+"""
+
+
+def run_target(name, module, workdir, env):
+    code = PROBE.format(root=ROOT, module=module, request=FIRST_REQUEST if name == "api" else "")
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=workdir, env=env,
+                               capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode or not lines:
+        return {"error": (completed.stderr.strip().splitlines() or ["no output"])[-1]}, completed.stderr
+    result = json.loads(lines[-1])
+    result["wall_seconds"] = wall
+    return result, completed.stderr
+
+
+def slowest_packages(importtime, top):
+    """(ms, package) of the top-level packages that took longest to import, from a -X importtime log.
+
+    Module code runs in its own import, so app setup and client construction at import time show up
+    under the project's own packages (app, models, scripts, views).
+    """
+    totals = {}
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        package = module.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(own) / 1000
+    return sorted(((ms, package) for package, ms in totals.items()), reverse=True)[:top]
+
+
+def main(names, repeat, top):
+    workdir = tempfile.mkdtemp(prefix="lead_pipeline_startup_")
+    # app/main.py logs to ../logs relative to the working directory.
+    os.makedirs(os.path.join(workdir, "app"))
+    os.makedirs(os.path.join(workdir, "logs"))
+    env = {**os.environ, "DB_PATH": os.path.join(workdir, "leads.db")}
+    subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "init_db.py")], env=env, capture_output=True)
+
+    try:
+        print(f"{'target':<18}{'wall s':>9}{'import s':>10}{'request s':>11}{'apps':>6}{'engines':>9}"
+              f"{'conn@import':>13}")
+        for name in names:
+            runs = []
+            importtime = ""
+            for n in range(repeat):
+                result, log = run_target(name, TARGETS[name], os.path.join(workdir, "app"), env)
+                if "error" in result:
+                    break
+                runs.append(result)
+                importtime = importtime or log
+            if not runs:
+                print(f"{name:<18}⚠️ {result['error']}")
+                continue
+
+            def median(key):
+                values = [run[key] for run in runs if key in run]
+                return f"{statistics.median(values):.3f}" if values else "-"
+
+            last = runs[-1]
+            print(f"{name:<18}{median('wall_seconds'):>9}{median('import_seconds'):>10}{median('request_seconds'):>11}"
+                  f"{last['apps']:>6}{last['engines']:>9}{last['import_connections']:>13}")
+            if top:
+                for ms, package in slowest_packages(importtime, top):
+                    print(f"{'':<4}{ms:>8.1f} ms  {package}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time and cold start of the API and CLI scripts.")
+    parser.add_argument("targets", nargs="*", help=f"any of: {', '.join(TARGETS)} (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target (median reported)")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest packages per target")
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    main(args.targets or list(TARGETS), args.repeat, args.top)
@@ -0,0 +1,123 @@
+import sys
+import os
+import time
+import shutil
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.benchmark_pipeline import BENCH_DIR, app, process, start_mock
+from app.config import config
+from app.database import db
+from app.services.pipeline import PIPELINE_MODES
+from scripts.populate_db import DATA_DIR
+from scripts.synthetic_leads import write_upload
+from scripts.mock_llm_server import add_mock_arguments
+
+# Runs the same upload through the pipeline twice against the mock LLM server, once with the keyed JSON
+# requests and answers (COMPACT_WIRE_FORMAT=0) and once with the compact rows, and compares prompt and
+# output tokens per lead and mean request latency for each stage. The mock charges latency per output
+# token (--seconds-per-output-token), so shorter answers show up as faster requests; the batch planner
+# fits more leads into a request when they are cheaper, which is why leads/request is shown next to it.
+# Usage: python scripts/benchmark_wire_format.py [--entries 2000 | --corpus data/demo_data2.json]
+#        [--audit-mode independent] [--fused] [mock options]
+FORMATS = (("keyed", False), ("compact", True))
+# Mock request kinds (OpenAI schema names and DeepSeek prompt kinds) by pipeline stage.
+STAGES = {
+    "entry_flags": "flagging",
+    "entry_flags_and_leads": "flag_structure",
+    "lead_data": "structuring",
+    "lead_fields": "structuring",
+    "priority_assignment": "priority",
+    "priority_codes": "priority",
+    "classification": "classification",
+    "audit": "audit",
+    "audit_notes": "audit_notes",
+}
+
+
+def per_stage(served):
+    totals = {}
+    for kind, stats in served.items():
+        stage = totals.setdefault(STAGES.get(kind, kind), {"calls": 0, "items": 0, "prompt_tokens": 0,
+                                                            "completion_tokens": 0, "seconds": 0.0})
+        for key in stage:
+            stage[key] += stats[key]
+    return totals
+
+
+def per_lead(stats, key):
+    return stats[key] / stats["items"] if stats["items"] else 0
+
+
+def change(before, after):
+    return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+
+def compare(mode, corpus, mock_url):
+    runs = {}
+    for name, compact in FORMATS:
+        config.COMPACT_WIRE_FORMAT = compact
+        file_id = f"wire_{name}_{int(time.time())}"
+        file_name = file_id + os.path.splitext(corpus)[1]
+        shutil.copy(corpus, os.path.join(DATA_DIR, file_name))
+        try:
+            stages, elapsed, served, error = process(file_id, file_name, mode, mock_url)
+        finally:
+            os.remove(os.path.join(DATA_DIR, file_name))
+        if error:
+            print(f"⚠️ {name}: {error}")
+        runs[name] = (per_stage(served), elapsed)
+        print(f"✅ {name} run finished in {elapsed:.1f}s")
+
+    keyed, keyed_elapsed = runs["keyed"]
+    compact, compact_elapsed = runs["compact"]
+    print(f"\n{'stage':<16}{'prompt tok/lead':>26}{'output tok/lead':>26}{'mean request s':>24}{'leads/request':>18}")
+    for stage in keyed:
+        before, after = keyed[stage], compact.get(stage)
+        if not after:
+            continue
+        columns = []
+        for key in ("prompt_tokens", "completion_tokens"):
+            old, new = per_lead(before, key), per_lead(after, key)
+            columns.append(f"{old:.1f} → {new:.1f} ({change(old, new)})")
+        old, new = before["seconds"] / before["calls"], after["seconds"] / after["calls"]
+        columns.append(f"{old:.2f} → {new:.2f} ({change(old, new)})")
+        columns.append(f"{before['items'] / before['calls']:.1f} → {after['items'] / after['calls']:.1f}")
+        print(f"{stage:<16}{columns[0]:>26}{columns[1]:>26}{columns[2]:>24}{columns[3]:>18}")
+
+    old = sum(stats["prompt_tokens"] + stats["completion_tokens"] for stats in keyed.values())
+    new = sum(stats["prompt_tokens"] + stats["completion_tokens"] for stats in compact.values())
+    print(f"\nTotal tokens: {old:,} → {new:,} ({change(old, new)})")
+    print(f"Wall time: {keyed_elapsed:.1f}s → {compact_elapsed:.1f}s ({change(keyed_elapsed, compact_elapsed)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyed vs compact LLM wire format, tokens and latency per stage.")
+    parser.add_argument("--entries", type=int, default=2000, help="synthetic corpus size (fixed seed)")
+    parser.add_argument("--corpus", help="an upload file to use instead, e.g. data/demo_data2.json")
+    parser.add_argument("--mode", choices=PIPELINE_MODES, default=config.PIPELINE_MODE)
+    parser.add_argument("--audit-mode", choices=("review", "independent", "sample"), default=config.AUDIT_MODE)
+    parser.add_argument("--fused", action="store_true", help="run with FUSED_FLAGGING on")
+    parser.add_argument("--in-flight", type=int, default=16, help="OPENAI_MAX_IN_FLIGHT and DEEPSEEK_MAX_IN_FLIGHT")
+    parser.add_argument("--mock-url", help="use an already running mock_llm_server.py, e.g. http://127.0.0.1:8765")
+    add_mock_arguments(parser)
+    parser.set_defaults(openai_latency="fixed:0.3", deepseek_latency="fixed:0.5", seconds_per_item=0.0,
+                        seconds_per_output_token=0.012)
+    args = parser.parse_args()
+
+    config.AUDIT_MODE = args.audit_mode
+    config.FUSED_FLAGGING = args.fused
+    config.OPENAI_MAX_IN_FLIGHT = config.DEEPSEEK_MAX_IN_FLIGHT = args.in_flight
+    server, mock_url = start_mock(args)
+
+    with app.app_context():
+        db.create_all()
+
+    try:
+        corpus = args.corpus or write_upload(os.path.join(BENCH_DIR, "corpus.ndjson"), args.entries)
+        compare(args.mode, os.path.abspath(corpus), mock_url)
+    finally:
+        if server:
+            server.shutdown()
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
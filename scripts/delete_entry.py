@@ -3,19 +3,27 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app
+from app import get_app
 from app.database import db
 from models.entry_model import Entry
 from models.lead_model import Lead
 from models.edge_case_model import EdgeCase
+from models.batch_attempt_model import BatchAttempt
+from models.prefilter_hit_model import PrefilterHit
+from models.token_usage_model import TokenUsage
 
-app = create_app()
+app = get_app()
 
 
 def delete_entries(file_id):
     with app.app_context():
         db.session.query(Lead).filter_by(file_id=file_id).delete()
         db.session.query(EdgeCase).filter_by(file_id=file_id).delete()
+        db.session.query(BatchAttempt).filter(
+            BatchAttempt.entry_id.in_(db.session.query(Entry.id).filter_by(file_id=file_id))
+        ).delete(synchronize_session=False)
+        db.session.query(PrefilterHit).filter_by(file_id=file_id).delete()
+        db.session.query(TokenUsage).filter_by(file_id=file_id).delete()
         db.session.query(Entry).filter_by(file_id=file_id).delete()
 
         db.session.commit()
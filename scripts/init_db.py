@@ -5,14 +5,17 @@ from sqlalchemy import text
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app
+from app import get_app
 from app.database import db
 from models.entry_model import Entry
 from models.lead_model import Lead
-from models.audit_model import Audit
+from models.job_model import Job
 from models.edge_case_model import EdgeCase
+from models.batch_attempt_model import BatchAttempt
+from models.prefilter_hit_model import PrefilterHit
+from models.token_usage_model import TokenUsage
 
-app = create_app()
+app = get_app()
 
 
 def init_database():
@@ -0,0 +1,117 @@
+import sys
+import os
+
+from sqlalchemy import inspect, text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import get_app
+from app.database import db
+from models.entry_model import Entry
+from models.lead_model import Lead
+from models.job_model import Job
+from models.edge_case_model import EdgeCase
+from models.batch_attempt_model import BatchAttempt
+from models.prefilter_hit_model import PrefilterHit
+from models.token_usage_model import TokenUsage
+
+app = get_app()
+
+# Brings entries created before stage checkpoints existed to the stage their data shows they reached.
+BACKFILL_ENTRY_STAGE = """
+UPDATE entry SET stage = CASE
+    WHEN status = 'pending' THEN 'pending'
+    WHEN status != 'success' THEN 'flagged'
+    WHEN EXISTS (SELECT 1 FROM lead WHERE lead.entry_id = entry.id AND lead.audit_AI_priority_level IS NOT NULL)
+        THEN 'audited'
+    WHEN EXISTS (SELECT 1 FROM lead WHERE lead.entry_id = entry.id AND lead.leads_AI_priority_level IS NOT NULL)
+        THEN 'prioritised'
+    WHEN EXISTS (SELECT 1 FROM lead WHERE lead.entry_id = entry.id) THEN 'structured'
+    ELSE 'flagged'
+END
+"""
+# Entries flagged before flag sources were recorded were all classified by the LLM or the prefilter.
+BACKFILL_FLAG_SOURCE = """
+UPDATE entry SET flag_source = CASE
+    WHEN stage = 'pending' THEN NULL
+    WHEN EXISTS (SELECT 1 FROM prefilter_hit WHERE prefilter_hit.entry_id = entry.id) THEN 'prefilter'
+    ELSE 'llm'
+END
+"""
+
+# Leads audited before sampling existed were all audited.
+BACKFILL_AUDIT_STATUS = "UPDATE lead SET audit_status = 'audited' WHERE audit_AI_priority_level IS NOT NULL"
+
+
+def add_missing_columns(conn, table):
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    added = []
+
+    for column in table.columns:
+        if column.name in existing:
+            continue
+
+        column_type = column.type.compile(dialect=conn.dialect)
+        ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+        if column.server_default is not None:
+            ddl += f" NOT NULL DEFAULT '{column.server_default.arg}'" if not column.nullable else \
+                f" DEFAULT '{column.server_default.arg}'"
+        for foreign_key in column.foreign_keys:
+            ddl += f' REFERENCES "{foreign_key.column.table.name}"("{foreign_key.column.name}")'
+
+        conn.execute(text(ddl))
+        added.append(column.name)
+
+    return added
+
+
+def add_missing_indexes(conn, table):
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    added = []
+
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        if index.name in existing:
+            continue
+
+        index.create(bind=conn)
+        added.append(index.name)
+
+    return added
+
+
+def migrate_database():
+    with app.app_context():
+        print("Migrating database:", app.config["SQLALCHEMY_DATABASE_URI"])
+
+        db.create_all()
+
+        with db.engine.begin() as conn:
+            for table in db.metadata.sorted_tables:
+                added = add_missing_columns(conn, table)
+                if added:
+                    print(f"✅ Added columns to '{table.name}': {', '.join(added)}")
+
+                    if table.name == Entry.__tablename__ and "stage" in added:
+                        conn.execute(text(BACKFILL_ENTRY_STAGE))
+                        print("✅ Backfilled entry stages from existing results.")
+
+                    if table.name == Entry.__tablename__ and "flag_source" in added:
+                        conn.execute(text(BACKFILL_FLAG_SOURCE))
+                        print("✅ Backfilled entry flag sources.")
+
+                    if table.name == Lead.__tablename__ and "audit_status" in added:
+                        conn.execute(text(BACKFILL_AUDIT_STATUS))
+                        print("✅ Backfilled lead audit statuses.")
+
+                indexes = add_missing_indexes(conn, table)
+                if indexes:
+                    print(f"✅ Added indexes to '{table.name}': {', '.join(indexes)}")
+
+            # Refresh the planner statistics so SQLite picks the new indexes.
+            conn.execute(text("ANALYZE"))
+
+        print("✅ Database schema is up to date.")
+
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,362 @@
+import sys
+import os
+import re
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from collections import deque
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.token_planner import estimate_tokens
+
+# Local stand-in for the OpenAI and DeepSeek chat-completions APIs, so the pipeline can be run and
+# benchmarked without keys. Point both providers at it:
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1
+# Answers are generated from the request: the json_schema of structured-output requests (OpenAI
+# stages), or the "{'id': 'value', ...}" or compact "Output row: [id, ...]" format line of the
+# DeepSeek prompts, one item per input.
+# Latency, 5xx errors, server-side rate limits and truncated or short outputs are configurable.
+# GET /stats returns calls, items and tokens per stage; POST /reset clears them.
+PRIORITY_LEVELS = ("Urgent", "High", "Medium", "Low")
+FLAGS = ("success", "fail", "edge case")
+INDUSTRIES = ("SaaS", "Ecommerce", "Real Estate", "Dental", "Fitness", "Marketing", "Logistics")
+FORMAT_KEY = re.compile(r"'(\w+)'\s*:\s*'value'")
+ROW_FORMAT = re.compile(r"Output row: \[([^\]]*)\]")
+PRIORITY_CODES = ("U", "H", "M", "L")
+# Short keys of the compact structuring schema, so both formats get the same field values.
+LEAD_FIELD_KEYS = {"co": "Company Name", "ind": "Industry", "bud": "Budget", "rev": "Revenue (Monthly)",
+                   "goal": "Growth Goal (Monthly)", "note": "Additional Notes"}
+
+
+class Latency:
+    """Per-request delay: 'fixed:S', 'uniform:MIN,MAX' or 'lognormal:MEDIAN,SIGMA' seconds."""
+
+    def __init__(self, spec):
+        kind, _, values = spec.partition(":")
+        self.kind = kind
+        self.values = [float(value) for value in values.split(",") if value]
+        if kind not in ("fixed", "uniform", "lognormal") or len(self.values) != (1 if kind == "fixed" else 2):
+            raise ValueError(f"Invalid latency '{spec}'. Use fixed:S, uniform:MIN,MAX or lognormal:MEDIAN,SIGMA.")
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            return self.values[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.values)
+        median, sigma = self.values
+        return median * rng.lognormvariate(0, sigma)
+
+    def __str__(self):
+        return f"{self.kind}:{','.join(f'{value:g}' for value in self.values)}"
+
+
+class MockSettings:
+    def __init__(self, openai_latency="lognormal:1.5,0.4", deepseek_latency="lognormal:3,0.5",
+                 seconds_per_item=0.02, seconds_per_output_token=0.0, openai_rpm=0, deepseek_rpm=0,
+                 error_rate=0.0, malformed_rate=0.0, short_rate=0.0, success_share=0.7, seed=7):
+        self.latency = {"openai": Latency(openai_latency), "deepseek": Latency(deepseek_latency)}
+        self.requests_per_minute = {"openai": openai_rpm, "deepseek": deepseek_rpm}
+        self.seconds_per_item = seconds_per_item
+        self.seconds_per_output_token = seconds_per_output_token
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.short_rate = short_rate
+        self.success_share = success_share
+        self.seed = seed
+
+
+class MockState:
+    """Request counters per stage and the recent request times used for the rate limits."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.recent = {"openai": deque(), "deepseek": deque()}
+        self.stats = {}
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            for times in self.recent.values():
+                times.clear()
+
+    def roll(self):
+        with self.lock:
+            return self.rng.random()
+
+    def admit(self, provider):
+        """Returns the seconds until a slot frees up if the provider's requests-per-minute limit is hit."""
+        limit = self.settings.requests_per_minute[provider]
+        now = time.monotonic()
+        with self.lock:
+            times = self.recent[provider]
+            while times and now - times[0] >= 60:
+                times.popleft()
+            if limit and len(times) >= limit:
+                return 60 - (now - times[0])
+            times.append(now)
+            return 0
+
+    def count(self, stage, outcome, items=0, prompt_tokens=0, completion_tokens=0, seconds=0.0):
+        with self.lock:
+            stats = self.stats.setdefault(stage, {"calls": 0, "items": 0, "prompt_tokens": 0,
+                                                  "completion_tokens": 0, "seconds": 0.0, "outcomes": {}})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["items"] += items
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
+
+
+def item_rng(seed, item):
+    """Same answer for the same input, so clusters and retries see consistent results."""
+    return random.Random(seed ^ zlib.crc32(json.dumps(item, sort_keys=True).encode("utf-8")))
+
+
+def input_items(content):
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return []
+    if isinstance(data, dict):
+        data = next((value for value in data.values() if isinstance(value, list)), [])
+    return data if isinstance(data, list) else []
+
+
+def fake_value(name, schema, item, rng, settings, answer):
+    if "anyOf" in schema:
+        # The fused stage returns a lead only for entries it flags as success.
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        if answer.get("flag", "success") != "success" or not options:
+            return None
+        return fake_value(name, options[0], item, rng, settings, answer)
+
+    kinds = schema.get("type", "string")
+    kinds = kinds if isinstance(kinds, list) else [kinds]
+
+    if "object" in kinds:
+        value = {}
+        for key, prop in schema.get("properties", {}).items():
+            value[key] = fake_value(key, prop, item, rng, settings, value)
+        return value
+    if name == "flag":
+        roll = rng.random()
+        return "success" if roll < settings.success_share else FLAGS[1 if roll < (1 + settings.success_share) / 2 else 2]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "integer" in kinds:
+        # Keyed records carry their id by name, compact rows as their first value.
+        if isinstance(item, dict):
+            return item.get(name, item.get("id"))
+        return item[0] if isinstance(item, list) and item else 0
+    if name == "reason":
+        return None if answer.get("flag") == "success" else "Mock reason."
+    name = LEAD_FIELD_KEYS.get(name, name)
+    if name == "Industry":
+        return rng.choice(INDUSTRIES)
+    if name in ("Budget", "Revenue (Monthly)", "Growth Goal (Monthly)"):
+        return f"${rng.randint(1, 90)}K"
+    return f"Mock {name.lower()}"
+
+
+def openai_answer(payload, items, settings):
+    """{"<array field>": [...]} following the request's json_schema, one element per input item."""
+    schema = payload["response_format"]["json_schema"]["schema"]
+    field, array = next(iter(schema["properties"].items()))
+    return {field: [fake_value("", array["items"], item, item_rng(settings.seed, item), settings, {})
+                    for item in items]}
+
+
+def compact_answer(columns, items, settings):
+    """[id, ...] rows for the compact prompts; the audit's trailing note is left out about two times in three."""
+    answer = []
+    for item in items:
+        rng = item_rng(settings.seed, item)
+        row = []
+        for column in columns:
+            if column == "id":
+                row.append(item[0] if isinstance(item, list) and item else None)
+            elif column == "priority":
+                row.append(rng.choice(PRIORITY_CODES))
+            elif column == "score":
+                row.append(rng.randint(40, 100))
+            elif column == "note" and (len(columns) == 2 or rng.random() < 0.33):
+                row.append("Mock note.")
+        answer.append(row)
+    return answer
+
+
+def deepseek_answer(prompt, items, settings):
+    """The JSON list the DeepSeek prompts ask for, with the keys of their expected-format line."""
+    row_format = ROW_FORMAT.search(prompt)
+    if row_format:
+        return compact_answer([column.strip() for column in row_format.group(1).split(",")], items, settings)
+
+    keys = list(dict.fromkeys(FORMAT_KEY.findall(prompt))) or ["id"]
+    answer = []
+    for item in items:
+        rng = item_rng(settings.seed, item)
+        row = {}
+        for key in keys:
+            if key == "id":
+                row[key] = item.get("id")
+            elif key.endswith("priority_level"):
+                row[key] = rng.choice(PRIORITY_LEVELS)
+            elif key.endswith("score"):
+                row[key] = rng.randint(40, 100)
+            else:
+                # The audit prompt leaves the note empty when the levels match; about two leads in three.
+                audit = "deepseek_accuracy_score" in keys
+                row[key] = "Mock note." if not audit or rng.random() < 0.33 else ""
+        answer.append(row)
+    return answer
+
+
+def stage_name(provider, payload, prompt):
+    if provider == "openai":
+        return payload.get("response_format", {}).get("json_schema", {}).get("name", "openai")
+    row_format = ROW_FORMAT.search(prompt)
+    keys = set(row_format.group(1).replace(" ", "").split(",")) if row_format else set(FORMAT_KEY.findall(prompt))
+    if keys & {"deepseek_accuracy_score", "score"}:
+        return "audit"
+    if keys & {"deepseek_notes", "note"}:
+        return "audit_notes"
+    return "classification"
+
+
+def error_response(status, message, retry_after=None):
+    response = jsonify({"error": {"message": message, "type": "mock_error", "code": status}})
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(max(1, round(retry_after)))
+    return response
+
+
+def create_mock_app(settings=None):
+    settings = settings or MockSettings()
+    state = MockState(settings)
+    mock = Flask(__name__)
+    mock.config["mock_state"] = state
+
+    @mock.route("/v1/chat/completions", methods=["POST"])
+    @mock.route("/chat/completions", methods=["POST"])
+    def chat_completions():
+        payload = request.get_json(force=True)
+        provider = "deepseek" if payload.get("model", "").startswith("deepseek") else "openai"
+        messages = payload.get("messages", [])
+        prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+        items = input_items(next((m["content"] for m in messages if m["role"] == "user"), ""))
+        stage = stage_name(provider, payload, prompt)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+
+        wait = state.admit(provider)
+        if wait:
+            state.count(stage, "429")
+            return error_response(429, "Rate limit reached (mock).", wait)
+
+        if state.roll() < settings.error_rate:
+            time.sleep(settings.latency[provider].sample(state.rng))
+            status = 503 if state.roll() < 0.5 else 500
+            state.count(stage, str(status), prompt_tokens=prompt_tokens)
+            return error_response(status, "Upstream overloaded (mock).")
+
+        if provider == "openai":
+            answer = openai_answer(payload, items, settings)
+            rows = next(iter(answer.values()))
+        else:
+            answer = rows = deepseek_answer(prompt, items, settings)
+
+        outcome, finish_reason = "ok", "stop"
+        if len(rows) > 1 and state.roll() < settings.short_rate:
+            del rows[len(rows) * 2 // 3:]
+            outcome = "short"
+        content = json.dumps(answer)
+        if state.roll() < settings.malformed_rate:
+            content = content[:len(content) // 2]
+            outcome, finish_reason = "malformed", "length"
+
+        completion_tokens = estimate_tokens(content)
+        seconds = (settings.latency[provider].sample(state.rng) + settings.seconds_per_item * len(items)
+                   + settings.seconds_per_output_token * completion_tokens)
+        time.sleep(seconds)
+        state.count(stage, outcome, len(items), prompt_tokens, completion_tokens, seconds)
+
+        return jsonify({
+            "id": f"chatcmpl-mock-{zlib.crc32(content.encode('utf-8')):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+                "logprobs": None,
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    @mock.route("/stats", methods=["GET"])
+    def stats():
+        with state.lock:
+            return jsonify(state.stats)
+
+    @mock.route("/reset", methods=["POST"])
+    def reset():
+        state.reset()
+        return jsonify({"message": "Counters reset."})
+
+    return mock
+
+
+def start_mock_server(settings=None, host="127.0.0.1", port=0):
+    """Serves the mock from a background thread; returns the server (server.server_port, server.shutdown())."""
+    server = make_server(host, port, create_mock_app(settings), threaded=True)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--openai-latency", default="lognormal:1.5,0.4",
+                        help="fixed:S, uniform:MIN,MAX or lognormal:MEDIAN,SIGMA (default lognormal:1.5,0.4)")
+    parser.add_argument("--deepseek-latency", default="lognormal:3,0.5")
+    parser.add_argument("--seconds-per-item", type=float, default=0.02,
+                        help="extra delay per input item (default 0.02)")
+    parser.add_argument("--seconds-per-output-token", type=float, default=0.0,
+                        help="extra delay per generated token, e.g. 0.012 for ~80 tokens/s (default 0)")
+    parser.add_argument("--openai-rpm", type=int, default=0, help="server-side requests per minute, 0 = no limit")
+    parser.add_argument("--deepseek-rpm", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500/503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of answers cut off mid-JSON")
+    parser.add_argument("--short-rate", type=float, default=0.0, help="share of answers missing a third of items")
+    parser.add_argument("--success-share", type=float, default=0.7, help="share of entries flagged success")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def settings_from_args(args):
+    return MockSettings(args.openai_latency, args.deepseek_latency, args.seconds_per_item,
+                        args.seconds_per_output_token, args.openai_rpm, args.deepseek_rpm, args.error_rate,
+                        args.malformed_rate, args.short_rate, args.success_share, args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline OpenAI/DeepSeek chat-completions stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    settings = settings_from_args(args)
+    print(f"🧪 Mock LLM server on http://{args.host}:{args.port}/v1 "
+          f"(openai {settings.latency['openai']}, deepseek {settings.latency['deepseek']}, "
+          f"errors {args.error_rate:.0%}, malformed {args.malformed_rate:.0%}, short {args.short_rate:.0%})")
+    make_server(args.host, args.port, create_mock_app(settings), threaded=True).serve_forever()
@@ -1,30 +1,142 @@
 import sys
 import os
 import json
+import time
+import logging
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app
+from app import get_app
+from app.config import config
 from app.database import db
 from models.entry_model import Entry
+from app.services.clustering import cluster_entries
 
-app = create_app()
+app = get_app()
 
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+READ_SIZE = 1 << 16
+
+# Uploads are read as TXT (one inquiry per line), a JSON array of {"text": ...} objects or
+# NDJSON (one {"text": ...} object per line).
+FORMATS = {".txt": "txt", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
 
 
 def get_file_id(filename):
     return os.path.splitext(filename)[0]
 
 
+def get_file_format(filename):
+    return FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
 def file_exists(file_id):
     with app.app_context():
         return db.session.query(Entry).filter_by(file_id=file_id).first() is not None
 
 
+def iter_json_array(stream, read_size=READ_SIZE):
+    """Yields the items of a top-level JSON array while reading the stream in fixed-size chunks."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        more = stream.read(read_size)
+        if not more:
+            eof = True
+        buffer, pos = buffer[pos:] + more, 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos] if pos < len(buffer) else ""
+            read_more()
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+
+    if next_char() == "]":
+        return
+
+    while True:
+        next_char()
+        while True:
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more()
+
+        yield item
+
+        separator = next_char()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError("Malformed JSON array: expected ',' or ']'.")
+        pos += 1
+
+
+def iter_texts(stream, file_format):
+    if file_format == "txt":
+        for line in stream:
+            text = line.strip()
+            if text:
+                yield text
+        return
+
+    if file_format == "ndjson":
+        items = (json.loads(line) for line in stream if line.strip())
+    else:
+        items = iter_json_array(stream)
+
+    for item in items:
+        yield item if isinstance(item, str) else item["text"]
+
+
+def ingest_stream(stream, file_id, file_format, chunk_size=None):
+    """
+    Inserts every inquiry in a text stream as a pending entry, in chunks of executemany inserts
+    within one transaction, so memory use does not grow with the file. Returns the row count.
+    """
+    chunk_size = chunk_size or config.INGEST_CHUNK_SIZE
+    insert = Entry.__table__.insert()
+    total = 0
+    rows = []
+
+    with app.app_context():
+        try:
+            for text in iter_texts(stream, file_format):
+                rows.append({"raw_input": text, "status": "pending", "stage": "pending", "file_id": file_id})
+
+                if len(rows) >= chunk_size:
+                    db.session.execute(insert, rows)
+                    total += len(rows)
+                    rows = []
+
+            if rows:
+                db.session.execute(insert, rows)
+                total += len(rows)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return total
+
+
 def populate_db(file_name="demo_data.json"):
     file_path = os.path.join(DATA_DIR, file_name)
     file_id = get_file_id(file_name)
+    file_format = get_file_format(file_name)
 
     with app.app_context():
         if file_exists(file_id):
@@ -35,15 +147,30 @@ def populate_db(file_name="demo_data.json"):
             print(f"❌ Error: {file_name} not found!")
             return False
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            test_data = json.load(f)
+        if file_format is None:
+            print(f"❌ Error: unsupported file type for {file_name}.")
+            return False
+
+        started = time.monotonic()
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                total = ingest_stream(f, file_id, file_format)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"❌ Error: could not read {file_name}: {e}")
+            return False
+
+        if total == 0:
+            print(f"❌ Error: no entries found in {file_name}.")
+            return False
 
-        for item in test_data:
-            entry = Entry(raw_input=item["text"], status="pending", file_id=file_id)
-            db.session.add(entry)
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        print(f"✅ Data from {file_name} inserted successfully with file_id '{file_id}'. "
+              f"{total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+        logging.info(f"Ingested {total} rows for file_id {file_id} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
 
-        db.session.commit()
-        print(f"✅ Data from {file_name} inserted successfully with file_id '{file_id}'.")
+        cluster_entries(file_id)
         return True
 
 
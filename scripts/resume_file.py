@@ -0,0 +1,25 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.pipeline import PipelineError
+from app.services.job_queue import resume_file
+
+
+def resume(file_id, mode=None):
+    try:
+        timings = resume_file(file_id, mode)
+    except PipelineError as e:
+        print(f"❌ {e}")
+        return False
+
+    print(f"✅ Resumed file_id '{file_id}' in {timings['total_seconds']}s.")
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("❌ Error: Please provide a file_id.")
+    else:
+        resume(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
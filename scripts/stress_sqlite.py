@@ -0,0 +1,146 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import threading
+import multiprocessing
+import statistics
+
+from sqlalchemy import bindparam, create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import config
+from app.database import db
+from models.entry_model import Entry
+from models.lead_model import Lead
+from models.job_model import Job
+from models.edge_case_model import EdgeCase
+from models.batch_attempt_model import BatchAttempt
+
+# Measures /get_leads-style read latency while a writer process keeps committing large audit updates
+# (a second process, so the numbers show SQLite locking rather than GIL contention), once with the
+# pre-WAL settings (rollback journal, pysqlite's 5 s busy wait) and once with config.SQLITE_PRAGMAS.
+# Usage: python scripts/stress_sqlite.py [leads] [readers] [seconds]
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000, "foreign_keys": "ON"}
+FILES = 200
+WRITE_CHUNK_SIZE = 20000
+
+
+def seed(engine, total):
+    per_file = total // FILES
+    with engine.begin() as conn:
+        for file_number in range(FILES):
+            file_id = f"stress_{file_number}"
+            first_id = file_number * per_file + 1
+            ids = range(first_id, first_id + per_file)
+            conn.execute(insert(Entry), [
+                {"id": entry_id, "raw_input": f"Inquiry {entry_id}", "status": "success", "stage": "prioritised",
+                 "file_id": file_id} for entry_id in ids
+            ])
+            conn.execute(insert(Lead), [
+                {"id": entry_id, "entry_id": entry_id, "file_id": file_id, "industry": "SaaS",
+                 "leads_AI_priority_level": "High"} for entry_id in ids
+            ])
+
+
+def writer(path, pragmas, total, stop, commits, errors):
+    """Rewrites every lead's audit result in WRITE_CHUNK_SIZE transactions, the way the audit stage commits."""
+    config.SQLITE_PRAGMAS = pragmas
+    engine = create_engine(f"sqlite:///{path}")
+    round_number = 0
+    while not stop.is_set():
+        round_number += 1
+        for first_id in range(1, total + 1, WRITE_CHUNK_SIZE):
+            if stop.is_set():
+                break
+            mappings = [
+                {"lead_id": lead_id, "level": ("Urgent", "High", "Medium", "Low")[(lead_id + round_number) % 4],
+                 "notes": f"round {round_number}"}
+                for lead_id in range(first_id, min(first_id + WRITE_CHUNK_SIZE, total + 1))
+            ]
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        update(Lead).where(Lead.id == bindparam("lead_id"))
+                        .values(audit_AI_priority_level=bindparam("level"), audit_AI_notes=bindparam("notes")),
+                        mappings,
+                    )
+                commits.value += 1
+            except OperationalError:
+                errors.value += 1
+
+    engine.dispose()
+
+
+def reader(engine, file_id, stop, latencies, errors):
+    query = select(Lead).where(Lead.file_id == file_id).order_by(Lead.audit_AI_priority_level.desc())
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(query).fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            errors.append(time.perf_counter() - started)
+
+
+def run(label, pragmas, total, readers, seconds, workdir):
+    config.SQLITE_PRAGMAS = pragmas
+    path = os.path.join(workdir, f"{label}.db")
+    engine = create_engine(f"sqlite:///{path}", **config.SQLALCHEMY_ENGINE_OPTIONS)
+    db.metadata.create_all(engine)
+    seed(engine, total)
+
+    write_stop = multiprocessing.Event()
+    commits = multiprocessing.Value("i", 0)
+    write_errors = multiprocessing.Value("i", 0)
+    write_process = multiprocessing.Process(
+        target=writer, args=(path, pragmas, total, write_stop, commits, write_errors))
+
+    stop = threading.Event()
+    latencies = []
+    read_errors = []
+    threads = [
+        threading.Thread(target=reader, args=(engine, f"stress_{n % FILES}", stop, latencies, read_errors))
+        for n in range(readers)
+    ]
+
+    write_process.start()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    write_stop.set()
+    for thread in threads:
+        thread.join()
+    write_process.join()
+
+    journal_mode = engine.connect().exec_driver_sql("PRAGMA journal_mode").scalar()
+    engine.dispose()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    print(f"{label:<9} {journal_mode:<8} {len(latencies):>7} {statistics.median(latencies) if latencies else 0:>9.2f} "
+          f"{p95:>9.2f} {max(latencies, default=0):>9.2f} {len(read_errors):>11} "
+          f"{commits.value:>8} {write_errors.value:>12}")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    tuned = dict(config.SQLITE_PRAGMAS)
+    workdir = tempfile.mkdtemp(prefix="lead_stress_")
+    print(f"{total:,} leads, {readers} readers, 1 writer, {seconds:g}s per run")
+    print(f"{'run':<9} {'journal':<8} {'reads':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} "
+          f"{'read errors':>11} {'commits':>8} {'write errors':>12}")
+    try:
+        run("baseline", BASELINE_PRAGMAS, total, readers, seconds, workdir)
+        run("tuned", tuned, total, readers, seconds, workdir)
+    finally:
+        config.SQLITE_PRAGMAS = tuned
+        shutil.rmtree(workdir, ignore_errors=True)
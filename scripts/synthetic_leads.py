@@ -0,0 +1,102 @@
+import sys
+import os
+import json
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Synthetic uploads for the benchmarks: business inquiries with template copies and resubmissions
+# (case, whitespace and punctuation changes, a greeting or signature added, a word changed), plus
+# the junk and off-topic messages real contact forms collect.
+# Usage: python scripts/synthetic_leads.py <entries> [path] [--seed N]
+DUPLICATE_SHARE = 0.3
+JUNK_SHARE = 0.15
+OFF_TOPIC_SHARE = 0.05
+
+INDUSTRIES = ["SaaS", "ecommerce", "real estate", "dental", "fitness", "marketing", "logistics", "coaching"]
+GOALS = ["scale our ads", "hire a sales team", "automate fulfilment", "improve SEO", "launch a new product line",
+         "fix our onboarding", "grow recurring revenue", "expand to Europe"]
+OPENERS = ["Hi,", "Hello team,", "Hey there.", "Good morning,", ""]
+CLOSERS = ["Thanks!", "Best regards, {name}", "Looking forward to hearing from you.", "Cheers", ""]
+NAMES = ["Anna", "Marco", "Priya", "Tom", "Lena", "Omar", "Jun", "Sara"]
+JUNK = ["asdf", "test", "qwerty qwerty", "hello?", "!!!!!!", "BUY CHEAP FOLLOWERS NOW www.cheap-followers.biz",
+        "zxcvbnm lkjhg", "ok", "1234567890", "Earn $5000 a week from home, click here"]
+OFF_TOPIC = ["Do you have a job opening for a junior designer? I am attaching my CV.",
+             "My order never arrived, can you refund me please?",
+             "I am a student writing a thesis about agencies, could I interview someone on your team?",
+             "Can I return the item I bought last week? The size is wrong."]
+
+
+def base_inquiry(rng, n):
+    return (f"{rng.choice(OPENERS)} I run a {rng.choice(INDUSTRIES)} company (ref {n}) doing about "
+            f"${rng.randint(5, 400)}K a month with {rng.randint(2, 300)} employees. We want to "
+            f"{rng.choice(GOALS)} and {rng.choice(GOALS)} within {rng.randint(1, 12)} months, budget "
+            f"${rng.randint(1, 90)}K. {rng.choice(CLOSERS).format(name=rng.choice(NAMES))}").strip()
+
+
+def variant(rng, text):
+    change = rng.randrange(4)
+    if change == 0:
+        return text.upper() if rng.random() < 0.5 else f"  {text.replace(' ', '  ')} !!"
+    if change == 1:
+        return f"{text} Sent from my iPhone"
+    if change == 2:
+        return f"Resubmitting: {text.replace(',', '').replace('.', '')}"
+    words = text.split()
+    words[rng.randrange(len(words))] = rng.choice(["really", "urgently", "asap"])
+    return " ".join(words)
+
+
+def synthetic_upload(total, seed=42):
+    """Returns (texts, group per text); texts with the same group are copies of one inquiry."""
+    rng = random.Random(seed)
+    texts, groups, originals = [], [], []
+
+    for n in range(total):
+        if originals and rng.random() < DUPLICATE_SHARE:
+            group = rng.randrange(len(originals))
+            texts.append(variant(rng, originals[group]))
+        else:
+            group = len(originals)
+            originals.append(base_inquiry(rng, n))
+            texts.append(originals[group])
+        groups.append(group)
+
+    return texts, groups
+
+
+def synthetic_entries(total, seed=42):
+    """Yields total inquiry texts: leads and their duplicates mixed with junk and off-topic messages."""
+    rng = random.Random(seed)
+    texts, groups = synthetic_upload(total, seed)
+
+    for n, text in enumerate(texts):
+        roll = rng.random()
+        if roll < JUNK_SHARE:
+            yield rng.choice(JUNK)
+        elif roll < JUNK_SHARE + OFF_TOPIC_SHARE:
+            yield f"{rng.choice(OFF_TOPIC)} (#{n})"
+        else:
+            yield text
+
+
+def write_upload(path, total, seed=42):
+    """Writes an NDJSON upload of total entries and returns its path."""
+    with open(path, "w", encoding="utf-8") as f:
+        for text in synthetic_entries(total, seed):
+            f.write(json.dumps({"text": text}) + "\n")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes a synthetic NDJSON upload of lead inquiries.")
+    parser.add_argument("entries", type=int)
+    parser.add_argument("path", nargs="?", help="default: data/synthetic_<entries>.ndjson")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+    path = args.path or os.path.join(data_dir, f"synthetic_{args.entries}.ndjson")
+    write_upload(path, args.entries, args.seed)
+    print(f"✅ Wrote {args.entries:,} synthetic entries to {path}")
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+# Tests run against a throwaway database with the LLM result cache off; nothing here calls a provider.
+TEST_DIR = tempfile.mkdtemp(prefix="lead_pipeline_tests_")
+os.environ["DB_PATH"] = os.path.join(TEST_DIR, "leads.db")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DEEPSEEK_API_KEY", "test")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client for app.main. Importing it logs to ../logs, so the import runs from a scratch app/ directory."""
+    for folder in ("app", "logs"):
+        os.makedirs(os.path.join(TEST_DIR, folder), exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(os.path.join(TEST_DIR, "app"))
+    try:
+        from app.main import app
+    finally:
+        os.chdir(cwd)
+
+    from app.database import db
+    with app.app_context():
+        db.create_all()
+    return app.test_client()
@@ -0,0 +1,26 @@
+import os
+import sys
+import subprocess
+
+from app import create_app, get_app
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_one_shared_app():
+    assert get_app() is get_app()
+    assert create_app() is not get_app()
+
+
+def test_imports_open_no_connection_or_openai_sdk():
+    probe = (
+        "import sys, json\n"
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.engine import Engine\n"
+        "connections = []\n"
+        "event.listen(Engine, 'connect', lambda *args: connections.append(1))\n"
+        "import app.services.pipeline, app.services.job_queue\n"
+        "print(json.dumps([len(connections), 'openai' in sys.modules]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=os.environ, capture_output=True, text=True)
+    assert output.stdout.strip().splitlines()[-1] == "[0, false]", output.stderr
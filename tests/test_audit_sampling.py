@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from app.services import audit_sampling
+from app.services.audit_sampling import stratified_estimate, stratum_sample_size
+
+
+def stratum(size, scores):
+    return size, len(scores), sum(scores), sum(score * score for score in scores)
+
+
+def test_full_census_has_no_margin():
+    estimate = stratified_estimate([stratum(4, [100, 70, 40, 100])], 0.95)
+    assert estimate == {"estimate": 77.5, "low": 77.5, "high": 77.5}
+
+
+def test_strata_are_weighted_by_size():
+    estimate = stratified_estimate([stratum(90, [100, 100]), stratum(10, [40, 40])], 0.95)
+    assert estimate["estimate"] == pytest.approx(94.0)
+    assert estimate["low"] == estimate["high"] == estimate["estimate"]
+
+
+def test_interval_matches_the_textbook_formula():
+    scores = [100, 70, 100, 40, 100]
+    estimate = stratified_estimate([stratum(50, scores)], 0.95)
+    mean = sum(scores) / 5
+    variance = sum((score - mean) ** 2 for score in scores) / 4
+    margin = 1.959964 * math.sqrt((1 - 5 / 50) * variance / 5)
+    assert estimate["estimate"] == pytest.approx(mean)
+    assert estimate["high"] - estimate["estimate"] == pytest.approx(margin, abs=1e-3)
+
+
+def test_unsampled_strata_are_left_out():
+    assert stratified_estimate([stratum(10, [])], 0.95) is None
+    assert stratified_estimate([stratum(10, [1, 0]), stratum(30, [])], 0.95)["estimate"] == 0.5
+
+
+def test_sample_size_per_level(monkeypatch):
+    monkeypatch.setattr(audit_sampling.config, "AUDIT_SAMPLE_RATE", 0.1)
+    monkeypatch.setattr(audit_sampling.config, "AUDIT_SAMPLE_MIN_PER_LEVEL", 10)
+    assert stratum_sample_size(4) == 4
+    assert stratum_sample_size(50) == 10
+    assert stratum_sample_size(1001) == 101
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from app.services import batching
+from app.services.batching import chunk, run_batches
+
+
+def items(count):
+    return [{"id": n} for n in range(count)]
+
+
+def test_chunk():
+    assert chunk([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
+
+def test_results_are_merged_by_id():
+    results = run_batches(chunk(items(10), 3), lambda batch: [{"id": item["id"], "ok": True} for item in batch],
+                          provider="test")
+    assert sorted(results) == list(range(10))
+    assert results.attempts == {} and results.unresolved == []
+
+
+def test_requests_in_flight_are_capped_per_provider(monkeypatch):
+    monkeypatch.setattr(batching.config, "CAPPED_MAX_IN_FLIGHT", 2, raising=False)
+    open_requests, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call_batch(batch):
+        with lock:
+            open_requests[0] += 1
+            peak[0] = max(peak[0], open_requests[0])
+        time.sleep(0.02)
+        with lock:
+            open_requests[0] -= 1
+        return [{"id": item["id"]} for item in batch]
+
+    results = run_batches(chunk(items(8), 1), call_batch, provider="capped")
+    assert len(results) == 8
+    assert peak[0] == 2
+
+
+def test_short_batch_retries_only_missing_ids_in_halves(monkeypatch):
+    monkeypatch.setattr(batching.config, "BATCH_MAX_ATTEMPTS", 4)
+    sent = []
+
+    def call_batch(batch):
+        sent.append([item["id"] for item in batch])
+        # The first request drops the last four items; every retry answers in full.
+        returned = batch[:-4] if len(sent) == 1 else batch
+        return [{"id": item["id"]} for item in returned]
+
+    results = run_batches([items(8)], call_batch, provider="test")
+    assert sorted(results) == list(range(8))
+    assert sent == [list(range(8)), [4, 5], [6, 7]]
+    assert results.attempts == {4: 2, 5: 2, 6: 2, 7: 2}
+
+
+def test_bad_item_is_isolated_and_left_unresolved(monkeypatch):
+    monkeypatch.setattr(batching.config, "BATCH_MAX_ATTEMPTS", 4)
+
+    def call_batch(batch):
+        # Any batch containing item 5 fails as a whole.
+        if any(item["id"] == 5 for item in batch):
+            return None
+        return [{"id": item["id"]} for item in batch]
+
+    results = run_batches([items(8)], call_batch, provider="test")
+    assert sorted(results) == [0, 1, 2, 3, 4, 6, 7]
+    assert results.unresolved == [5]
+    assert results.attempts[5] == 4
+
+
+def test_invalid_and_unexpected_results_are_discarded(monkeypatch):
+    monkeypatch.setattr(batching.config, "BATCH_MAX_ATTEMPTS", 1)
+    returned = [{"id": 0, "level": "High"}, {"id": 1, "level": "Nope"}, {"id": 99, "level": "High"}, "junk"]
+    results = run_batches([items(2)], lambda batch: returned, provider="test",
+                          validate=lambda result: result["level"] == "High")
+    assert list(results) == [0]
+    assert results.unresolved == [1]
@@ -0,0 +1,53 @@
+import pytest
+
+from app import get_app
+from app.database import db
+from app.services.bulk_write import bulk_insert, bulk_update, match_results, write_in_chunks
+from models.entry_model import Entry
+
+FILE_ID = "bulk_write_test"
+
+app = get_app()
+
+
+@pytest.fixture
+def cleanup():
+    with app.app_context():
+        db.create_all()
+    yield
+    with app.app_context():
+        db.session.query(Entry).filter(Entry.file_id == FILE_ID).delete()
+        db.session.commit()
+
+
+def file_rows():
+    return db.session.query(Entry.raw_input, Entry.status).filter(Entry.file_id == FILE_ID).order_by(Entry.id).all()
+
+
+def test_match_results_pairs_by_id():
+    items = [{"id": 3}, {"id": 1}, {"id": 2}]
+    assert match_results(items, {1: "a", 3: "c"}, key=lambda item: item["id"]) == [({"id": 3}, "c"), ({"id": 1}, "a")]
+
+
+def test_chunks_are_committed_until_one_fails(cleanup):
+    rows = [{"raw_input": f"entry {n}", "status": "pending", "file_id": FILE_ID} for n in range(5)]
+
+    def write_chunk(chunk):
+        bulk_insert(Entry, chunk)
+        if chunk[0]["raw_input"] == "entry 4":
+            raise RuntimeError("disk full")
+
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            write_in_chunks(rows, write_chunk, chunk_size=2)
+        assert [raw_input for raw_input, status in file_rows()] == ["entry 0", "entry 1", "entry 2", "entry 3"]
+
+
+def test_bulk_update_by_primary_key(cleanup):
+    with app.app_context():
+        bulk_insert(Entry, [{"raw_input": f"entry {n}", "status": "pending", "file_id": FILE_ID} for n in range(3)])
+        db.session.commit()
+        ids = [entry_id for (entry_id,) in db.session.query(Entry.id).filter(Entry.file_id == FILE_ID).order_by(Entry.id)]
+        bulk_update(Entry, [{"id": ids[0], "status": "success"}, {"id": ids[2], "status": "fail"}])
+        db.session.commit()
+        assert [status for raw_input, status in file_rows()] == ["success", "pending", "fail"]
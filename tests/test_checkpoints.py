@@ -0,0 +1,50 @@
+import pytest
+
+from app import get_app
+from app.database import db
+from app.services import checkpoints
+from app.services.checkpoints import mark_stage, record_attempts, unfinished_entries
+from models.batch_attempt_model import BatchAttempt
+from models.entry_model import Entry
+
+FILE_ID = "checkpoint_test"
+
+app = get_app()
+
+
+@pytest.fixture
+def entries():
+    with app.app_context():
+        db.create_all()
+        rows = [Entry(raw_input=f"entry {n}", status=status, file_id=FILE_ID, stage=stage) for n, (status, stage) in
+                enumerate([("pending", "pending"), ("fail", "flagged"), ("success", "flagged"),
+                           ("success", "prioritised"), ("success", "audited")])]
+        db.session.add_all(rows)
+        db.session.commit()
+        ids = [row.id for row in rows]
+    yield ids
+    with app.app_context():
+        db.session.query(BatchAttempt).filter(BatchAttempt.entry_id.in_(ids)).delete()
+        db.session.query(Entry).filter(Entry.file_id == FILE_ID).delete()
+        db.session.commit()
+
+
+def test_unfinished_entries_skip_failed_and_audited(entries):
+    with app.app_context():
+        assert unfinished_entries(FILE_ID) == {"pending": 1, "flagged": 1, "prioritised": 1}
+
+
+def test_mark_stage_in_id_chunks(entries, monkeypatch):
+    monkeypatch.setattr(checkpoints, "ID_CHUNK_SIZE", 2)
+    with app.app_context():
+        mark_stage(entries, "audited")
+        db.session.commit()
+        assert unfinished_entries(FILE_ID) == {}
+
+
+def test_record_attempts(entries):
+    record_attempts("flagging", {entries[2]: 3, entries[3]: 4}, [entries[3], entries[0]])
+    with app.app_context():
+        rows = db.session.query(BatchAttempt.entry_id, BatchAttempt.attempts, BatchAttempt.resolved).filter(
+            BatchAttempt.entry_id.in_(entries)).all()
+    assert sorted(rows) == sorted([(entries[2], 3, True), (entries[3], 4, False), (entries[0], 1, False)])
@@ -0,0 +1,61 @@
+import pytest
+
+from app.database import db
+from app.services import clustering
+from app.services.clustering import cluster_key, fan_out_leads, find_clusters, structuring_entries
+from models.entry_model import Entry
+from models.lead_model import Lead
+
+TEMPLATE = "Hi, we are {} and we need help scaling our ecommerce store to 50k a month in sales with paid ads."
+
+
+@pytest.fixture
+def file_entries():
+    """A structured representative, an exact and a reworded duplicate of it, all flagged 'success'."""
+    with clustering.app.app_context():
+        db.create_all()
+        source = Entry(raw_input=TEMPLATE.format("Acme Shoes"), status="success", file_id="cluster_test",
+                       stage="structured")
+        db.session.add(source)
+        db.session.flush()
+        exact = Entry(raw_input="  " + TEMPLATE.format("ACME shoes").upper() + "!", status="success",
+                      file_id="cluster_test", stage="flagged", duplicate_of=source.id)
+        reworded = Entry(raw_input=TEMPLATE.format("Bolt Bikes"), status="success", file_id="cluster_test",
+                         stage="flagged", duplicate_of=source.id)
+        db.session.add_all([exact, reworded])
+        db.session.add(Lead(file_id="cluster_test", entry_id=source.id, company_name="Acme Shoes", budget="$5k"))
+        db.session.commit()
+        entries = [exact, reworded]
+        ids = {"source": source.id, "exact": exact.id, "reworded": reworded.id}
+        db.session.expunge_all()
+
+    yield entries, ids
+
+    with clustering.app.app_context():
+        db.session.query(Lead).filter(Lead.file_id == "cluster_test").delete()
+        db.session.query(Entry).filter(Entry.file_id == "cluster_test").update({"duplicate_of": None})
+        db.session.query(Entry).filter(Entry.file_id == "cluster_test").delete()
+        db.session.commit()
+
+
+def test_cluster_key_ignores_case_whitespace_and_punctuation():
+    assert cluster_key("  Need MORE leads!!  ") == cluster_key("need more leads")
+
+
+def test_find_clusters_links_exact_and_near_duplicates():
+    texts = [TEMPLATE.format("Acme Shoes"), TEMPLATE.format("ACME SHOES") + "!", TEMPLATE.format("Acme Shoez"),
+             "Our dental clinic wants more patients from local search."]
+    assert find_clusters([1, 2, 3, 4], texts) == {2: 1, 3: 1}
+
+
+def test_only_reworded_duplicates_are_structured(file_entries):
+    entries, ids = file_entries
+    assert [entry.id for entry in structuring_entries(entries)] == [ids["reworded"]]
+
+
+def test_leads_fan_out_to_exact_duplicates_only(file_entries):
+    entries, ids = file_entries
+    assert fan_out_leads("cluster_test") == 1
+    with clustering.app.app_context():
+        leads = {lead.entry_id: lead.company_name for lead in db.session.query(Lead).filter_by(file_id="cluster_test")}
+    assert leads == {ids["source"]: "Acme Shoes", ids["exact"]: "Acme Shoes"}
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from app.config import SCORE_LEVELS, default_score_matrix, score_matrix
+
+
+def test_unset_matrix_uses_default():
+    assert score_matrix(None) == default_score_matrix()
+    assert score_matrix("null") == default_score_matrix()
+
+
+def test_matrix_scores_become_numbers():
+    matrix = {gpt: {deepseek: str(score) for deepseek, score in row.items()}
+              for gpt, row in default_score_matrix().items()}
+    scores = score_matrix(json.dumps(matrix))
+    assert scores["Urgent"]["Low"] == 10.0
+    assert all(isinstance(score, float) for row in scores.values() for score in row.values())
+
+
+def test_partial_matrix_fails_fast():
+    matrix = default_score_matrix()
+    del matrix["High"]["Low"]
+    with pytest.raises(ValueError, match="'High' -> 'Low'"):
+        score_matrix(json.dumps(matrix))
+    with pytest.raises(ValueError, match="no row for 'Urgent'"):
+        score_matrix(json.dumps({"High": {level: 100 for level in SCORE_LEVELS}}))
+
+
+def test_non_numeric_score_fails_fast():
+    matrix = default_score_matrix()
+    matrix["Low"]["Low"] = "full marks"
+    with pytest.raises(ValueError, match="not a number"):
+        score_matrix(json.dumps(matrix))
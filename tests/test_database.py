@@ -0,0 +1,18 @@
+from sqlalchemy import text
+
+from app import get_app
+from app.database import db
+
+
+def test_pragmas_are_applied_to_new_connections():
+    app = get_app()
+    with app.app_context():
+        db.engine.dispose()
+        with db.engine.connect() as conn:
+            pragmas = {name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                       for name in ("journal_mode", "foreign_keys", "synchronous", "busy_timeout")}
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["foreign_keys"] == 1
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["busy_timeout"] == app.config["SQLITE_PRAGMAS"]["busy_timeout"]
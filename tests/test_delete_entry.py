@@ -0,0 +1,29 @@
+from app.database import db
+from models.entry_model import Entry
+from models.lead_model import Lead
+from models.token_usage_model import TokenUsage
+from scripts.delete_entry import app, delete_entries
+
+FILE_ID = "delete_test"
+
+
+def test_delete_entries_removes_token_usage():
+    with app.app_context():
+        db.create_all()
+        entry = Entry(raw_input="We need a CRM", status="success", file_id=FILE_ID, stage="audited")
+        db.session.add(entry)
+        db.session.flush()
+        db.session.add(Lead(file_id=FILE_ID, entry_id=entry.id))
+        db.session.add_all([
+            TokenUsage(file_id=FILE_ID, stage="flagging", provider="openai", model="gpt-4o-mini", requests=1),
+            TokenUsage(file_id="other_file", stage="flagging", provider="openai", model="gpt-4o-mini", requests=1),
+        ])
+        db.session.commit()
+
+    delete_entries(FILE_ID)
+
+    with app.app_context():
+        for model in (Entry, Lead, TokenUsage):
+            assert db.session.query(model).filter_by(file_id=FILE_ID).count() == 0
+        assert db.session.query(TokenUsage).filter_by(file_id="other_file").delete() == 1
+        db.session.commit()
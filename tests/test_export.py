@@ -0,0 +1,130 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app import get_app
+from app.database import db
+from app.services import export
+from app.services.export import available_export_formats, encode_rows, gzip_chunks
+from models.entry_model import Entry
+from models.lead_model import Lead
+
+ROWS = [{"id": n, "company_name": f"Café {n}", "budget": None} for n in range(500)]
+FILE_ID = "export_test"
+LEVELS = ["Urgent", "Low", "High", "Medium"]
+
+app = get_app()
+
+
+def add_leads(count):
+    with app.app_context():
+        entries = [Entry(raw_input=f"lead {n}", status="success", file_id=FILE_ID, stage="audited")
+                   for n in range(count)]
+        db.session.add_all(entries)
+        db.session.flush()
+        db.session.add_all([Lead(file_id=FILE_ID, entry_id=entry.id, company_name=f"Company {entry.id}",
+                                 audit_AI_priority_level=LEVELS[entry.id % len(LEVELS)]) for entry in entries])
+        db.session.commit()
+
+
+@pytest.fixture
+def leads(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(export, "EXPORT_FOLDER", str(tmp_path))
+    add_leads(25)
+
+    yield
+
+    with app.app_context():
+        db.session.query(Lead).filter(Lead.file_id == FILE_ID).delete()
+        db.session.query(Entry).filter(Entry.file_id == FILE_ID).delete()
+        db.session.commit()
+
+
+def download(client, export_format, etag=None):
+    headers = {"If-None-Match": f'"{etag}"'} if etag else {}
+    return client.get("/download_leads", query_string={"file_id": FILE_ID, "format": export_format}, headers=headers)
+
+
+def test_ndjson_stream(monkeypatch):
+    monkeypatch.setattr(export, "STREAM_CHUNK_BYTES", 1024)
+    chunks = list(encode_rows(iter(ROWS), "ndjson"))
+    assert len(chunks) > 1
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+def test_json_array_stream(monkeypatch):
+    monkeypatch.setattr(export, "STREAM_CHUNK_BYTES", 1024)
+    assert json.loads(b"".join(encode_rows(iter(ROWS), "json"))) == ROWS
+    assert json.loads(b"".join(encode_rows(iter([]), "json"))) == []
+
+
+def test_gzip_stream_is_one_member():
+    data = b"".join(encode_rows(iter(ROWS), "ndjson"))
+    assert gzip.decompress(b"".join(gzip_chunks(encode_rows(iter(ROWS), "ndjson")))) == data
+
+
+def test_csv_gz_is_available_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+    assert available_export_formats() == ["csv.gz"]
+
+
+def test_download_is_cached_by_etag(leads, client):
+    response = download(client, "csv.gz")
+    assert response.status_code == 200
+    etag = response.get_etag()[0]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode("utf-8"))))
+    assert len(rows) == 25
+
+    not_modified = download(client, "csv.gz", etag)
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+
+    # New leads change the fingerprint, so the old ETag gets a fresh export.
+    add_leads(3)
+    changed = download(client, "csv.gz", etag)
+    assert changed.status_code == 200
+    assert changed.get_etag()[0] != etag
+    assert len(gzip.decompress(changed.data).decode("utf-8").splitlines()) == 1 + 28
+
+
+def test_download_rejects_unknown_formats_and_files(leads, client):
+    response = download(client, "xlsx")
+    assert response.status_code == 400
+    assert "csv.gz" in response.json["error"]
+    assert client.get("/download_leads", query_string={"file_id": "missing", "format": "csv.gz"}).status_code == 404
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_download_arrow_formats(leads, client, export_format):
+    pa = pytest.importorskip("pyarrow")
+    response = download(client, export_format)
+    assert response.status_code == 200
+
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(pa.BufferReader(response.data))
+    else:
+        table = pa.ipc.open_file(pa.BufferReader(response.data)).read_all()
+    assert table.num_rows == 25
+    assert table.column_names == list(export.LEAD_FIELDS)
+    assert download(client, export_format, response.get_etag()[0]).status_code == 304
+
+
+def test_export_streams_gzip_ndjson_in_lead_order(leads, client, monkeypatch):
+    monkeypatch.setattr(export, "STREAM_CHUNK_BYTES", 256)
+    response = client.get("/export_leads", query_string={"file_id": FILE_ID, "fields": "id,company_name"},
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.is_streamed
+
+    rows = [json.loads(line) for line in gzip.decompress(response.data).decode("utf-8").splitlines()]
+    with app.app_context():
+        expected = db.session.query(Lead.id, Lead.company_name).filter(Lead.file_id == FILE_ID).order_by(
+            Lead.audit_AI_priority_level.desc(), Lead.id.desc()).all()
+    assert len(expected) == 25
+    assert [(row["id"], row["company_name"]) for row in rows] == [tuple(row) for row in expected]
@@ -0,0 +1,36 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import flag_and_structure, wire_format
+from app.services.flag_and_structure import flag_and_structure_batch
+
+LEAD = {"co": "Acme", "ind": "Retail", "bm": "B2C", "bud": "$5k", "rev": None, "goal": None, "urg": "H",
+        "sent": "H", "note": None}
+
+
+def answer(entries):
+    content = json.dumps({"entries": entries})
+    return lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_compact_answers_get_ids_and_keyed_leads(monkeypatch):
+    monkeypatch.setattr(wire_format.config, "COMPACT_WIRE_FORMAT", True)
+    monkeypatch.setattr(flag_and_structure, "openai_chat", answer([
+        {"flag": "success", "reason": None, "lead": LEAD},
+        {"flag": "fail", "reason": "Spam", "lead": None},
+    ]))
+
+    results = flag_and_structure_batch([{"id": 11, "text": "We sell shoes"}, {"id": 12, "text": "buy now"}])
+    assert [(result["id"], result["flag"]) for result in results] == [(11, "success"), (12, "fail")]
+    assert results[0]["lead"]["Company Name"] == "Acme"
+    assert results[0]["lead"]["Urgency"] == wire_format.PRIORITY_LEVELS["H"]
+    assert results[0]["lead"]["Lead Sentiment"] == wire_format.SENTIMENTS["H"]
+    assert results[1]["lead"] is None
+
+
+def test_short_answer_fails_the_batch(monkeypatch):
+    monkeypatch.setattr(flag_and_structure, "openai_chat", answer([{"flag": "fail", "reason": "Spam", "lead": None}]))
+    with pytest.raises(ValueError):
+        flag_and_structure_batch([{"id": 1, "text": "a"}, {"id": 2, "text": "b"}])
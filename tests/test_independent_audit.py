@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from app.services import assign_priority_audit
+
+
+def make_rows(*levels):
+    return [
+        (SimpleNamespace(id=n, entry_id=n, leads_AI_priority_level="High", audit_AI_priority_level=level),
+         SimpleNamespace(raw_input="We need more clients."))
+        for n, level in enumerate(levels, start=1)
+    ]
+
+
+def run(monkeypatch, rows, classified=True):
+    written = []
+    monkeypatch.setattr(assign_priority_audit.config, "AUDIT_DISAGREEMENT_NOTES", False)
+    monkeypatch.setattr(assign_priority_audit, "classify_independently", lambda file_id, entry_ids=None: classified)
+    monkeypatch.setattr(assign_priority_audit, "get_leads_for_deepseek", lambda *args, **kwargs: rows)
+    monkeypatch.setattr(assign_priority_audit, "write_in_chunks", lambda items, write_chunk: written.extend(items))
+    return assign_priority_audit.score_independent_audit("file"), written
+
+
+def test_scores_labeled_leads(monkeypatch):
+    complete, written = run(monkeypatch, make_rows("High", "Low"))
+    assert complete is True
+    assert [(lead_id, score) for lead_id, entry_id, score, note in written] == [(1, 100.0), (2, 40.0)]
+
+
+def test_unlabeled_lead_is_reported_incomplete(monkeypatch):
+    complete, written = run(monkeypatch, make_rows("High", None))
+    assert complete is False
+    assert [lead_id for lead_id, entry_id, score, note in written] == [1]
+
+
+def test_incomplete_classification_is_reported(monkeypatch):
+    complete, written = run(monkeypatch, make_rows("High"), classified=False)
+    assert complete is False
+
+
+def test_only_unlabeled_leads(monkeypatch):
+    complete, written = run(monkeypatch, make_rows(None, None))
+    assert complete is False and written == []
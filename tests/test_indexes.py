@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.database import db
+from scripts.benchmark_queries import TARGET_FILE, create_indexes, hot_queries, query_plan
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('indexes') / 'plans.db'}")
+    db.metadata.create_all(engine)
+    create_indexes(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name, statement", hot_queries(TARGET_FILE), ids=[name for name, _ in hot_queries(TARGET_FILE)])
+def test_hot_queries_use_an_index(engine, name, statement):
+    with engine.connect() as conn:
+        plan = query_plan(conn, statement)
+    full_scans = [step for step in plan.split("; ") if step.startswith("SCAN") and "USING" not in step]
+    assert not full_scans, f"{name}: {plan}"
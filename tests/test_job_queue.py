@@ -0,0 +1,126 @@
+import io
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from app.config import config
+from app.services import job_queue
+from app.services.job_queue import _claim_next_job, enqueue_job, get_job, owner_is_gone, run_job, worker_owner
+from app.services.pipeline import PipelineError
+
+
+def test_owner_of_a_live_process_is_kept():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        assert not owner_is_gone(f"{socket.gethostname()}:{child.pid}")
+    finally:
+        child.kill()
+        child.wait()
+    assert owner_is_gone(f"{socket.gethostname()}:{child.pid}")
+
+
+def test_unknown_and_reused_owners_are_gone():
+    assert owner_is_gone(None)
+    assert owner_is_gone(worker_owner())
+    assert worker_owner().endswith(f":{os.getpid()}")
+
+
+def test_jobs_of_other_hosts_are_left_alone():
+    assert not owner_is_gone("some-other-host:1")
+
+
+@pytest.fixture
+def no_workers(monkeypatch):
+    # Jobs stay queued until a test claims or runs them itself.
+    monkeypatch.setattr(config, "JOB_WORKERS", 0)
+
+
+def test_two_workers_claim_each_job_once(no_workers):
+    job_ids = {enqueue_job(f"claim_test_{n}") for n in range(20)}
+    claims = [[], []]
+    start = threading.Barrier(2)
+
+    def worker(claimed):
+        start.wait()
+        while (job_id := _claim_next_job()) is not None:
+            claimed.append(job_id)
+
+    threads = [threading.Thread(target=worker, args=(claimed,)) for claimed in claims]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ours = [job_id for job_id in claims[0] + claims[1] if job_id in job_ids]
+    assert sorted(ours) == sorted(job_ids)
+    assert all(get_job(job_id)["status"] == "running" for job_id in job_ids)
+
+
+def test_run_job_completes_with_timings(no_workers, monkeypatch):
+    def fake_upload(file_id, file_name, mode=None, on_progress=None):
+        on_progress("populate", "completed", 3)
+        return {"total": 1.5}
+
+    monkeypatch.setattr(job_queue, "process_upload", fake_upload)
+    job_id = enqueue_job("run_job_ok", "run_job_ok.json")
+    run_job(job_id)
+
+    job = get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["result"] == {"timings": {"total": 1.5}}
+    assert job["progress"]["populate"] == {"status": "completed", "entries": 3}
+    assert job["finished_at"] is not None
+
+
+@pytest.mark.parametrize("error, message", [
+    (PipelineError("Flagging failed for 2 entries"), "Flagging failed for 2 entries"),
+    (RuntimeError("boom"), "Unexpected error: boom"),
+])
+def test_run_job_records_failures(no_workers, monkeypatch, error, message):
+    def fake_resume(file_id, mode=None, on_progress=None):
+        raise error
+
+    monkeypatch.setattr(job_queue, "resume_file", fake_resume)
+    job_id = enqueue_job("run_job_fails", action="resume")
+    run_job(job_id)
+
+    job = get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == message
+    assert job["progress"]["populate"]["status"] == "skipped"
+
+
+def test_upload_is_queued_then_reports_links(client, no_workers, monkeypatch, tmp_path):
+    monkeypatch.setattr("app.main.UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(job_queue, "process_upload", lambda file_id, file_name, mode=None, on_progress=None: {"total": 2.0})
+
+    response = client.post("/process-file", data={"file": (io.BytesIO(b"We need a new CRM\n"), "job_flow.txt")})
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    assert response.json["status_url"] == f"/jobs/{job_id}"
+    assert (tmp_path / "job_flow.txt").exists()
+
+    assert client.get(f"/jobs/{job_id}").json["status"] == "queued"
+    pending = client.get(f"/jobs/{job_id}/result")
+    assert pending.status_code == 202
+    assert pending.json["status"] == "queued"
+
+    run_job(job_id)
+
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json == {
+        "job_id": job_id,
+        "file_id": "job_flow",
+        "status": "completed",
+        "timings": {"total": 2.0},
+        "lead_count": 0,
+        "leads_url": "/get_leads?file_id=job_flow",
+        "export_url": "/export_leads?file_id=job_flow",
+        "download_url": "/download_leads?file_id=job_flow",
+    }
+    assert client.get("/jobs/missing/result").status_code == 404
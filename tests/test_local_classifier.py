@@ -0,0 +1,60 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import local_classifier
+from app.services.local_classifier import LocalClassifier, classify_entries, tokenize
+
+LEADS = [f"We run a {kind} business and need more clients, budget {n}k a month for marketing."
+         for n, kind in enumerate(["dental", "saas", "ecommerce", "coaching", "agency", "retail"] * 4, start=1)]
+JUNK = [f"win free {prize} now click the link {n} times" for n, prize in
+        enumerate(["money", "phones", "prizes", "cash", "gifts", "crypto"] * 4, start=1)]
+
+
+def test_tokenize_masks_numbers_and_adds_pairs():
+    assert tokenize("Budget 5k, 20 staff") == ["budget", "<num>k", "<num>", "staff",
+                                               "budget <num>k", "<num>k <num>", "<num> staff"]
+
+
+def test_fit_predict_and_round_trip(tmp_path):
+    model = LocalClassifier.fit(LEADS + JUNK, ["success"] * len(LEADS) + ["fail"] * len(JUNK))
+    predictions = model.predict(["Our dental clinic needs more clients, budget 3k a month.",
+                                 "click the link to win free cash now"])
+    assert [label for label, probability in predictions] == ["success", "fail"]
+
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = LocalClassifier.load(path)
+    assert loaded.labels == model.labels
+    assert np.allclose(loaded.predict_proba(LEADS[:3]), model.predict_proba(LEADS[:3]))
+
+
+def test_only_confident_success_and_fail_are_decided_locally(monkeypatch):
+    predictions = [("success", 0.99), ("fail", 0.5), ("edge case", 0.99), ("fail", 0.97)]
+    monkeypatch.setattr(local_classifier, "get_model", lambda: SimpleNamespace(predict=lambda texts: predictions))
+    written = []
+    monkeypatch.setattr(local_classifier, "write_in_chunks", lambda items, write_chunk: written.extend(items))
+
+    entries = [SimpleNamespace(id=n, raw_input=f"entry {n}") for n in range(4)]
+    remaining = classify_entries("file", entries, threshold=0.95)
+    assert [entry.id for entry in remaining] == [1, 2]
+    assert [(entry.id, label) for entry, label in written] == [(0, "success"), (3, "fail")]
+
+
+def test_without_a_model_every_entry_goes_to_the_llm(monkeypatch):
+    monkeypatch.setattr(local_classifier, "get_model", lambda: None)
+    entries = [SimpleNamespace(id=1, raw_input="hello")]
+    assert classify_entries("file", entries) == entries
+
+
+def test_sparse_scores_match_the_dense_product():
+    model = LocalClassifier.fit(LEADS + JUNK, ["success"] * len(LEADS) + ["fail"] * len(JUNK))
+    rows = [model._vectorize(Counter(tokenize(text))) for text in LEADS[:3] + ["zzz"] + JUNK[:2]]
+    dense = np.zeros((len(rows), len(model.vocabulary)), dtype=np.float32)
+    for n, (indices, values) in enumerate(rows):
+        dense[n, indices] = values
+
+    scores = dense @ model.weights + model.bias
+    expected = np.exp(scores - scores.max(axis=1, keepdims=True))
+    assert np.allclose(model._softmax(model._stack(rows)), expected / expected.sum(axis=1, keepdims=True), atol=1e-6)
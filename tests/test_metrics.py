@@ -0,0 +1,51 @@
+import pytest
+
+from app import get_app
+from app.database import db
+from app.services import metrics
+from models.token_usage_model import TokenUsage
+
+FILE_ID = "metrics_test"
+
+
+@pytest.fixture
+def ledger():
+    with get_app().app_context():
+        db.create_all()
+    yield
+    with get_app().app_context():
+        db.session.query(TokenUsage).filter(TokenUsage.file_id == FILE_ID).delete()
+        db.session.commit()
+
+
+def test_request_cost(monkeypatch):
+    monkeypatch.setattr(metrics.config, "MODEL_PRICES", {"test-model": {"input": 2.0, "output": 8.0}})
+    assert metrics.request_cost("test-model", 1_000_000, 500_000) == pytest.approx(6.0)
+    assert metrics.request_cost("unpriced-model", 1000, 1000) == 0.0
+
+
+def test_cached_prompt_tokens():
+    assert metrics.cached_prompt_tokens({"prompt_tokens_details": {"cached_tokens": 40}}) == 40
+    assert metrics.cached_prompt_tokens({"prompt_cache_hit_tokens": 25}) == 25
+    assert metrics.cached_prompt_tokens({}) == 0
+
+
+def test_usage_is_added_to_the_ledger_per_file_and_stage(ledger, monkeypatch):
+    monkeypatch.setattr(metrics.config, "MODEL_PRICES", {"test-model": {"input": 1.0, "output": 1.0}})
+    for _ in range(2):
+        with metrics.span("flagging", FILE_ID):
+            metrics.record_request("openai", "test-model", 0.2, "ok", {"prompt_tokens": 300, "completion_tokens": 200})
+            metrics.record_request("openai", "test-model", 0.1, "429")
+
+    report = metrics.usage_report(FILE_ID)[FILE_ID]
+    assert report["stages"]["flagging (test-model)"] == {"requests": 2, "prompt_tokens": 600,
+                                                         "completion_tokens": 400, "cost_usd": 0.001}
+
+
+def test_render_exposition_format():
+    with metrics.scope(stage="flagging"):
+        metrics.record_batch(7)
+    text = metrics.render()
+    assert "# TYPE llm_batch_items histogram" in text
+    assert 'llm_batch_items_bucket{stage="flagging",le="10"}' in text
+    assert metrics.format_labels([("reason", 'say "hi"\n')]) == '{reason="say \\"hi\\"\\n"}'
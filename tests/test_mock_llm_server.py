@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import providers
+from app.services.assign_priority_audit import (COMPACT_CLASSIFY_PROMPT, PRIORITY_LEVELS, call_deepseek_rows_batch,
+                                                decode_classification_row, lead_row)
+from app.services.flag_and_structure import flag_and_structure_batch
+from scripts.mock_llm_server import MockSettings, start_mock_server
+
+INSTANT = dict(openai_latency="fixed:0", deepseek_latency="fixed:0", seconds_per_item=0.0)
+
+
+@pytest.fixture
+def mock_url(monkeypatch):
+    server = start_mock_server(MockSettings(**INSTANT))
+    url = f"http://127.0.0.1:{server.server_port}/v1"
+    monkeypatch.setattr(providers.config, "OPENAI_BASE_URL", url)
+    monkeypatch.setattr(providers.config, "DEEPSEEK_BASE_URL", url)
+    monkeypatch.setattr(providers.config, "COMPACT_WIRE_FORMAT", True)
+    # Clients are built on first use with the base URL of that moment.
+    monkeypatch.setattr(providers, "_clients", {})
+    yield url
+    server.shutdown()
+
+
+def test_openai_schema_answers_through_the_real_client(mock_url):
+    batch = [{"id": n, "text": f"We need {n}0 more clients for our agency."} for n in range(1, 6)]
+    results = flag_and_structure_batch(batch)
+    assert [result["id"] for result in results] == [1, 2, 3, 4, 5]
+    assert all(result["flag"] in ("success", "fail", "edge case") for result in results)
+    assert all(result["lead"] is not None for result in results if result["flag"] == "success")
+
+
+def test_deepseek_compact_rows_through_the_real_client(mock_url):
+    leads = [SimpleNamespace(entry_id=n, company_name=None, industry="SaaS", business_model="B2B", budget="$5k",
+                             revenue=None, growth_goal=None, urgency="High", lead_sentiment="Hot",
+                             additional_notes=None) for n in range(1, 4)]
+    entry = SimpleNamespace(raw_input="We sell software and need more demos.")
+    results = call_deepseek_rows_batch(COMPACT_CLASSIFY_PROMPT, decode_classification_row)(
+        [lead_row(lead, entry) for lead in leads])
+    assert sorted(result["id"] for result in results) == [1, 2, 3]
+    assert all(result["deepseek_priority_level"] in PRIORITY_LEVELS for result in results)
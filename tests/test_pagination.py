@@ -0,0 +1,134 @@
+import pytest
+
+from app import get_app
+from app.database import db
+from app.services.pagination import (LEAD_FIELDS, PaginationError, decode_cursor, encode_cursor, page_entries,
+                                     page_leads, parse_fields, parse_limit)
+from models.edge_case_model import EdgeCase
+from models.entry_model import Entry
+from models.lead_model import Lead
+
+FILE_ID = "pagination_test"
+LEVELS = ["Urgent", None, "High", "Low", None, "High", "Medium", "Urgent", "Low"]
+
+app = get_app()
+
+
+@pytest.fixture(scope="module")
+def leads():
+    with app.app_context():
+        db.create_all()
+        entries = [Entry(raw_input=f"entry {n}", status="success", file_id=FILE_ID, stage="audited")
+                   for n in range(len(LEVELS))]
+        db.session.add_all(entries)
+        db.session.flush()
+        db.session.add_all([Lead(file_id=FILE_ID, entry_id=entry.id, audit_AI_priority_level=level)
+                            for entry, level in zip(entries, LEVELS)])
+        db.session.add_all([EdgeCase(file_id=FILE_ID, entry_id=entry.id, raw_input=entry.raw_input, reason="Spam")
+                            for entry in entries[::2]])
+        db.session.commit()
+
+    yield
+
+    with app.app_context():
+        db.session.query(Lead).filter(Lead.file_id == FILE_ID).delete()
+        db.session.query(EdgeCase).filter(EdgeCase.file_id == FILE_ID).delete()
+        db.session.query(Entry).filter(Entry.file_id == FILE_ID).delete()
+        db.session.commit()
+
+
+def all_pages(page, **kwargs):
+    rows, cursor, pages = [], None, 0
+    with app.app_context():
+        while True:
+            page_rows, cursor = page(FILE_ID, cursor=cursor, limit=2, **kwargs)
+            rows.extend(page_rows)
+            pages += 1
+            if cursor is None:
+                return rows, pages
+
+
+def expected_lead_order():
+    with app.app_context():
+        rows = db.session.query(Lead.id, Lead.audit_AI_priority_level).filter(Lead.file_id == FILE_ID).all()
+    # Descending by level, then by id, with NULL levels last.
+    return sorted((row for row in rows if row[1] is not None), key=lambda row: (row[1], row[0]), reverse=True) + \
+        sorted((row for row in rows if row[1] is None), key=lambda row: row[0], reverse=True)
+
+
+def walk(client, endpoint, **params):
+    """Follows X-Next-Cursor through every page of an endpoint."""
+    rows, params = [], {"file_id": FILE_ID, "limit": 2, **params}
+    while True:
+        response = client.get(endpoint, query_string=params)
+        assert response.status_code == 200
+        rows.extend(response.json)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows
+        params["cursor"] = cursor
+
+
+def test_lead_pages_cover_every_lead_once_in_sort_order(leads):
+    rows, pages = all_pages(page_leads, fields=["id", "audit_AI_priority_level"])
+    assert pages == 5
+    assert len({row["id"] for row in rows}) == len(LEVELS)
+
+    assert [(row["id"], row["audit_AI_priority_level"]) for row in rows] == expected_lead_order()
+
+
+def test_filters_and_projection(leads):
+    rows, pages = all_pages(page_leads, fields=["audit_AI_priority_level"], priorities=["High", "Urgent"])
+    assert sorted(row["audit_AI_priority_level"] for row in rows) == ["High", "High", "Urgent", "Urgent"]
+    assert all(list(row) == ["audit_AI_priority_level"] for row in rows)
+
+    entries, pages = all_pages(page_entries, fields=["id"])
+    assert [row["id"] for row in entries] == sorted(row["id"] for row in entries)
+    assert len(entries) == len(LEVELS)
+
+
+def test_parameter_validation():
+    assert parse_fields(None, LEAD_FIELDS) == list(LEAD_FIELDS)
+    assert parse_fields("id, budget", LEAD_FIELDS) == ["id", "budget"]
+    with pytest.raises(PaginationError):
+        parse_fields("id,password", LEAD_FIELDS)
+    with pytest.raises(PaginationError):
+        parse_limit("0")
+    with pytest.raises(PaginationError):
+        parse_limit("ten")
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(["High", 42]), 2) == ["High", 42]
+    with pytest.raises(PaginationError):
+        decode_cursor(encode_cursor([42]), 2)
+    with pytest.raises(PaginationError):
+        decode_cursor("not a cursor!", 1)
+
+
+def test_endpoints_walk_every_row_once_in_order(leads, client):
+    rows = walk(client, "/get_leads", fields="id,audit_AI_priority_level")
+    assert [(row["id"], row["audit_AI_priority_level"]) for row in rows] == expected_lead_order()
+
+    with app.app_context():
+        entry_ids = [id for id, in db.session.query(Entry.id).filter(Entry.file_id == FILE_ID).order_by(Entry.id)]
+        edge_case_ids = [id for id, in db.session.query(EdgeCase.id).filter(EdgeCase.file_id == FILE_ID)
+                         .order_by(EdgeCase.id)]
+    assert [row["id"] for row in walk(client, "/get_entries")] == entry_ids
+    assert [row["id"] for row in walk(client, "/get_edge_cases")] == edge_case_ids
+
+
+def test_endpoints_project_fields(leads, client):
+    for endpoint, fields in (("/get_leads", ["id", "company_name"]), ("/get_entries", ["stage"]),
+                             ("/get_edge_cases", ["entry_id", "reason"])):
+        rows = client.get(endpoint, query_string={"file_id": FILE_ID, "fields": ",".join(fields)}).json
+        assert rows and all(set(row) == set(fields) for row in rows)
+
+
+@pytest.mark.parametrize("endpoint", ["/get_leads", "/get_entries", "/get_edge_cases"])
+@pytest.mark.parametrize("params", [{"fields": "id,password"}, {"limit": "0"}, {"limit": "ten"},
+                                    {"cursor": "not a cursor!"}])
+def test_endpoints_reject_bad_parameters(leads, client, endpoint, params):
+    response = client.get(endpoint, query_string={"file_id": FILE_ID, **params})
+    assert response.status_code == 400
+    assert "error" in response.json
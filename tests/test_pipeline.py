@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.database import db
+from app.services import pipeline
+from app.services.checkpoints import mark_stage
+from app.services.pipeline import PipelineError, run_pipeline
+from models.entry_model import Entry
+
+FILE_ID = "pipeline_test"
+ENTRIES = 10
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    """Stages that only move the file's entries on, recording the chunks each one saw."""
+    with pipeline.app.app_context():
+        db.create_all()
+        db.session.add_all([Entry(raw_input=f"entry {n}", status="pending", file_id=FILE_ID) for n in range(ENTRIES)])
+        db.session.commit()
+    calls = {}
+
+    def ids(entry_ids, stage):
+        query = db.session.query(Entry.id).filter(Entry.file_id == FILE_ID, Entry.stage == stage)
+        if entry_ids is not None:
+            query = query.filter(Entry.id.in_(entry_ids))
+        return [entry_id for (entry_id,) in query]
+
+    def advance(name, before, after, skip=()):
+        def run_stage(file_id, entry_ids=None):
+            with pipeline.app.app_context():
+                chunk = [entry_id for entry_id in ids(entry_ids, before) if entry_id not in skip]
+                calls.setdefault(name, []).append(len(chunk))
+                if name == "flagging":
+                    db.session.query(Entry).filter(Entry.id.in_(chunk)).update({"status": "success"})
+                mark_stage(chunk, after)
+                db.session.commit()
+            return True
+        return run_stage
+
+    def setup(skip_audit=()):
+        monkeypatch.setattr(pipeline, "flag_entries", advance("flagging", "pending", "flagged"))
+        monkeypatch.setattr(pipeline, "get_success_entries",
+                            lambda file_id, entry_ids=None: [SimpleNamespace(id=entry_id) for entry_id in entry_ids])
+        monkeypatch.setattr(pipeline, "process_lead_qualification", advance("structuring", "flagged", "structured"))
+        monkeypatch.setattr(pipeline, "run_priority", advance("priority", "structured", "prioritised"))
+        monkeypatch.setattr(pipeline, "process_deepseek_audit", advance("audit", "prioritised", "audited", skip_audit))
+        return calls
+
+    yield setup
+
+    with pipeline.app.app_context():
+        db.session.query(Entry).filter(Entry.file_id == FILE_ID).delete()
+        db.session.commit()
+
+
+@pytest.mark.parametrize("mode, chunks", [("barrier", [ENTRIES]), ("streaming", [4, 4, 2])])
+def test_every_stage_sees_every_entry(fake_stages, monkeypatch, mode, chunks):
+    monkeypatch.setattr(pipeline.config, "PIPELINE_CHUNK_SIZE", 4)
+    calls = fake_stages()
+    progress = []
+
+    timings = run_pipeline(FILE_ID, mode, lambda stage, status, entries=0: progress.append((stage, status, entries)))
+    assert timings["mode"] == mode
+    assert calls == {stage: chunks for stage in pipeline.STAGES}
+    for stage in pipeline.STAGES:
+        assert sum(entries for name, status, entries in progress if name == stage) == ENTRIES
+        assert any(name == stage and status == "completed" for name, status, entries in progress)
+
+
+@pytest.mark.parametrize("mode", pipeline.PIPELINE_MODES)
+def test_unfinished_entries_fail_the_run_with_a_summary(fake_stages, mode):
+    with pipeline.app.app_context():
+        first = db.session.query(Entry.id).filter(Entry.file_id == FILE_ID).order_by(Entry.id).first()[0]
+    fake_stages(skip_audit={first})
+
+    with pytest.raises(PipelineError, match=r"1 entries did not finish .*\(1 prioritised\)"):
+        run_pipeline(FILE_ID, mode)
+
+
+def test_unknown_mode():
+    with pytest.raises(PipelineError, match="Unknown pipeline mode"):
+        run_pipeline(FILE_ID, "warp")
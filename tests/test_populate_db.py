@@ -0,0 +1,47 @@
+import io
+import json
+
+import pytest
+
+from app.database import db
+from models.entry_model import Entry
+from scripts.populate_db import app, ingest_stream, iter_json_array, iter_texts
+
+FILE_ID = "populate_test"
+TEXTS = ["We need more leads, budget $5k.", 'Quotes " and commas, [brackets] too', "Ünïcode café"]
+
+
+def test_json_array_across_read_boundaries():
+    data = json.dumps([{"text": text} for text in TEXTS] + ["plain string"], ensure_ascii=False)
+    for read_size in (1, 3, 7, 1 << 16):
+        items = list(iter_json_array(io.StringIO(data), read_size=read_size))
+        assert [item if isinstance(item, str) else item["text"] for item in items] == TEXTS + ["plain string"]
+    assert list(iter_json_array(io.StringIO("  [ ]  "))) == []
+
+
+def test_malformed_json_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('{"text": "not an array"}')))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"text": "a"} {"text": "b"}]')))
+
+
+def test_text_formats():
+    ndjson = "\n".join(json.dumps({"text": text}) for text in TEXTS) + "\n\n"
+    assert list(iter_texts(io.StringIO(ndjson), "ndjson")) == TEXTS
+    assert list(iter_texts(io.StringIO("\n".join(TEXTS) + "\n  \n"), "txt")) == TEXTS
+
+
+def test_ingest_in_chunks():
+    data = io.StringIO("\n".join(f"inquiry {n}" for n in range(7)))
+    with app.app_context():
+        db.create_all()
+    try:
+        assert ingest_stream(data, FILE_ID, "txt", chunk_size=3) == 7
+        with app.app_context():
+            rows = db.session.query(Entry.raw_input, Entry.stage).filter(Entry.file_id == FILE_ID).order_by(Entry.id)
+            assert [tuple(row) for row in rows] == [(f"inquiry {n}", "pending") for n in range(7)]
+    finally:
+        with app.app_context():
+            db.session.query(Entry).filter(Entry.file_id == FILE_ID).delete()
+            db.session.commit()
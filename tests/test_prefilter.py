@@ -0,0 +1,58 @@
+import pytest
+
+from app.services import prefilter
+from app.services.prefilter import junk_rules, rule_hits
+
+
+@pytest.mark.parametrize("text", [
+    "I run a dental practice and want more patients",
+    "Looking for help with our Shopify",
+    "Can we set up a Zoom before I share details?",
+    "Hi, I'd love to chat about working together",
+    "We need 20 new clients a month for our agency.",
+    "CRM + PPC + SEO for B2B SMB",
+    "PPC CRM help",
+    "Click here to see our portfolio - we are an agency doing 30k/mo and need to hire",
+    "Нам нужно больше клиентов для нашего интернет-магазина",
+    "我们需要更多的客户来发展我们的业务",
+])
+def test_real_leads_pass(text):
+    assert rule_hits(text) == []
+
+
+@pytest.mark.parametrize("text, rule", [
+    ("hi", "too_short"),
+    ("aaaaaaaaaaaaaaaaaaaaaaaa", "low_entropy"),
+    ("xkcd qwrtp zxcvb mnbvc plkjh", "gibberish"),
+    ("Click here to claim your prize!!!", "blocklist"),
+    ("https://example.com/promo", "blocklist"),
+    ("!!!! ???? #### 1234 ....", "few_letters"),
+])
+def test_junk_fails(text, rule):
+    hits = rule_hits(text)
+    assert rule in hits
+    assert hits[-1] == "no_business_signal"
+
+
+def test_acronyms_are_not_gibberish():
+    assert "gibberish" not in junk_rules("CRM + PPC + SEO for B2B SMB")
+    assert "gibberish" not in junk_rules("PPC CRM help")
+    assert "gibberish" in junk_rules("xkcd qwrtp zxcvb")
+
+
+def test_click_here_alone_is_not_spam():
+    assert "blocklist" not in junk_rules("Click here to see our portfolio - we are an agency")
+    assert "blocklist" in junk_rules("Click this link to claim your reward")
+
+
+def test_non_latin_text_goes_to_the_llm_by_default(monkeypatch):
+    assert "unsupported_alphabet" not in junk_rules("Нам нужно больше клиентов")
+    monkeypatch.setattr(prefilter.config, "PREFILTER_MIN_LATIN_RATIO", 0.3)
+    assert "unsupported_alphabet" in junk_rules("Нам нужно больше клиентов")
+
+
+def test_business_term_overrides_junk_rules():
+    assert junk_rules("shop") == ["too_short", "low_entropy"]
+    assert rule_hits("shop") == []
+    assert rule_hits("hi") == ["too_short", "low_entropy", "no_business_signal"]
+    assert rule_hits("What a lovely day it is today, friends") == []
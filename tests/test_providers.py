@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import providers
+from app.services.providers import (ProviderError, RetryableError, TokenBucket, backoff_delay, retry_after_seconds,
+                                    with_retries)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(providers.time, "sleep", delays.append)
+    monkeypatch.setattr(providers.config, "PROVIDER_MAX_RETRIES", 2)
+    return delays
+
+
+def test_retryable_errors_are_retried(no_sleep):
+    answers = [RetryableError("429", status_code=429, retry_after=3), RetryableError("timeout"), "ok"]
+
+    def send():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer, {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+
+    assert with_retries("test", "test-model", send, estimated_tokens=15) == "ok"
+    assert no_sleep[0] == 3
+
+
+def test_gives_up_after_max_retries(no_sleep):
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise RetryableError("503", status_code=503)
+
+    with pytest.raises(ProviderError) as error:
+        with_retries("test", "test-model", send, estimated_tokens=15)
+    assert len(calls) == 3
+    assert error.value.status_code == 503
+
+
+def test_other_errors_are_not_retried(no_sleep):
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise ProviderError("test", "bad request", 400)
+
+    with pytest.raises(ProviderError):
+        with_retries("test", "test-model", send, estimated_tokens=15)
+    assert len(calls) == 1
+
+
+def test_backoff(monkeypatch):
+    monkeypatch.setattr(providers.config, "PROVIDER_BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(providers.config, "PROVIDER_BACKOFF_MAX", 10.0)
+    assert backoff_delay(0, retry_after=60) == 10.0
+    assert all(0 <= backoff_delay(2) <= 4 for _ in range(50))
+    assert all(backoff_delay(10) <= 10 for _ in range(50))
+    assert retry_after_seconds({"retry-after": "2.5"}) == 2.5
+    assert retry_after_seconds({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert retry_after_seconds(None) is None
+
+
+def test_token_bucket_waits_once_empty():
+    bucket = TokenBucket(60)  # one unit a second
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0, abs=0.05)
+    bucket.refund(10)
+    assert bucket.reserve(5) == 0.0
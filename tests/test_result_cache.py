@@ -0,0 +1,46 @@
+from app.services.result_cache import ResultCache, cache_key
+
+PROMPT = "Flag each entry."
+
+
+def test_key_ignores_whitespace_but_not_content_or_prompt():
+    key = cache_key("flagging", "gpt-4o", PROMPT, {"text": "Need more  leads\n"})
+    assert key == cache_key("flagging", "gpt-4o", PROMPT, {"text": "Need more leads"})
+    assert key != cache_key("flagging", "gpt-4o", PROMPT, {"text": "Need more sales"})
+    assert key != cache_key("flagging", "gpt-4o", PROMPT + " Be strict.", {"text": "Need more leads"})
+    assert key != cache_key("structuring", "gpt-4o", PROMPT, {"text": "Need more leads"})
+
+
+def test_results_are_shared_across_entry_ids(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    cache.store("flagging", "gpt-4o", PROMPT, [{"id": 1, "text": "Need more leads"}], {1: {"id": 1, "status": "success"}})
+
+    found = cache.lookup("flagging", "gpt-4o", PROMPT, [{"id": 7, "text": "Need  more leads"}, {"id": 8, "text": "Hi"}])
+    assert found == {7: {"id": 7, "status": "success"}}
+    assert cache.stats()["stages"] == {"flagging": {"hits": 1, "misses": 1}}
+
+
+def test_custom_id_key(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    cache.store("priority", "gpt-4o", PROMPT, [{"entry_id": 1, "row": ["SaaS"]}], {1: {"entry_id": 1, "level": "High"}},
+                id_key="entry_id")
+    assert cache.lookup("priority", "gpt-4o", PROMPT, [{"entry_id": 2, "row": ["SaaS"]}], id_key="entry_id") == \
+        {2: {"entry_id": 2, "level": "High"}}
+
+
+def test_eviction_keeps_most_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"), max_entries=2)
+    for n in range(3):
+        cache.store("flagging", "gpt-4o", PROMPT, [{"id": n, "text": f"entry {n}"}], {n: {"status": "success"}})
+    cache.lookup("flagging", "gpt-4o", PROMPT, [{"id": 0, "text": "entry 0"}])
+
+    assert cache.evict() == 1
+    remaining = cache.lookup("flagging", "gpt-4o", PROMPT, [{"id": n, "text": f"entry {n}"} for n in range(3)])
+    assert sorted(remaining) == [0, 2]
+
+
+def test_disabled_cache_does_nothing(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"), enabled=False)
+    cache.store("flagging", "gpt-4o", PROMPT, [{"id": 1, "text": "x"}], {1: {"status": "success"}})
+    assert cache.lookup("flagging", "gpt-4o", PROMPT, [{"id": 1, "text": "x"}]) == {}
+    assert not (tmp_path / "cache.db").exists()
@@ -0,0 +1,43 @@
+from app.services import token_planner
+from app.services.token_planner import estimate_tokens, plan_batches
+
+
+def use_budget(monkeypatch, input_tokens, output_tokens):
+    monkeypatch.setattr(token_planner.config, "MODEL_TOKEN_BUDGETS",
+                        {"test-model": {"input": input_tokens, "output": output_tokens}})
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 35) == 10
+    assert estimate_tokens({"id": 1}) == estimate_tokens('{"id": 1}')
+
+
+def test_batches_respect_input_budget(monkeypatch):
+    use_budget(monkeypatch, input_tokens=100, output_tokens=10000)
+    items = ["x" * 70] * 5  # 20 tokens each
+    batches = plan_batches(items, "test-model", "p" * 35, output_tokens=1, max_items=50)
+    # 10 prompt tokens + 4 items = 90 tokens; a fifth would exceed 100.
+    assert [len(batch) for batch in batches] == [4, 1]
+
+
+def test_batches_respect_output_budget_and_item_cap(monkeypatch):
+    use_budget(monkeypatch, input_tokens=100000, output_tokens=100)
+    assert [len(batch) for batch in plan_batches(list(range(7)), "test-model", "", 30, max_items=50)] == [3, 3, 1]
+    assert [len(batch) for batch in plan_batches(list(range(7)), "test-model", "", 1, max_items=2)] == [2, 2, 2, 1]
+
+
+def test_output_estimate_can_depend_on_the_item(monkeypatch):
+    use_budget(monkeypatch, input_tokens=100000, output_tokens=100)
+    batches = plan_batches([10, 80, 30, 60], "test-model", "", lambda item, tokens: item, max_items=50)
+    assert batches == [[10, 80], [30, 60]]
+
+
+def test_oversized_item_is_sent_alone(monkeypatch):
+    use_budget(monkeypatch, input_tokens=50, output_tokens=1000)
+    batches = plan_batches(["short", "x" * 1000, "short"], "test-model", "", 1, max_items=50)
+    assert batches == [["short"], ["x" * 1000], ["short"]]
+
+
+def test_unknown_model_uses_default_budget():
+    assert token_planner.token_budget("no-such-model") == token_planner.DEFAULT_BUDGET
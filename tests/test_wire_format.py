@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from app.services import wire_format
+from app.services.result_cache import _payload, cache_key
+from app.services.assign_priority_lead import COMPACT_PRIORITY_PROMPT, MODEL, priority_row
+from app.services.assign_priority_audit import (COMPACT_AUDIT_PROMPT, decode_audit_row, decode_classification_row,
+                                                lead_row, priority_code)
+
+
+def make_lead(entry_id, **fields):
+    values = {"company_name": None, "industry": "SaaS", "business_model": "B2B", "budget": "$5k",
+              "revenue": None, "growth_goal": None, "urgency": "High", "lead_sentiment": "Hot",
+              "additional_notes": None, "leads_AI_priority_level": "High"}
+    values.update(fields)
+    return SimpleNamespace(entry_id=entry_id, **values)
+
+
+def test_row_drops_trailing_empty_values():
+    assert wire_format.row("a", None, "b", None, "") == ["a", None, "b"]
+    assert wire_format.row(None, "") == []
+
+
+def test_codes_round_trip():
+    for level, code in wire_format.PRIORITY_CODES.items():
+        assert wire_format.PRIORITY_LEVELS[code] == level
+    for sentiment, code in wire_format.SENTIMENT_CODES.items():
+        assert wire_format.SENTIMENTS[code] == sentiment
+
+
+def test_parse_rows():
+    assert wire_format.parse_rows('[[1, "H"], [2, "L", 70], "junk", []]') == [[1, "H"], [2, "L", 70]]
+    assert wire_format.parse_rows('{"not": "a list"}') is None
+    assert wire_format.parse_rows('[[1, "H"') is None
+
+
+def test_compact_dumps(monkeypatch):
+    monkeypatch.setattr(wire_format.config, "COMPACT_WIRE_FORMAT", True)
+    assert wire_format.dumps([[1, "Café"]]) == '[[1,"Café"]]'
+    monkeypatch.setattr(wire_format.config, "COMPACT_WIRE_FORMAT", False)
+    assert wire_format.dumps([[1, "Café"]]) == '[[1, "Caf\\u00e9"]]'
+
+
+def test_audit_rows_decode():
+    assert decode_audit_row([7, "U", "85%"]) == {"id": 7, "deepseek_priority_level": "Urgent",
+                                                 "deepseek_accuracy_score": 85.0, "deepseek_notes": None}
+    assert decode_audit_row([7, "L", 40, "Budget is tiny."])["deepseek_notes"] == "Budget is tiny."
+    assert decode_classification_row([3, "M"]) == {"id": 3, "deepseek_priority_level": "Medium"}
+
+
+def test_priority_cache_key_does_not_depend_on_entry_id():
+    first, second = make_lead(5), make_lead(9)
+    keys = [
+        cache_key("priority", MODEL, COMPACT_PRIORITY_PROMPT,
+                  _payload({"entry_id": lead.entry_id, "row": priority_row(lead)}, "entry_id"))
+        for lead in (first, second)
+    ]
+    assert keys[0] == keys[1]
+
+    other = make_lead(5, budget="$50k")
+    assert cache_key("priority", MODEL, COMPACT_PRIORITY_PROMPT,
+                     _payload({"entry_id": 5, "row": priority_row(other)}, "entry_id")) != keys[0]
+
+
+def test_audit_cache_key_does_not_depend_on_entry_id():
+    entry = SimpleNamespace(raw_input="We sell dental software and need more demos.")
+    keys = [
+        cache_key("audit", "deepseek-chat", COMPACT_AUDIT_PROMPT,
+                  _payload(lead_row(lead, entry, priority_code(lead.leads_AI_priority_level)), "id"))
+        for lead in (make_lead(5), make_lead(9))
+    ]
+    assert keys[0] == keys[1]
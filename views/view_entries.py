@@ -5,11 +5,11 @@ from tabulate import tabulate
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app
+from app import get_app
 from app.database import db
 from models.entry_model import Entry
 
-app = create_app()
+app = get_app()
 
 
 def view_entries():